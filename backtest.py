@@ -0,0 +1,81 @@
+import numpy as np
+
+
+def positions_from_signals(signals):
+    """Hold the last non-zero signal (1 buy / -1 sell) until the next one, 0 before the first"""
+    signals = np.asarray(signals, dtype=np.float64)
+    has_signal = signals != 0
+    # Index of the most recent non-zero signal at every bar (0 where there is none yet)
+    last = np.maximum.accumulate(np.where(has_signal, np.arange(len(signals)), 0))
+    positions = signals[last]
+    positions[~np.maximum.accumulate(has_signal)] = 0.0
+    return positions
+
+
+def run_backtest(close, position, transaction_cost=0.0, slippage=0.0, periods_per_year=252):
+    """Vectorized backtest of any position series against a close-price series
+
+    position[t] is the exposure (e.g. 1 long, -1 short, 0 flat) decided at the
+    close of bar t and held over bar t+1, so bar t earns position[t-1] * return[t].
+    Every change of position costs (transaction_cost + slippage) per unit traded,
+    charged on the bar the new position starts earning. Costs are fractions of
+    notional (10 bps = 0.001).
+
+    Returns a dict with the per-bar 'return', 'strategy_return',
+    'cumulative_return' and 'buy_and_hold' arrays (first bar NaN, as with
+    pandas pct_change) and the summary 'metrics'.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    position = np.asarray(position, dtype=np.float64)
+    n = len(close)
+    if n == 0:
+        return {"metrics": {"error": "No data available for risk calculation"}}
+
+    returns = np.full(n, np.nan)
+    returns[1:] = close[1:] / close[:-1] - 1
+
+    # Units traded when entering each bar's position (starting from flat)
+    traded = np.abs(np.diff(position, prepend=0.0))
+    strategy_returns = np.full(n, np.nan)
+    strategy_returns[1:] = position[:-1] * returns[1:] - (transaction_cost + slippage) * traded[:-1]
+
+    cumulative = np.full(n, np.nan)
+    cumulative[1:] = np.cumprod(1 + strategy_returns[1:])
+    buy_and_hold = np.full(n, np.nan)
+    buy_and_hold[1:] = np.cumprod(1 + returns[1:])
+
+    metrics = {}
+    active = strategy_returns[1:]
+    metrics['total_return'] = float(cumulative[-1] - 1) if n > 1 else 0.0
+    metrics['buy_hold_return'] = float(buy_and_hold[-1] - 1) if n > 1 else 0.0
+
+    # Annualized return
+    metrics['annualized_return'] = float(((1 + metrics['total_return']) ** (periods_per_year / n)) - 1)
+
+    # Sharpe ratio (assuming risk-free rate of 0)
+    std = active.std(ddof=1) if len(active) > 1 else 0.0
+    metrics['sharpe_ratio'] = float(active.mean() / std * np.sqrt(periods_per_year)) if std > 0 else 0.0
+
+    # Maximum drawdown
+    if n > 1:
+        equity = cumulative[1:]
+        metrics['max_drawdown'] = float((equity / np.maximum.accumulate(equity) - 1).min())
+    else:
+        metrics['max_drawdown'] = 0.0
+
+    # Win rate (share of bars with a non-zero strategy return that were positive). As in the
+    # original pandas metrics, the NaN first bar counts as non-zero in the denominator
+    nonzero = np.count_nonzero(strategy_returns != 0)
+    metrics['win_rate'] = float(np.count_nonzero(active > 0) / nonzero) if nonzero > 0 else 0.0
+
+    # Trading activity
+    metrics['turnover'] = float(traded.sum())
+    metrics['trades'] = int(np.count_nonzero(traded))
+
+    return {
+        "return": returns,
+        "strategy_return": strategy_returns,
+        "cumulative_return": cumulative,
+        "buy_and_hold": buy_and_hold,
+        "metrics": metrics,
+    }
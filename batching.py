@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Dynamic batching in front of a model's forward pass
+
+    Callers submit arrays of inputs (first axis = samples) and block on the
+    result. A single worker thread waits up to max_latency_ms after the first
+    queued request for more to arrive, concatenates up to max_batch_size
+    samples that target the same model object into one predict_fn(model, X)
+    call and scatters the rows back to the callers. A request larger than
+    max_batch_size runs as a batch of its own; it is never split.
+    """
+
+    # Upper bounds of the batch-size histogram buckets (samples per forward pass)
+    BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+    def __init__(self, predict_fn, max_batch_size=256, max_latency_ms=5.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.max_latency = max(float(max_latency_ms), 0.0) / 1000
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._queued_samples = 0
+        self._worker = None
+        # Metrics
+        self.requests = 0
+        self.completed = 0
+        self.batches = 0
+        self.samples = 0
+        self.max_batch_seen = 0
+        self.wait_seconds = 0.0
+        self.batch_size_counts = [0] * (len(self.BATCH_SIZE_BUCKETS) + 1)
+
+    def predict(self, model, X):
+        """Run X through the model as part of a batch; blocks until the rows are ready"""
+        return self.submit(model, X).result()
+
+    def submit(self, model, X):
+        """Queue X for model; returns a Future of predict_fn's rows for X"""
+        future = Future()
+        if len(X) == 0:
+            future.set_result(self.predict_fn(model, X))
+            return future
+        with self._cond:
+            self._ensure_worker()
+            self._queue.append((model, X, future, time.perf_counter()))
+            self._queued_samples += len(X)
+            self.requests += 1
+            self._cond.notify()
+        return future
+
+    def _ensure_worker(self):
+        # Started on first use, so a forking server gets the thread in each worker
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._worker.start()
+
+    def after_fork(self):
+        """Forget the parent's queue and worker thread; call in a freshly forked worker"""
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._queued_samples = 0
+        self._worker = None
+
+    def _take_batch(self):
+        """Wait for work, then collect one batch for a single model (called with the lock held)"""
+        while not self._queue:
+            self._cond.wait()
+
+        model = self._queue[0][0]
+        deadline = self._queue[0][3] + self.max_latency
+        while True:
+            size = sum(len(item[1]) for item in self._queue if item[0] is model)
+            remaining = deadline - time.perf_counter()
+            if size >= self.max_batch_size or remaining <= 0:
+                break
+            self._cond.wait(remaining)
+
+        batch, size, kept = [], 0, deque()
+        for item in self._queue:
+            if item[0] is model and (not batch or size + len(item[1]) <= self.max_batch_size):
+                batch.append(item)
+                size += len(item[1])
+            else:
+                kept.append(item)
+        self._queue = kept
+        self._queued_samples -= size
+        return model, batch, size
+
+    def _run(self):
+        while True:
+            with self._cond:
+                model, batch, size = self._take_batch()
+
+            started = time.perf_counter()
+            try:
+                X = batch[0][1] if len(batch) == 1 else np.concatenate([item[1] for item in batch])
+                output = self.predict_fn(model, X)
+            except Exception as e:
+                for item in batch:
+                    item[2].set_exception(e)
+                continue
+
+            offset = 0
+            for item in batch:
+                item[2].set_result(output[offset:offset + len(item[1])])
+                offset += len(item[1])
+            self._record(batch, size, started)
+
+    def _record(self, batch, size, started):
+        with self._cond:
+            self.batches += 1
+            self.completed += len(batch)
+            self.samples += size
+            self.max_batch_seen = max(self.max_batch_seen, size)
+            self.wait_seconds += sum(started - item[3] for item in batch)
+            bucket = next((i for i, bound in enumerate(self.BATCH_SIZE_BUCKETS) if size <= bound),
+                          len(self.BATCH_SIZE_BUCKETS))
+            self.batch_size_counts[bucket] += 1
+
+    def stats(self):
+        with self._cond:
+            labels = [f"<={bound}" for bound in self.BATCH_SIZE_BUCKETS] + [f">{self.BATCH_SIZE_BUCKETS[-1]}"]
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_latency_ms": self.max_latency * 1000,
+                "queue_depth": len(self._queue),
+                "queued_samples": self._queued_samples,
+                "requests": self.requests,
+                "batches": self.batches,
+                "samples": self.samples,
+                "avg_batch_size": round(self.samples / self.batches, 2) if self.batches else 0.0,
+                "max_batch_seen": self.max_batch_seen,
+                "avg_wait_ms": round(self.wait_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+                "batch_sizes": dict(zip(labels, self.batch_size_counts)),
+            }
@@ -0,0 +1,118 @@
+"""Compare the DataFrame MACD path with the compact float32 one (bars.py): time, memory, agreement
+
+DataFrame path: IndicatorState + time_series_split + calculate_risk_metrics, as
+/api/predict-macd runs by default. Compact path: CompactBars + IndicatorBuffers
++ crossover_signals + run_backtest, as it runs with COMPACT_BARS=1 ("cold"
+builds the bars and buffers, "warm" reuses them as the cache does for an
+unchanged data version).
+
+    python benchmarks/compact_bars.py [--rows 10000 100000 1000000] [--repeats 5] [--output out.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from benchmarks.suite import measure, synthetic_ohlcv  # noqa: E402
+
+
+def dataframe_path(server, frame):
+    from indicators import IndicatorState
+    indicators = IndicatorState().update(frame["close"].to_numpy())
+    test_signals, _, _, _ = server.time_series_split(frame, indicators)
+    return test_signals, server.calculate_risk_metrics(test_signals)
+
+
+def compact_path(bars, indicators):
+    from backtest import positions_from_signals, run_backtest
+    from bars import crossover_signals
+    signals = crossover_signals(indicators["macd"], indicators["signal_line"])
+    return signals, run_backtest(bars.close, positions_from_signals(signals))
+
+
+def compact_cold(frame):
+    from bars import CompactBarCache
+    cache = CompactBarCache()
+    bars, indicators = cache.get(frame, 1)
+    return compact_path(bars, indicators), cache
+
+
+def run_size(server, rows, repeats, seed):
+    frame = synthetic_ohlcv(rows, seed)
+    test_signals, metrics = dataframe_path(server, frame)
+    (signals, backtest), cache = compact_cold(frame)
+    bars, indicators = cache.get(frame, 1)
+
+    agreement = float(np.mean(signals == test_signals["Signal"].to_numpy()))
+    cumulative_diff = float(np.nanmax(np.abs(backtest["cumulative_return"] - test_signals["Cumulative_Return"].to_numpy())))
+    result = {
+        "rows": rows,
+        "dataframe": measure(lambda: lambda: dataframe_path(server, frame), repeats),
+        "compact_cold": measure(lambda: lambda: compact_cold(frame), repeats),
+        "compact_warm": measure(lambda: lambda: compact_path(bars, indicators), repeats),
+        # What stays in memory per symbol between requests
+        "retained_mb": {
+            "dataframe": round(test_signals.memory_usage(deep=True).sum() / (1024 * 1024), 3),
+            "compact": round(cache.nbytes / (1024 * 1024), 3),
+        },
+        "signal_agreement": agreement,
+        "max_cumulative_return_diff": cumulative_diff,
+        "total_return": {"dataframe": metrics["total_return"], "compact": backtest["metrics"]["total_return"]},
+    }
+    return result
+
+
+def print_table(results):
+    print(f"{'rows':>9} {'path':<13} {'median ms':>10} {'peak MB':>9} {'retained MB':>12}")
+    for result in results:
+        for path, retained in (("dataframe", "dataframe"), ("compact_cold", "compact"), ("compact_warm", "compact")):
+            timing = result[path]
+            print(f"{result['rows']:>9} {path:<13} {timing['median_s'] * 1000:>10.2f} {timing['peak_mb']:>9.2f} "
+                  f"{result['retained_mb'][retained]:>12.2f}")
+        print(f"{'':>9} signals agree on {result['signal_agreement']:.4%} of bars, "
+              f"max cumulative return diff {result['max_cumulative_return_diff']:.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the DataFrame and compact float32 MACD paths")
+    parser.add_argument("--rows", nargs="+", type=int, default=[10000, 100000, 1000000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        os.environ["DATA_DIR"] = scratch
+        os.environ["CHARTS_DIR"] = os.path.join(scratch, "charts")
+        os.environ.setdefault("TRANSFORMER_BACKEND", "lite")
+        os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+        with contextlib.redirect_stdout(io.StringIO()):
+            import server
+
+        results = []
+        try:
+            for rows in args.rows:
+                print(f"Benchmarking {rows} rows...", file=sys.stderr)
+                # time_series_split logs as it goes
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results.append(run_size(server, rows, args.repeats, args.seed))
+        finally:
+            server.CHARTS.shutdown()
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"✅ Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
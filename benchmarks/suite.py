@@ -0,0 +1,361 @@
+"""Benchmark every stage of the prediction pipeline on synthetic OHLCV data
+
+Times each stage in isolation (CSV / columnar load, indicators, window
+building, Transformer inference, time_series_split, backtest, risk metrics,
+chart rendering) and whole requests through the Flask test client, for one or
+more data sizes. Peak Python memory per stage is measured with tracemalloc in
+a separate, untimed run.
+
+    python benchmarks/suite.py --rows 1000 100000 --output results.json
+    python benchmarks/suite.py --rows 1000 100000 --baseline results.json --fail-on-regression
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+E2E_ROUTES = ["/api/predict", "/api/predict-sentiment", "/api/predict-macd", "/api/predict-transformer"]
+
+
+def synthetic_ohlcv(rows, seed=0, start_price=100.0):
+    """Daily OHLCV bars whose log price is a mean-reverting random walk (stays finite at 10M rows)"""
+    from scipy.signal import lfilter
+
+    rng = np.random.default_rng(seed)
+    log_price = lfilter([1.0], [1.0, -0.999], rng.normal(0.0, 0.015, rows))
+    close = start_price * np.exp(log_price)
+    open_ = np.concatenate(([start_price], close[:-1])) * (1 + rng.normal(0.0, 0.002, rows))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0.0, 0.005, rows)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0.0, 0.005, rows)))
+    return pd.DataFrame({
+        "timestamp": 1_600_000_000_000 + np.arange(rows, dtype=np.int64) * 86_400_000,
+        "open": open_.round(4),
+        "high": high.round(4),
+        "low": low.round(4),
+        "close": close.round(4),
+        "volume": rng.integers(100_000, 10_000_000, rows).astype(np.float64),
+    })
+
+
+# Stages: each takes the shared context and returns a zero-argument callable
+# to time. They are called again before every repeat (untimed), so any
+# per-run setup happens there.
+
+def stage_csv_load(ctx):
+    from market_data import MarketDataStore
+    return lambda: MarketDataStore(ctx["csv_path"]).get()
+
+
+def stage_columnar_load(ctx):
+    from market_data import ColumnarMarketData
+    # Open and touch the close column, as a route does
+    return lambda: float(ColumnarMarketData(ctx["symbol_dir"]).get()["close"].to_numpy().sum())
+
+
+def stage_indicators(ctx):
+    from indicators import IndicatorState
+    return lambda: IndicatorState().update(ctx["close"])
+
+
+def stage_indicators_next_bar(ctx):
+    from indicators import IndicatorState
+    state = IndicatorState()
+    # Same data store lineage, as the server passes it
+    state.update(ctx["close"][:-1], 0)
+    return lambda: state.update(ctx["close"], 0)
+
+
+def stage_windows(ctx):
+    from sequence_windows import iter_window_chunks
+    values = ctx["close"][-(ctx["windows"] + ctx["server"].TRANSFORMER_LOOK_BACK - 1):]
+    # The copy a framework makes when it turns each strided chunk into a dense tensor
+    return lambda: sum(np.ascontiguousarray(chunk).shape[0]
+                       for chunk in iter_window_chunks(values, ctx["server"].TRANSFORMER_LOOK_BACK))
+
+
+def stage_inference(ctx):
+    server = ctx["server"]
+    transformer = server.MODELS.get("transformer")
+    close = ctx["close"]
+    first_end = len(close) - ctx["windows"] + 1
+    return lambda: server.predict_transformer_windows(transformer, close, first_end, len(close) + 1)
+
+
+def stage_time_series_split(ctx):
+    return lambda: ctx["server"].time_series_split(ctx["frame"], ctx["indicator_values"])
+
+
+def stage_backtest(ctx):
+    from backtest import positions_from_signals, run_backtest
+    signals = np.random.default_rng(1).choice([-1.0, 0.0, 0.0, 0.0, 1.0], len(ctx["close"]))
+    return lambda: run_backtest(ctx["close"], positions_from_signals(signals), transaction_cost=0.0005)
+
+
+def stage_risk_metrics(ctx):
+    return lambda: ctx["server"].calculate_risk_metrics(ctx["test_signals"])
+
+
+def stage_chart_macd(ctx):
+    from charts import render_macd
+    test_signals = ctx["test_signals"]
+    data = {
+        "index": test_signals.index.to_numpy(),
+        "cumulative_return": test_signals["Cumulative_Return"].to_numpy(),
+        "buy_and_hold": test_signals["Buy_and_Hold"].to_numpy(),
+        "symbol": "BENCH",
+    }
+    path = os.path.join(ctx["scratch"], "chart.png")
+    return lambda: render_macd(data, path, ctx["dpi"])
+
+
+STAGES = {
+    "csv_load": stage_csv_load,
+    "columnar_load": stage_columnar_load,
+    "indicators": stage_indicators,
+    "indicators_next_bar": stage_indicators_next_bar,
+    "windows": stage_windows,
+    "inference": stage_inference,
+    "time_series_split": stage_time_series_split,
+    "backtest": stage_backtest,
+    "risk_metrics": stage_risk_metrics,
+    "chart_macd": stage_chart_macd,
+}
+
+
+def measure(prepare, repeats):
+    """Median/min wall time over repeats, then one tracemalloc run for the peak"""
+    timings = []
+    for _ in range(repeats):
+        run = prepare()
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+
+    run = prepare()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "median_s": float(np.median(timings)),
+        "min_s": float(np.min(timings)),
+        "repeats": repeats,
+        "peak_mb": round(peak / (1024 * 1024), 3),
+    }
+
+
+def e2e_prepare(client, route, expected_status=200):
+    def prepare():
+        def run():
+            response = client.get(route)
+            if response.status_code != expected_status:
+                raise RuntimeError(f"{route} returned {response.status_code}: {response.data[:200]!r}")
+        return run
+    return prepare
+
+
+def run_e2e(server, rows, routes, repeats, args):
+    """Whole requests: first after new data (cold), repeated (warm), served from the response cache, 304"""
+    from response_cache import ResponseCache
+
+    client = server.app.test_client()
+    results = []
+    for route in routes:
+        if route == "/api/predict-transformer" and rows - server.TRANSFORMER_LOOK_BACK > args.max_inference_windows:
+            results.append({"stage": f"e2e:{route}", "rows": rows, "skipped": "rows above --max-inference-windows"})
+            continue
+
+        # Compute path: response cache off
+        server.RESPONSE_CACHE = None
+        started = time.perf_counter()
+        e2e_prepare(client, route)()()
+        cold = time.perf_counter() - started
+        result = measure(e2e_prepare(client, route), repeats)
+        results.append(dict(result, stage=f"e2e:{route}", rows=rows, cold_s=cold))
+
+        # Cached path: HIT and conditional 304
+        server.RESPONSE_CACHE = ResponseCache()
+        etag = client.get(route).headers.get("ETag", "").strip('"')
+        results.append(dict(measure(e2e_prepare(client, route), repeats), stage=f"e2e_cached:{route}", rows=rows))
+        conditional = client.get(route, headers={"If-None-Match": f'"{etag}"'}) if etag else None
+        if conditional is not None and conditional.status_code == 304:
+            def prepare_304():
+                return lambda: client.get(route, headers={"If-None-Match": f'"{etag}"'})
+            results.append(dict(measure(prepare_304, repeats), stage=f"e2e_304:{route}", rows=rows))
+    return results
+
+
+def run_size(server, rows, args, scratch):
+    from market_data import SymbolStore
+
+    frame = synthetic_ohlcv(rows, seed=args.seed)
+    csv_path = os.path.join(scratch, "stock_data.csv")
+    frame.to_csv(csv_path, index=False)
+    symbols = SymbolStore(os.path.join(scratch, "symbols"))
+    symbols.import_frame("BENCH", frame)
+
+    close = frame["close"].to_numpy(dtype=np.float64)
+    from indicators import IndicatorState
+    indicator_values = IndicatorState().update(close)
+    ctx = {
+        "server": server,
+        "frame": frame,
+        "close": close,
+        "csv_path": csv_path,
+        "symbol_dir": symbols.directory("BENCH"),
+        "indicator_values": indicator_values,
+        "test_signals": server.time_series_split(frame, indicator_values)[0],
+        "windows": max(min(rows - server.TRANSFORMER_LOOK_BACK, args.max_inference_windows), 1),
+        "scratch": scratch,
+        "dpi": args.dpi,
+    }
+
+    results = []
+    for name in args.stages:
+        if name == "e2e":
+            results.extend(run_e2e(server, rows, E2E_ROUTES, args.repeats, args))
+            continue
+        if name in ("windows", "inference") and rows <= server.TRANSFORMER_LOOK_BACK:
+            continue
+        result = measure(lambda: STAGES[name](ctx), args.repeats)
+        result.update(stage=name, rows=rows)
+        if name in ("windows", "inference"):
+            result["windows"] = ctx["windows"]
+        results.append(result)
+    for result in results:
+        if "median_s" in result and result["median_s"] > 0:
+            result["rows_per_s"] = round(rows / result["median_s"])
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "transformer_backend": os.environ.get("TRANSFORMER_BACKEND"),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(results, baseline, threshold):
+    """(stage, rows, ratio) for every result with a baseline; ratio > 1 + threshold is a regression"""
+    previous = {(r["stage"], r["rows"]): r for r in baseline["results"] if "median_s" in r}
+    comparisons = []
+    for result in results:
+        old = previous.get((result["stage"], result["rows"]))
+        if old is None or "median_s" not in result or old["median_s"] <= 0:
+            continue
+        ratio = result["median_s"] / old["median_s"]
+        comparisons.append({"stage": result["stage"], "rows": result["rows"], "ratio": round(ratio, 3),
+                            "baseline_s": old["median_s"], "median_s": result["median_s"],
+                            "regression": ratio > 1 + threshold})
+    return comparisons
+
+
+def print_table(results, comparisons):
+    ratios = {(c["stage"], c["rows"]): c for c in comparisons}
+    header = f"{'stage':<34} {'rows':>10} {'median':>11} {'min':>11} {'peak MB':>9} {'vs base':>9}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        if "median_s" not in result:
+            print(f"{result['stage']:<34} {result['rows']:>10}   skipped: {result.get('skipped')}")
+            continue
+        comparison = ratios.get((result["stage"], result["rows"]))
+        versus = f"{comparison['ratio']:.2f}x" if comparison else ""
+        if comparison and comparison["regression"]:
+            versus += " ⚠️"
+        print(f"{result['stage']:<34} {result['rows']:>10} {result['median_s'] * 1000:>9.2f}ms "
+              f"{result['min_s'] * 1000:>9.2f}ms {result['peak_mb']:>9.2f} {versus:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction pipeline on synthetic OHLCV data")
+    parser.add_argument("--rows", nargs="+", type=int, default=[1000, 10000, 100000],
+                        help="Data sizes to benchmark (1k to 10M rows)")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES) + ["e2e"], choices=list(STAGES) + ["e2e"])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dpi", type=int, default=300, help="Chart DPI (the server renders at 300)")
+    parser.add_argument("--max-inference-windows", type=int, default=5000,
+                        help="Cap on Transformer windows per inference run (and rows for the e2e Transformer route)")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown that counts as a regression (0.2 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        # The server reads its data and writes charts under the scratch directory
+        os.environ["DATA_DIR"] = scratch
+        os.environ["CHARTS_DIR"] = os.path.join(scratch, "charts")
+        os.environ.setdefault("TRANSFORMER_BACKEND", "lite")
+        os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+        with contextlib.redirect_stdout(io.StringIO()):
+            import server
+            for name in server.MODELS.names():
+                server.MODELS.get(name)
+
+        results = []
+        try:
+            for rows in args.rows:
+                print(f"Benchmarking {rows} rows...", file=sys.stderr)
+                # The routes log every request; keep the report readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results.extend(run_size(server, rows, args, scratch))
+        finally:
+            server.CHARTS.shutdown()
+
+    report = {
+        "environment": environment(),
+        # Process-wide high-water mark (Linux reports KiB), includes memory tracemalloc cannot see
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "results": results,
+    }
+    comparisons = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            comparisons = compare(results, json.load(f), args.threshold)
+        report["comparison"] = comparisons
+
+    print_table(results, comparisons)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Wrote {len(results)} results to {args.output}")
+
+    regressions = [c for c in comparisons if c["regression"]]
+    if regressions:
+        print(f"⚠️ {len(regressions)} stage(s) slower than baseline by more than {args.threshold:.0%}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Compare Transformer inference backends (Keras vs numpy lite): load time, latency and RSS
+
+Each backend runs in a fresh interpreter so import cost and memory are not shared:
+
+    python benchmarks/transformer_backends.py [--batch-sizes 1 32 256] [--repeats 20] [--json out.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+BACKENDS = ["keras", "lite"]
+LOOK_BACK = 60
+
+
+def _memory_kb():
+    """Current and peak RSS of this process from /proc (Linux)"""
+    values = {}
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, value = line.split(":", 1)
+                values[key] = int(value.split()[0])
+    return values.get("VmRSS", 0), values.get("VmHWM", 0)
+
+
+def _load(backend):
+    if backend == "keras":
+        import joblib
+        from keras.models import load_model
+        return (load_model(os.path.join(MODELS_DIR, "Transformer_model.h5")),
+                joblib.load(os.path.join(MODELS_DIR, "Transformer_scaler.pkl")))
+    from transformer_lite import load_lite
+    return load_lite(os.path.join(MODELS_DIR, "Transformer_lite.npz"))
+
+
+def run_worker(backend, batch_sizes, repeats, output_path):
+    """Benchmark one backend in this process; writes results JSON and reference outputs"""
+    rss_start, _ = _memory_kb()
+    started = time.perf_counter()
+    model, scaler = _load(backend)
+    load_seconds = time.perf_counter() - started
+    rss_loaded, _ = _memory_kb()
+
+    rng = np.random.default_rng(0)
+    latency = {}
+    for batch_size in batch_sizes:
+        X = rng.random((batch_size, LOOK_BACK, 1)).astype(np.float32)
+        model.predict(X, verbose=0)  # warm-up (graph tracing for Keras)
+        timings = []
+        for _ in range(repeats):
+            t = time.perf_counter()
+            model.predict(X, verbose=0)
+            timings.append(time.perf_counter() - t)
+        latency[str(batch_size)] = {
+            "median_ms": round(float(np.median(timings)) * 1000, 3),
+            "p95_ms": round(float(np.percentile(timings, 95)) * 1000, 3),
+            "per_window_us": round(float(np.median(timings)) / batch_size * 1e6, 2),
+        }
+
+    reference = np.random.default_rng(1).random((256, LOOK_BACK, 1)).astype(np.float32)
+    np.save(output_path + ".npy", scaler.inverse_transform(model.predict(reference, verbose=0)))
+    rss_end, rss_peak = _memory_kb()
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "backend": backend,
+            "load_seconds": round(load_seconds, 3),
+            "rss_start_mb": round(rss_start / 1024, 1),
+            "rss_loaded_mb": round(rss_loaded / 1024, 1),
+            "rss_end_mb": round(rss_end / 1024, 1),
+            "rss_peak_mb": round(rss_peak / 1024, 1),
+            "latency": latency,
+        }, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 32, 256])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.batch_sizes, args.repeats, args.output)
+        return
+
+    results = {}
+    outputs = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for backend in args.backends:
+            output_path = os.path.join(scratch, f"{backend}.json")
+            env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL="3")
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", backend, "--output", output_path,
+                 "--repeats", str(args.repeats), "--batch-sizes", *map(str, args.batch_sizes)],
+                check=True, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            with open(output_path, "r", encoding="utf-8") as f:
+                results[backend] = json.load(f)
+            outputs[backend] = np.load(output_path + ".npy")
+
+    if "keras" in outputs and "lite" in outputs:
+        results["max_abs_diff_price"] = float(np.abs(outputs["keras"] - outputs["lite"]).max())
+
+    for backend in args.backends:
+        result = results[backend]
+        print(f"{backend:<6} load {result['load_seconds']:>7.3f}s   RSS loaded {result['rss_loaded_mb']:>7.1f} MB   "
+              f"peak {result['rss_peak_mb']:>7.1f} MB")
+        for batch_size, timing in result["latency"].items():
+            print(f"       batch {batch_size:>5}: median {timing['median_ms']:>9.3f} ms   "
+                  f"p95 {timing['p95_ms']:>9.3f} ms   {timing['per_window_us']:>9.2f} us/window")
+    if "max_abs_diff_price" in results:
+        print(f"Max |keras - lite| on 256 windows: {results['max_abs_diff_price']:.2e} (price units)")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Wrote results to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
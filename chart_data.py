@@ -0,0 +1,127 @@
+import importlib.util
+import json
+
+import numpy as np
+
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+
+def arrow_available():
+    """True if pyarrow (optional, only needed for Arrow output) is installed"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def round_significant(values, digits=7):
+    """values rounded to digits significant digits, so they serialize as short decimals"""
+    values = np.asarray(values, dtype=np.float64)
+    magnitude = np.floor(np.log10(np.abs(np.where((values == 0) | ~np.isfinite(values), 1.0, values))))
+    exponent = (digits - 1 - magnitude).astype(np.int64)
+    # Divide / multiply by exact powers of ten so each result is the double nearest to its decimal
+    scale = 10.0 ** np.abs(exponent)
+    return np.where(exponent >= 0, np.round(values * scale) / scale, np.round(values / scale) * scale)
+
+
+def lttb(x, y, threshold):
+    """Indices of the threshold points Largest-Triangle-Three-Buckets keeps (first and last included)
+
+    The points between the first and the last are split into threshold-2
+    buckets; from each, the point forming the largest triangle with the point
+    kept from the previous bucket and the average of the next bucket is kept.
+    Peaks and troughs survive, unlike with striding or bucket means.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket boundaries over the inner points 1..n-2, plus the last point as a bucket of its own
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # Twice the triangle area; the factor does not change the argmax
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[bucket + 1] = a
+    kept[-1] = n - 1
+    return kept
+
+
+def downsample(x, y, threshold):
+    """(x, y) reduced to at most threshold points with lttb(); NaN / inf points are left out"""
+    finite = np.isfinite(y)
+    if not finite.all():
+        x, y = x[finite], y[finite]
+    keep = lttb(x, y, threshold)
+    return x[keep], y[keep]
+
+
+def thin_markers(x, width, x_range):
+    """At most one marker per pixel column (the latest), so dense signals stay readable"""
+    if len(x) <= width or x_range[1] <= x_range[0]:
+        return np.arange(len(x))
+    pixel = ((x - x_range[0]) / (x_range[1] - x_range[0]) * (width - 1)).astype(np.int64)
+    # Markers are in time order: the last one in each column is where the pixel changes next
+    return np.flatnonzero(np.append(pixel[1:] != pixel[:-1], True))
+
+
+class ChartData:
+    """Series and buy/sell markers for one chart, downsampled to a pixel width
+
+    x values are epoch milliseconds (or bar numbers when the data has no
+    timestamps). Each series keeps its own x: lttb() picks different points
+    for a line with different peaks.
+    """
+
+    def __init__(self, x, series, buy, sell, width, meta=None):
+        x = np.asarray(x)
+        self.width = width
+        self.meta = dict(meta or {}, width=width, rows=len(x))
+        x_range = (float(x[0]), float(x[-1])) if len(x) else (0.0, 0.0)
+        self.series = {}
+        for name, (series_x, values) in series.items():
+            self.series[name] = downsample(np.asarray(series_x), np.asarray(values, dtype=np.float64), width)
+        self.markers = {}
+        for side, (marker_x, marker_y) in (("buy", buy), ("sell", sell)):
+            marker_x, marker_y = np.asarray(marker_x), np.asarray(marker_y, dtype=np.float64)
+            keep = thin_markers(marker_x, width, x_range)
+            self.markers[side] = (marker_x[keep], marker_y[keep])
+            self.meta[f"{side}_markers_total"] = len(marker_x)
+
+    def to_json(self):
+        """Plain dict for jsonify; y values keep 7 significant digits (far below a pixel)"""
+        return dict(
+            self.meta,
+            series={name: {"x": x.tolist(), "y": round_significant(y).tolist()}
+                    for name, (x, y) in self.series.items()},
+            markers={side: {"x": x.tolist(), "y": round_significant(y).tolist()}
+                     for side, (x, y) in self.markers.items()},
+        )
+
+    def to_arrow(self):
+        """Arrow IPC stream of one long table (series, x, y); markers are the series "buy" and "sell"
+
+        Raises RuntimeError without pyarrow, which is an optional dependency.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise RuntimeError("Arrow output needs pyarrow (pip install pyarrow)")
+        parts = list(self.series.items()) + list(self.markers.items())
+        names = [name for name, _ in parts]
+        codes = np.concatenate([np.full(len(x), i, dtype=np.int32) for i, (_, (x, _)) in enumerate(parts)])
+        table = pa.table({
+            "series": pa.DictionaryArray.from_arrays(pa.array(codes), pa.array(names)),
+            "x": pa.array(np.concatenate([x for _, (x, _) in parts]).astype(np.int64)),
+            "y": pa.array(np.concatenate([y for _, (_, y) in parts]).astype(np.float64)),
+        }, metadata={"chart": json.dumps(self.meta, default=str)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
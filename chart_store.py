@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class ChartStore:
+    """Size-capped directory of write-once chart images with LRU eviction
+
+    Images are named by content key (see charts.chart_key) and only ever
+    written once, via temp file + atomic rename, so a name always refers to the
+    same bytes and can be served with a strong ETag and long-lived caching.
+
+    The directory is the source of truth: other worker processes write and
+    evict images in it too, so lookups that miss the in-memory index check the
+    disk and index what they find there.
+    """
+
+    # A temp file or .pending marker older than this belongs to a render that died
+    STALE_SECONDS = 120
+
+    def __init__(self, directory, max_files=200, max_bytes=200 * 1024 * 1024, cleanup=True):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # name -> size, least recently used first
+        self._total_bytes = 0
+        self.evictions = 0
+        self._scan(cleanup)
+
+    def _scan(self, cleanup):
+        """Pick up images left by a previous run, oldest first
+
+        With cleanup, also delete stale temp files and markers of renders that
+        died; fresh ones may belong to a render in flight in another process.
+        """
+        found = []
+        stale_before = time.time() - self.STALE_SECONDS
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+                if entry.name.endswith(".png"):
+                    found.append((stat.st_mtime, entry.name, stat.st_size))
+                elif cleanup and entry.name.endswith((".tmp", ".pending")) and stat.st_mtime < stale_before:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                # Moved into place or cleaned up by another process meanwhile
+                continue
+        for _, name, size in sorted(found):
+            self._remember(name, size)
+        if cleanup:
+            with self._lock:
+                self._evict()
+
+    @staticmethod
+    def kind_of(name):
+        return name.rsplit("-", 1)[0]
+
+    @staticmethod
+    def etag_of(name):
+        return os.path.splitext(name)[0].rsplit("-", 1)[-1]
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _remember(self, name, size):
+        if name in self._entries:
+            self._total_bytes -= self._entries.pop(name)
+        self._entries[name] = size
+        self._total_bytes += size
+
+    @staticmethod
+    def is_chart_name(name):
+        """True for a bare image name (no directories), as stored by this class"""
+        return bool(name) and os.path.basename(name) == name and name.endswith(".png")
+
+    def _forget(self, name):
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def contains(self, name):
+        """True if name is stored (by any process); counts as a use for LRU purposes"""
+        if not self.is_chart_name(name):
+            return False
+        try:
+            size = os.path.getsize(self.path(name))
+        except OSError:
+            # Never written, or evicted by another worker
+            with self._lock:
+                self._forget(name)
+            return False
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+            else:
+                # Rendered by another worker
+                self._remember(name, size)
+                self._evict()
+            return name in self._entries
+
+    def add(self, name):
+        """Register a freshly written image and evict old ones over the caps"""
+        size = os.path.getsize(self.path(name))
+        with self._lock:
+            self._remember(name, size)
+            self._evict()
+
+    def latest(self, kind):
+        """Most recently written image of kind by any process, or None"""
+        newest = None
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".png") and self.kind_of(entry.name) == kind:
+                try:
+                    mtime = entry.stat().st_mtime_ns
+                except OSError:
+                    continue
+                if newest is None or mtime > newest[0]:
+                    newest = (mtime, entry.name)
+        if newest is None:
+            return None
+        return newest[1] if self.contains(newest[1]) else None
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_files
+                                 or self._total_bytes > self.max_bytes):
+            name, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(name))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "files": len(self._entries),
+                "bytes": self._total_bytes,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from chart_store import ChartStore
+
+
+# Chart renderers run inside the worker processes. Each takes plain arrays so
+# the payload pickles cheaply, draws with pyplot and saves to output_path.
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')  # Use non-interactive backend inside workers
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def render_moving_average(data, output_path, dpi):
+    plt = _pyplot()
+    plt.figure(figsize=(12, 6))
+
+    index, close = data['index'], data['close']
+    sma_50, sma_200 = data['sma_50'], data['sma_200']
+    plt.plot(index, close, label='Closing Price', color='blue')
+    plt.plot(index, sma_50, label='SMA 50', color='orange')
+    plt.plot(index, sma_200, label='SMA 200', color='red')
+
+    # Add buy/sell markers
+    buy = sma_50 > sma_200
+    sell = sma_50 < sma_200
+    plt.scatter(index[buy], close[buy],
+                color='green', label='Buy Signal', marker='^', alpha=1, s=100, zorder=5)
+    plt.scatter(index[sell], close[sell],
+                color='red', label='Sell Signal', marker='v', alpha=1, s=100, zorder=5)
+
+    plt.title(f"Stock Price with Moving Average Crossover Signals (Last {len(index)} days)", fontsize=14)
+    plt.legend()
+    plt.xlabel("Day")
+    plt.ylabel("Price ($)")
+    plt.grid(True, alpha=0.3)
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight', format='png')
+    plt.close('all')  # Close all figures to prevent memory leaks
+
+
+def render_sentiment(data, output_path, dpi):
+    plt = _pyplot()
+    plt.figure(figsize=(12, 6))
+
+    index, close, prediction = data['index'], data['close'], data['prediction']
+    plt.plot(index, close, label='Closing Price', color='blue')
+
+    # Add shaded background based on sentiment
+    if prediction == 1:  # Positive sentiment
+        plt.axhspan(close.min(), close.max(), alpha=0.2, color='green', label='Positive Sentiment')
+    else:  # Negative sentiment
+        plt.axhspan(close.min(), close.max(), alpha=0.2, color='red', label='Negative Sentiment')
+
+    # Mark days where price movement aligned with sentiment
+    aligned = data['aligned']
+    plt.scatter(index[aligned], close[aligned],
+                color='purple', label='Sentiment Confirmation', marker='o', s=80, zorder=5)
+
+    plt.title(f"Stock Price with Sentiment Analysis (Last {len(index)} days)", fontsize=14)
+    plt.legend()
+    plt.xlabel("Day")
+    plt.ylabel("Price ($)")
+    plt.grid(True, alpha=0.3)
+
+    # Add text annotation for the sentiment prediction
+    y_position = close.min() + (close.max() - close.min()) * 0.1
+    plt.text(index[0], y_position,
+             f"Sentiment: {'Positive' if prediction == 1 else 'Negative'}",
+             fontsize=14, color='black',
+             bbox=dict(facecolor='white', alpha=0.8))
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight', format='png')
+    plt.close('all')
+
+
+def render_macd(data, output_path, dpi):
+    plt = _pyplot()
+    plt.figure(figsize=(12, 6))
+    plt.plot(data['index'], data['cumulative_return'], label='Model Strategy')
+    plt.plot(data['index'], data['buy_and_hold'], label='Buy and Hold')
+    plt.title(f"{data['symbol']} Trading Strategy Performance (MACD)")
+    plt.xlabel('Date')
+    plt.ylabel('Cumulative Return')
+    plt.legend()
+    plt.grid(True)
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight', format='png')
+    plt.close('all')
+
+
+def render_transformer(data, output_path, dpi):
+    plt = _pyplot()
+    plt.figure(figsize=(12, 6))
+
+    index, actual, predicted = data['index'], data['actual'], data['predicted']
+    plt.plot(index, actual, label='Actual Price', color='blue')
+    plt.plot(index, predicted, label='Predicted Price', color='red', linestyle='--')
+
+    # Add buy/sell markers
+    signals = data['signals']
+    buy = signals == "BUY"
+    sell = signals == "SELL"
+    plt.scatter(index[buy], actual[buy],
+                color='green', label='Buy Signal', marker='^', s=100, zorder=5)
+    plt.scatter(index[sell], actual[sell],
+                color='red', label='Sell Signal', marker='v', s=100, zorder=5)
+
+    plt.title("Transformer Model Price Prediction and Signals", fontsize=14)
+    plt.legend()
+    plt.xlabel("Day")
+    plt.ylabel("Price ($)")
+    plt.grid(True, alpha=0.3)
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight', format='png')
+    plt.close('all')
+
+
+RENDERERS = {
+    'moving_average': render_moving_average,
+    'sentiment': render_sentiment,
+    'macd': render_macd,
+    'transformer': render_transformer,
+}
+
+
+def _render_to_file(kind, data, output_path, dpi):
+    """Worker entry point: render into a temp file, then atomically move it into place
+
+    Returns the render time in seconds.
+    """
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    started = time.perf_counter()
+    try:
+        RENDERERS[kind](data, tmp_path, dpi)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return time.perf_counter() - started
+
+
+def chart_key(kind, data_version, params):
+    """Content address of a chart: same model, data version and params -> same image"""
+    payload = json.dumps([kind, data_version, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:20]
+
+
+class ChartRenderer:
+    """Renders charts in a background process pool under content-addressed filenames
+
+    submit() returns the filename immediately; the PNG appears in the ChartStore
+    once a worker has finished. A chart that is already stored, or is already
+    being rendered, is not rendered again.
+
+    Renders in progress are also marked with an empty <name>.pending file in
+    the store, so other server workers sharing the directory neither render
+    the same chart again nor answer 404 while it is being drawn.
+    """
+
+    # A .pending marker older than this belongs to a render that died
+    PENDING_TIMEOUT_SECONDS = ChartStore.STALE_SECONDS
+
+    def __init__(self, store, max_workers=2, dpi=300, on_render=None):
+        self.store = store
+        # Called with (kind, seconds) after each successful render
+        self.on_render = on_render
+        self.max_workers = max_workers
+        self.dpi = dpi
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = {}
+        self.rendered = 0
+        self.reused = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            # pyplot is not thread-safe, so each render gets its own process
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=get_context("spawn"))
+        return self._executor
+
+    def submit(self, kind, data_version, params, data):
+        """Queue a render unless an identical chart exists; return its filename"""
+        params = dict(params, dpi=self.dpi)
+        filename = f"{kind}-{chart_key(kind, data_version, params)}.png"
+        output_path = self.store.path(filename)
+
+        with self._lock:
+            if filename in self._pending or self._pending_elsewhere(filename) or self.store.contains(filename):
+                self.reused += 1
+                return filename
+            self._mark_pending(filename)
+            future = self._get_executor().submit(_render_to_file, kind, data, output_path, self.dpi)
+            self._pending[filename] = future
+        future.add_done_callback(lambda f, name=filename: self._finished(kind, name, f))
+        return filename
+
+    def _marker(self, filename):
+        return self.store.path(f"{filename}.pending")
+
+    def _mark_pending(self, filename):
+        try:
+            with open(self._marker(filename), "w"):
+                pass
+        except OSError as e:
+            print(f"⚠️ Warning: could not mark chart {filename} as pending: {str(e)}")
+
+    def _pending_elsewhere(self, filename):
+        """True if another process sharing the store is rendering filename"""
+        try:
+            age = time.time() - os.path.getmtime(self._marker(filename))
+        except OSError:
+            return False
+        return age < self.PENDING_TIMEOUT_SECONDS
+
+    def _finished(self, kind, filename, future):
+        error = future.exception()
+        try:
+            os.remove(self._marker(filename))
+        except OSError:
+            pass
+        if error is None:
+            self.store.add(filename)
+            if self.on_render is not None:
+                self.on_render(kind, future.result())
+        with self._lock:
+            self._pending.pop(filename, None)
+            if error is None:
+                self.rendered += 1
+        if error is not None:
+            print(f"❌ Error generating chart {filename}: {str(error)}")
+            traceback.print_exception(type(error), error, error.__traceback__)
+
+    def is_pending(self, filename):
+        with self._lock:
+            if filename in self._pending:
+                return True
+        return self._pending_elsewhere(filename)
+
+    def wait(self, filename, timeout=30):
+        """Block until a pending render of filename finishes (no-op if not pending)"""
+        with self._lock:
+            future = self._pending.get(filename)
+        if future is None:
+            # Rendering in another worker: poll until its image appears
+            deadline = time.monotonic() + timeout
+            while (self._pending_elsewhere(filename) and not self.store.contains(filename)
+                   and time.monotonic() < deadline):
+                time.sleep(0.05)
+            return
+        try:
+            future.result(timeout=timeout)
+        except Exception:
+            return
+        # Done callbacks run after waiters wake up, so register the image here too
+        if not self.store.contains(filename):
+            self.store.add(filename)
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "rendered": self.rendered, "reused": self.reused}
+
+    def after_fork(self):
+        """Forget the parent's process pool and pending renders; call in a freshly forked worker"""
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = {}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from indicators import advance_indicators, fingerprint
+from market_data import MIN_CAPACITY, MarketDataStore, SymbolStore, file_lock, normalize_symbol, write_meta
+
+
+def parameter_key(sma_windows, macd_spans):
+    """Directory name for one parameter set, e.g. sma-50-200_macd-12-26-9"""
+    return f"sma-{'-'.join(map(str, sma_windows))}_macd-{'-'.join(map(str, macd_spans))}"
+
+
+def feature_directory(data_dir, symbol):
+    """Where features of symbol live: next to its columns, or next to the legacy CSV for None"""
+    if not symbol:
+        return os.path.join(data_dir, "stock_data.features")
+    return os.path.join(data_dir, "symbols", normalize_symbol(symbol), "features")
+
+
+class FeatureSeries:
+    """Indicators of one close series and parameter set as memory-mapped .npy columns
+
+    Layout: <directory>/meta.json plus gen-<n>/<column>.npy, each column
+    preallocated to meta["capacity"] rows of which meta["rows"] are valid.
+    meta.json is replaced last, so readers in any process see either the old
+    or the new row count. Appended bars are computed from the stored tail and
+    written in place past the valid rows; a rewritten history, or one that
+    outgrows the capacity, is written to a new generation instead (the one
+    before it is kept for readers still mapping it).
+
+    meta["fingerprint"] identifies the close series the rows were computed
+    from (see fingerprint()), so a restarted server or another worker picks up
+    the stored rows instead of recomputing them.
+    """
+
+    def __init__(self, directory, sma_windows=(50, 200), macd_spans=(12, 26, 9)):
+        self.directory = directory
+        self.sma_windows = tuple(sma_windows)
+        self.macd_spans = tuple(macd_spans)
+        fast_span, slow_span, _ = self.macd_spans
+        self.indicator_names = ([f"sma_{window}" for window in self.sma_windows]
+                                + [f"ema{fast_span}", f"ema{slow_span}", "macd", "signal_line", "histogram"])
+        self.columns = ["close", "returns"] + self.indicator_names
+        self._lock = threading.Lock()
+        self._meta = None
+        self._signature = None
+        self._arrays = None
+        self.hits = 0
+        self.appended = 0
+        self.rebuilds = 0
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.directory, "meta.json")
+
+    def _refresh(self):
+        """Re-read meta.json (and remap the columns) if another writer replaced it"""
+        try:
+            stat = os.stat(self.meta_path)
+        except FileNotFoundError:
+            self._meta = self._arrays = self._signature = None
+            return
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if signature == self._signature:
+            return
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if self._meta is None or meta["generation"] != self._meta["generation"]:
+            generation = os.path.join(self.directory, f"gen-{meta['generation']}")
+            self._arrays = {name: np.load(os.path.join(generation, f"{name}.npy"), mmap_mode="r+")
+                            for name in self.columns}
+        self._meta, self._signature = meta, signature
+
+    def _covers(self, close):
+        """True if the stored rows start with close"""
+        rows = len(close)
+        if self._meta is None or self._meta["rows"] < rows:
+            return False
+        if self._meta["rows"] == rows:
+            return fingerprint(close, rows) == self._meta["fingerprint"]
+        return fingerprint(close, rows) == fingerprint(self._arrays["close"], rows)
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize writers across worker processes (where fcntl is available)"""
+        os.makedirs(self.directory, exist_ok=True)
+        with file_lock(os.path.join(self.directory, ".lock")):
+            yield
+
+    def update(self, close, lineage=None):
+        """Store any bars of close not materialized yet and return its indicators (read-only views)
+
+        lineage is accepted as by IndicatorState.update() but not used: the
+        rows are shared with other processes, whose lineages are their own,
+        so the stored fingerprint is checked instead.
+        """
+        close = np.asarray(close, dtype=np.float64)
+        with self._lock:
+            self._refresh()
+            if self._covers(close):
+                self.hits += 1
+            else:
+                with self._file_lock():
+                    # Another process may have written them while we waited
+                    self._refresh()
+                    if not self._covers(close):
+                        self._write(close)
+            return self._snapshot(len(close))
+
+    def _write(self, close):
+        meta = self._meta
+        rows = len(close)
+        start = 0
+        if meta is not None:
+            if meta["rows"] <= rows and fingerprint(close, meta["rows"]) == meta["fingerprint"]:
+                start = meta["rows"]
+            else:
+                print(f"⚠️ Warning: Price history was rewritten, rebuilding features in {self.directory}")
+                self.rebuilds += 1
+
+        previous = {name: (self._arrays[name][:start] if start else np.empty(0)) for name in self.indicator_names}
+        values = advance_indicators(close, start, previous, self.sma_windows, self.macd_spans)
+        values["close"] = close[start:]
+        # Same as pct_change(): NaN for the very first bar
+        prior = close[start - 1:rows - 1] if start else np.concatenate(([np.nan], close[:-1]))
+        values["returns"] = close[start:] / prior - 1
+
+        if start and rows <= meta["capacity"]:
+            arrays, generation, capacity = self._arrays, meta["generation"], meta["capacity"]
+        else:
+            generation = meta["generation"] + 1 if meta is not None else 0
+            capacity = max(rows, 2 * meta["capacity"] if start else 0, MIN_CAPACITY)
+            arrays = self._allocate(generation, capacity)
+            if start:
+                for name in self.columns:
+                    arrays[name][:start] = self._arrays[name][:start]
+
+        for name in self.columns:
+            arrays[name][start:rows] = values[name]
+            arrays[name].flush()
+
+        meta = {
+            "rows": rows,
+            "capacity": capacity,
+            "generation": generation,
+            "fingerprint": fingerprint(close, rows),
+            "columns": self.columns,
+            "sma_windows": list(self.sma_windows),
+            "macd_spans": list(self.macd_spans),
+        }
+        write_meta(self.meta_path, meta)
+        self._prune(generation)
+
+        self.appended += rows - start
+        self._arrays, self._meta = arrays, meta
+        stat = os.stat(self.meta_path)
+        self._signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _allocate(self, generation, capacity):
+        directory = os.path.join(self.directory, f"gen-{generation}")
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        return {
+            name: np.lib.format.open_memmap(os.path.join(directory, f"{name}.npy"), mode="w+",
+                                            dtype=np.float64, shape=(capacity,))
+            for name in self.columns
+        }
+
+    def _prune(self, generation):
+        """Delete generations older than the previous one"""
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and entry.name.startswith("gen-"):
+                try:
+                    if int(entry.name[len("gen-"):]) < generation - 1:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                except ValueError:
+                    continue
+
+    def _snapshot(self, length):
+        snapshot = {}
+        for name in self.indicator_names + ["returns"]:
+            view = self._arrays[name][:length]
+            view.flags.writeable = False
+            snapshot[name] = view
+        return snapshot
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rows": self._meta["rows"] if self._meta is not None else 0,
+                "generation": self._meta["generation"] if self._meta is not None else None,
+                "hits": self.hits,
+                "appended": self.appended,
+                "rebuilds": self.rebuilds,
+            }
+
+
+class FeatureStore:
+    """FeatureSeries per symbol (None for the legacy CSV) for one parameter set
+
+    Drop-in for a PerSymbol of IndicatorState: store[symbol].update(close)
+    returns the same indicators (plus "returns"), but they persist on disk and
+    are shared by every worker process.
+    """
+
+    def __init__(self, directory_for, sma_windows=(50, 200), macd_spans=(12, 26, 9)):
+        self._directory_for = directory_for
+        self.sma_windows = tuple(sma_windows)
+        self.macd_spans = tuple(macd_spans)
+        self.key = parameter_key(self.sma_windows, self.macd_spans)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def __getitem__(self, symbol):
+        with self._lock:
+            series = self._series.get(symbol)
+            if series is None:
+                directory = os.path.join(self._directory_for(symbol), self.key)
+                series = self._series[symbol] = FeatureSeries(directory, self.sma_windows, self.macd_spans)
+            return series
+
+    def items(self):
+        with self._lock:
+            return list(self._series.items())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialize indicator features next to the stock data")
+    parser.add_argument("symbols", nargs="*",
+                        help="Tickers to materialize (default: every symbol in the store and the legacy CSV)")
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"),
+                        help="Data directory (default: data)")
+    parser.add_argument("--sma-windows", nargs="+", type=int, default=[50, 200])
+    parser.add_argument("--macd-spans", nargs=3, type=int, default=[12, 26, 9])
+    args = parser.parse_args()
+
+    store = FeatureStore(lambda symbol: feature_directory(args.data_dir, symbol), args.sma_windows, args.macd_spans)
+    symbols = SymbolStore(os.path.join(args.data_dir, "symbols"))
+    targets = [normalize_symbol(symbol) for symbol in args.symbols] or [None] + symbols.symbols()
+    for symbol in targets:
+        data = symbols.open(symbol) if symbol else MarketDataStore(os.path.join(args.data_dir, "stock_data.csv"))
+        if not data.exists():
+            print(f"⚠️ No stock data for {symbol or 'stock_data.csv'}, skipping")
+            continue
+        series = store[symbol]
+        series.update(data.get()["close"].to_numpy())
+        stats = series.stats()
+        print(f"✅ {symbol or 'stock_data.csv'}: {stats['rows']} rows ({stats['appended']} computed) "
+              f"in {series.directory}")
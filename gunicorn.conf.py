@@ -0,0 +1,49 @@
+"""gunicorn settings for the prediction API (gunicorn -c gunicorn.conf.py wsgi:app)
+
+Every setting can be overridden from the environment, so the same file serves
+a small Render instance and a bigger box.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 10000)}"
+
+# One process per core, each with a few threads for I/O-bound requests
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+
+# Import the app (and load models) once in the master; workers share it copy-on-write
+preload_app = True
+
+# Recycle workers to bound memory growth; jitter keeps them from restarting together
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+# Seconds a request may run, and how long a stopping worker may finish in-flight requests
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def on_starting(arbiter):
+    """Load the fork-safe models in the master before any worker exists"""
+    import server as api
+
+    for name in api.preload_model_names():
+        api.MODELS.get(name)
+    # Move everything loaded so far out of the GC's reach, so collections in the
+    # workers do not touch (and un-share) these pages
+    gc.freeze()
+
+
+def post_fork(arbiter, worker):
+    """Per-worker setup: fresh pools and threads, then warm whatever was not preloaded"""
+    import server as api
+
+    api.after_fork()
+    api.start_background_tasks(int(os.environ.get("PORT", 10000)))
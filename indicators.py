@@ -0,0 +1,181 @@
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Closes sampled (evenly spaced, first and last included) into the data fingerprint
+FINGERPRINT_SAMPLES = 32
+
+# close_checksum() wraps around at 2**64
+CHECKSUM_MODULUS = 2 ** 64
+
+
+class GrowableArray:
+    """1-D buffer (float64 by default) with amortised O(1) appends; views handed out stay valid"""
+
+    def __init__(self, capacity=256, dtype=np.float64):
+        self._data = np.empty(capacity, dtype=dtype)
+        self.length = 0
+
+    def extend(self, values):
+        needed = self.length + len(values)
+        if needed > len(self._data):
+            grown = np.empty(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self.length] = self._data[:self.length]
+            self._data = grown
+        self._data[self.length:needed] = values
+        self.length = needed
+
+    def view(self, length=None):
+        return self._data[:self.length if length is None else length]
+
+
+def close_checksum(close):
+    """Sum of the float64 bit patterns of close, modulo CHECKSUM_MODULUS
+
+    Integer sums are exact, so the checksums of consecutive chunks add up to
+    that of the whole series and a running checksum can be kept per append.
+    """
+    return int(np.ascontiguousarray(close, dtype=np.float64).view(np.uint64).sum(dtype=np.uint64))
+
+
+def sample_positions(rows):
+    """Indices of the FINGERPRINT_SAMPLES closes fingerprint() samples out of rows"""
+    return np.unique(np.linspace(0, rows - 1, FINGERPRINT_SAMPLES).astype(np.int64))
+
+
+def fingerprint(close, rows, checksum=None):
+    """Digest of close[:rows]: its length, FINGERPRINT_SAMPLES spread-out closes and their close_checksum()
+
+    The checksum catches a bar edited anywhere in the history at a fraction
+    of the cost of hashing every byte; pass it if it is already known.
+    """
+    digest = hashlib.blake2b(str(rows).encode(), digest_size=16)
+    if rows:
+        head = np.asarray(close[:rows], dtype=np.float64)
+        if checksum is None:
+            checksum = close_checksum(head)
+        digest.update(np.ascontiguousarray(head[sample_positions(rows)]).tobytes())
+        digest.update(checksum.to_bytes(8, "little"))
+    return digest.hexdigest()
+
+
+def _ema_continue(values, span, previous):
+    """EMA of values seeded with the last value of previous (no seed if it is empty)"""
+    if len(previous) == 0:
+        return pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
+    seeded = np.concatenate(([previous[-1]], values))
+    return pd.Series(seeded).ewm(span=span, adjust=False).mean().to_numpy()[1:]
+
+
+def advance_indicators(close, start, previous, sma_windows, macd_spans):
+    """SMA / EMA / MACD values for close[start:], continuing from the values for close[:start]
+
+    previous maps indicator names to their values for the first start bars;
+    only the last value of each EMA column is read. Each SMA needs the last
+    window-1 closes before start and each EMA carries its last value forward.
+    """
+    fast_span, slow_span, signal_span = macd_spans
+    new = close[start:]
+    values = {}
+    for window in sma_windows:
+        # Only the last window-1 known closes contribute to the new averages
+        lead = min(start, window - 1)
+        tail = pd.Series(close[start - lead:])
+        values[f"sma_{window}"] = tail.rolling(window=window).mean().to_numpy()[lead:]
+    for span in (fast_span, slow_span):
+        values[f"ema{span}"] = _ema_continue(new, span, previous[f"ema{span}"])
+    values["macd"] = values[f"ema{fast_span}"] - values[f"ema{slow_span}"]
+    values["signal_line"] = _ema_continue(values["macd"], signal_span, previous["signal_line"])
+    values["histogram"] = values["macd"] - values["signal_line"]
+    return values
+
+
+class IndicatorState:
+    """SMA / EMA / MACD values for one close-price series, advanced incrementally
+
+    Bar files only grow at the tail, so update() keeps the values computed so
+    far and only evaluates the newly appended rows: each SMA needs the last
+    window-1 closes and each EMA carries its last value forward. If the series
+    was rewritten rather than extended, the state is rebuilt from scratch.
+    Results match pandas rolling(window).mean() and ewm(span, adjust=False).
+
+    Pass the lineage of the data store the closes come from: while it stays
+    the same the store has only seen appends, so the processed bars are not
+    re-read and an update costs the new bars. Without a lineage the whole
+    prefix is checksummed against the running checksum of the processed bars.
+    """
+
+    def __init__(self, sma_windows=(50, 200), macd_spans=(12, 26, 9)):
+        self.sma_windows = tuple(sma_windows)
+        self.fast_span, self.slow_span, self.signal_span = macd_spans
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._close = GrowableArray()
+        self._sma = {window: GrowableArray() for window in self.sma_windows}
+        self._ema = {span: GrowableArray() for span in (self.fast_span, self.slow_span)}
+        self._macd = GrowableArray()
+        self._signal_line = GrowableArray()
+        self._histogram = GrowableArray()
+        # close_checksum() and fingerprint() of the closes processed so far, kept up to date per append
+        self._checksum = 0
+        self._fingerprint = None
+        # Data store lineage the closes were processed under (None if not given)
+        self._lineage = None
+
+    @property
+    def length(self):
+        return self._close.length
+
+    def _extends_history(self, close, lineage):
+        """True if close starts with the bars already processed (or a prefix of them)"""
+        n = min(self.length, len(close))
+        if n == 0:
+            return True
+        if lineage is not None and lineage == self._lineage:
+            # Only the tail can be new: check the shared bars at the sampled positions (last one included)
+            positions = sample_positions(n)
+            return close[positions].tobytes() == self._close.view()[positions].tobytes()
+        # The whole prefix counts: a corrected bar in the middle invalidates every later value
+        if n == self.length:
+            return fingerprint(close, n) == self._fingerprint
+        return fingerprint(close, n) == fingerprint(self._close.view(), n)
+
+    def update(self, close, lineage=None):
+        """Advance over any new bars in close and return the indicators for it"""
+        close = np.asarray(close, dtype=np.float64)
+        with self._lock:
+            if not self._extends_history(close, lineage):
+                print("⚠️ Warning: Price history was rewritten, rebuilding indicators")
+                self._reset()
+            self._lineage = lineage
+            if len(close) > self.length:
+                start = self.length
+                self._advance(close)
+                self._checksum = (self._checksum + close_checksum(close[start:])) % CHECKSUM_MODULUS
+                self._fingerprint = fingerprint(close, len(close), self._checksum)
+            return self._snapshot(len(close))
+
+    def _advance(self, close):
+        start = self.length
+        new_values = advance_indicators(close, start, self._snapshot(start), self.sma_windows,
+                                        (self.fast_span, self.slow_span, self.signal_span))
+        for window, buffer in self._sma.items():
+            buffer.extend(new_values[f"sma_{window}"])
+        for span, buffer in self._ema.items():
+            buffer.extend(new_values[f"ema{span}"])
+        self._macd.extend(new_values["macd"])
+        self._signal_line.extend(new_values["signal_line"])
+        self._histogram.extend(new_values["histogram"])
+        self._close.extend(close[start:])
+
+    def _snapshot(self, length):
+        snapshot = {f"sma_{window}": buffer.view(length) for window, buffer in self._sma.items()}
+        snapshot.update({f"ema{span}": buffer.view(length) for span, buffer in self._ema.items()})
+        snapshot["macd"] = self._macd.view(length)
+        snapshot["signal_line"] = self._signal_line.view(length)
+        snapshot["histogram"] = self._histogram.view(length)
+        return snapshot
@@ -0,0 +1,432 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from indicators import GrowableArray
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path (created if missing) across worker processes where fcntl is available"""
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class MarketDataStore:
+    """Process-wide cache for a stock data CSV, reloaded only when the file changes
+
+    The DataFrame handed out by get() is shared between requests and must be
+    treated as read-only: derive new frames with .assign()/.copy() instead of
+    adding columns in place.
+
+    version changes on every reload; lineage only changes when a reload is not
+    a pure append of new rows, so results computed for earlier rows of the same
+    lineage stay valid.
+
+    append() writes live bars to the file (same lineage, new version), so
+    every worker process sharing it sees them on its next load.
+    """
+
+    # How many times to re-read a file that keeps changing while we parse it
+    MAX_READ_ATTEMPTS = 3
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # (frame, stat signature, lineage), swapped as one reference
+        self._current = (None, None, 0)
+        # Growable column buffers backing the frame once bars are appended: (frame, {column: buffer})
+        self._live = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.appended = 0
+
+    @staticmethod
+    def _stat_signature(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _format_version(signature):
+        if signature is None:
+            return None
+        return f"{signature[0]:x}-{signature[1]:x}"
+
+    @property
+    def version(self):
+        """Fingerprint of the currently cached contents (None before first load)"""
+        return self._format_version(self._current[1])
+
+    @property
+    def lineage(self):
+        return self._current[2]
+
+    @property
+    def lock_path(self):
+        """Lock file serializing writers of this data across processes"""
+        return f"{self.path}.lock"
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def disk_size(self):
+        return os.path.getsize(self.path)
+
+    def get(self):
+        """Return the cached DataFrame, re-parsing the CSV if its mtime or size changed
+
+        Raises FileNotFoundError if the file does not exist.
+        """
+        return self.snapshot()[0]
+
+    def snapshot(self):
+        """Return (frame, version, lineage) for the same consistent load"""
+        frame, signature, lineage = self._load()
+        return frame, self._format_version(signature), lineage
+
+    def _load(self):
+        signature = self._stat_signature(self.path)
+        current = self._current
+        if current[0] is not None and signature == current[1]:
+            self.hits += 1
+            return current
+
+        with self._lock:
+            # Another request may have reloaded while we waited for the lock
+            signature = self._stat_signature(self.path)
+            current = self._current
+            if current[0] is not None and signature == current[1]:
+                self.hits += 1
+                return current
+
+            self.misses += 1
+            try:
+                frame, signature = self._read_stable()
+            except Exception as e:
+                # A partially written file must not replace a good cached copy
+                if current[0] is None:
+                    raise
+                print(f"⚠️ Warning: Keeping cached stock data, reload failed: {str(e)}")
+                return current
+
+            old_frame, _, lineage = current
+            if old_frame is not None:
+                self.reloads += 1
+            lineage = self._next_lineage(old_frame, lineage, frame)
+            self._current = (frame, signature, lineage)
+            self._live = None
+            print(f"✅ Loaded stock data from {self.path} ({len(frame)} rows, version {self.version})")
+            return self._current
+
+    def _read(self):
+        return pd.read_csv(self.path)
+
+    def append(self, rows):
+        """Append bars (a DataFrame with the file's columns) to the data on disk
+
+        Returns (frame, version, lineage) including the new rows. Other workers
+        reload the file; this one keeps its columns in growable buffers with the
+        frame a view over them, so its cost is proportional to the new rows.
+        """
+        with file_lock(self.lock_path):
+            # Pick up bars other workers appended first
+            self._load()
+            with self._lock:
+                return self._append_locked(rows)
+
+    def _append_locked(self, rows):
+        frame, signature, lineage = self._current
+        missing = [col for col in frame.columns if col not in rows.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        if len(rows) == 0:
+            return frame, self._format_version(signature), lineage
+        rows = rows[list(frame.columns)].astype(frame.dtypes.to_dict())
+        self._write_rows(frame, rows)
+
+        if self._live is None or self._live[0] is not frame:
+            # First append since the last load: copy the history into buffers once
+            buffers = {}
+            for col in frame.columns:
+                values = frame[col].to_numpy()
+                buffers[col] = GrowableArray(capacity=max(2 * len(values), 256), dtype=values.dtype)
+                buffers[col].extend(values)
+        else:
+            buffers = self._live[1]
+        for col, buffer in buffers.items():
+            buffer.extend(rows[col].to_numpy(dtype=buffer.view().dtype))
+
+        frame = pd.DataFrame({col: buffer.view() for col, buffer in buffers.items()}, copy=False)
+        signature = self._stat_signature(self.path)
+        self.appended += len(rows)
+        self._current = (frame, signature, lineage)
+        self._live = (frame, buffers)
+        return frame, self._format_version(signature), lineage
+
+    def _write_rows(self, frame, rows):
+        """Append rows to the CSV (the caller holds the file lock)"""
+        with open(self.path, "rb") as f:
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+        text = rows.to_csv(header=False, index=False, lineterminator="\n")
+        with open(self.path, "a", encoding="utf-8", newline="") as f:
+            # The last line may lack its newline (e.g. a file saved by a spreadsheet)
+            f.write(("\n" if last not in (b"", b"\n") else "") + text)
+
+    def _read_stable(self):
+        """Parse the file, retrying if it changed underneath the read"""
+        for _ in range(self.MAX_READ_ATTEMPTS):
+            before = self._stat_signature(self.path)
+            frame = self._read()
+            after = self._stat_signature(self.path)
+            if before == after:
+                return frame, after
+        raise IOError(f"Stock data file {self.path} kept changing while being read")
+
+    def _next_lineage(self, old_frame, lineage, frame):
+        if old_frame is None or self._is_append(old_frame, frame):
+            return lineage
+        return lineage + 1
+
+    @staticmethod
+    def _is_append(old, new):
+        """True if new holds every row of old, unchanged, followed by new rows"""
+        if len(new) < len(old) or list(new.columns) != list(old.columns):
+            return False
+        head = new.iloc[:len(old)]
+        return all(np.array_equal(head[col].to_numpy(), old[col].to_numpy()) for col in old.columns)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "appended": self.appended,
+            "rows": len(self._current[0]) if self._current[0] is not None else 0,
+            "version": self.version,
+            "lineage": self.lineage,
+        }
+
+
+# Ticker symbols double as directory names, so keep them to a safe alphabet
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9][A-Z0-9.\-]{0,14}$")
+
+OHLCV_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+# Smallest number of rows allocated for a file of columns
+MIN_CAPACITY = 1024
+
+
+def write_meta(path, meta):
+    """Atomically replace the meta.json at path"""
+    staging = f"{path}.tmp-{os.getpid()}"
+    with open(staging, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(staging, path)
+
+
+def write_columns(target, frame, meta):
+    """Replace directory target with frame's meta["columns"] as .npy files plus meta.json (atomic swap)
+
+    Each column is preallocated to meta["capacity"] rows (at least the frame's
+    length) so later bars can be written in place past the valid ones.
+    """
+    staging = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    meta = dict(meta, capacity=max(meta.get("capacity", 0), len(frame)))
+    for name in meta["columns"]:
+        values = frame[name].to_numpy()
+        column = np.lib.format.open_memmap(os.path.join(staging, f"{name}.npy"), mode="w+",
+                                           dtype=values.dtype, shape=(meta["capacity"],))
+        column[:len(values)] = values
+        column.flush()
+        del column
+    write_meta(os.path.join(staging, "meta.json"), meta)
+
+    # Readers keep their mappings of the old files; new readers see a new meta.json
+    retired = f"{target}.old-{os.getpid()}"
+    if os.path.exists(target):
+        os.replace(target, retired)
+    os.replace(staging, target)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def normalize_symbol(symbol):
+    """Upper-case and validate a ticker; raises ValueError for unsafe names"""
+    symbol = symbol.strip().upper()
+    if not SYMBOL_PATTERN.match(symbol):
+        raise ValueError(f"Invalid symbol: {symbol!r}")
+    return symbol
+
+
+class ColumnarMarketData(MarketDataStore):
+    """One symbol's OHLCV stored as a memory-mapped .npy file per column
+
+    Layout: <directory>/meta.json plus <column>.npy. meta.json is written last,
+    so its mtime/size is the version. Opening a symbol reads nothing; columns
+    are mapped on first access and the shared frame is a zero-copy (read-only)
+    view over the mappings, so pages are only loaded as columns are touched.
+
+    Columns are preallocated to meta["capacity"] rows of which meta["rows"]
+    are valid. Appended bars are written in place past the valid rows and
+    meta.json is then replaced with the new row count, so an append costs the
+    new rows; only once the capacity is used up are the columns copied, at
+    twice the size, and swapped in like an import (same lineage).
+    """
+
+    def __init__(self, directory):
+        super().__init__(os.path.join(directory, "meta.json"))
+        self.directory = directory
+        self._meta = {}
+
+    @property
+    def lock_path(self):
+        # Next to the directory, which is replaced on every write
+        return f"{self.directory}.lock"
+
+    def disk_size(self):
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+
+    def _read_meta(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def column(self, name):
+        """Memory-map a single column without building the frame"""
+        return np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")
+
+    def _read(self):
+        meta = self._read_meta()
+        self._meta = meta
+        columns = {name: self.column(name)[:meta["rows"]] for name in meta["columns"]}
+        return pd.DataFrame(columns, copy=False)
+
+    def _next_lineage(self, old_frame, lineage, frame):
+        # The importer records rewrites in meta.json, no need to compare rows
+        return self._meta.get("lineage", 0)
+
+    def _write_rows(self, frame, rows):
+        meta = self._read_meta()
+        start, end = meta["rows"], meta["rows"] + len(rows)
+        # Stores written before columns had spare capacity hold exactly their rows
+        if end > meta.get("capacity", start):
+            capacity = max(end, 2 * meta.get("capacity", start), MIN_CAPACITY)
+            write_columns(self.directory, pd.concat([frame, rows], ignore_index=True),
+                          dict(meta, rows=end, capacity=capacity))
+            return
+
+        for name in meta["columns"]:
+            column = np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r+")
+            column[start:end] = rows[name].to_numpy(dtype=column.dtype)
+            column.flush()
+            del column
+        # Readers only look at the rows meta.json counts, so the new ones appear all at once
+        write_meta(self.path, dict(meta, rows=end))
+
+
+class SymbolStore:
+    """Symbol-keyed columnar market data under one root directory"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._open = {}
+
+    def directory(self, symbol):
+        return os.path.join(self.root, normalize_symbol(symbol))
+
+    def symbols(self):
+        return sorted(
+            name for name in os.listdir(self.root)
+            if SYMBOL_PATTERN.match(name) and os.path.exists(os.path.join(self.root, name, "meta.json"))
+        )
+
+    def open(self, symbol):
+        """Return the (cached) ColumnarMarketData for symbol; cheap, reads nothing"""
+        symbol = normalize_symbol(symbol)
+        with self._lock:
+            data = self._open.get(symbol)
+            if data is None:
+                data = self._open[symbol] = ColumnarMarketData(self.directory(symbol))
+            return data
+
+    def opened(self):
+        """(symbol, ColumnarMarketData) for every symbol opened so far"""
+        with self._lock:
+            return list(self._open.items())
+
+    def import_frame(self, symbol, frame):
+        """Write frame's OHLCV columns as the new contents of symbol (atomic swap)"""
+        symbol = normalize_symbol(symbol)
+        missing = [col for col in OHLCV_COLUMNS if col not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+        target = self.directory(symbol)
+        with file_lock(f"{target}.lock"):
+            lineage = 0
+            if os.path.exists(os.path.join(target, "meta.json")):
+                with open(os.path.join(target, "meta.json"), "r", encoding="utf-8") as f:
+                    lineage = json.load(f).get("lineage", 0) + 1
+            meta = {"symbol": symbol, "rows": len(frame), "capacity": max(len(frame), MIN_CAPACITY),
+                    "columns": OHLCV_COLUMNS, "lineage": lineage}
+            write_columns(target, frame, meta)
+        return meta
+
+    def import_csv(self, symbol, csv_path):
+        """One-time conversion of an OHLCV CSV into the columnar layout"""
+        return self.import_frame(symbol, pd.read_csv(csv_path))
+
+
+class PerSymbol:
+    """Lazily created state object per symbol (None stands for the legacy CSV)"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def __getitem__(self, symbol):
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is None:
+                state = self._states[symbol] = self._factory()
+            return state
+
+    def items(self):
+        with self._lock:
+            return list(self._states.items())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import OHLCV CSV files into the columnar symbol store")
+    parser.add_argument("symbol", help="Ticker to store the data under, e.g. AAPL")
+    parser.add_argument("csv_path", help="CSV with timestamp,open,high,low,close,volume columns")
+    parser.add_argument("--root", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "symbols"),
+                        help="Symbol store directory (default: data/symbols)")
+    args = parser.parse_args()
+
+    meta = SymbolStore(args.root).import_csv(args.symbol, args.csv_path)
+    print(f"✅ Imported {meta['rows']} rows for {meta['symbol']} into {args.root}")
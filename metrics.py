@@ -0,0 +1,220 @@
+import bisect
+import math
+import threading
+import time
+
+# Seconds; request stages range from sub-millisecond cache hits to multi-second inference
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RENDER_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Histogram:
+    """One label combination of a histogram: cumulative buckets, sum and count"""
+
+    def __init__(self, buckets):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def samples(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        buckets = []
+        for bound, count in zip(list(self._buckets) + [math.inf], counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return buckets, total, cumulative
+
+
+class _Counter:
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def value(self):
+        return self._value
+
+
+class _Gauge(_Counter):
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class _Family:
+    """A named metric with one child per label combination"""
+
+    def __init__(self, name, help_text, kind, labelnames, factory):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            if self.kind == "histogram":
+                buckets, total, count = child.samples()
+                for bound, cumulative in buckets:
+                    labels = _format_labels(self.labelnames, values, ("le", _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, values)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+            else:
+                lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value())}")
+        return lines
+
+
+class _RequestTrace:
+    __slots__ = ("route", "started", "stage", "stage_started", "spans")
+
+    def __init__(self, route):
+        self.route = route
+        self.started = self.stage_started = time.perf_counter()
+        self.stage = None
+        self.spans = []
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms rendered in the Prometheus text format
+
+    Request handlers mark the stage they are entering with stage("load"),
+    stage("predict"), ...; each stage lasts until the next mark or the end
+    of the request and is recorded per route. When the registry is disabled
+    every call returns straight away, so instrumentation can stay in place.
+    """
+
+    def __init__(self, enabled=True, prefix="algotrade_"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._families = []
+        self._collectors = []
+        self._local = threading.local()
+        self.stage_seconds = self.histogram(
+            "stage_duration_seconds", "Time spent in each stage of a request", ["route", "stage"])
+
+    def _add(self, name, help_text, kind, labelnames, factory):
+        family = _Family(self.prefix + name, help_text, kind, labelnames, factory)
+        self._families.append(family)
+        return family
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        buckets = tuple(sorted(buckets))
+        return self._add(name, help_text, "histogram", labelnames, lambda: _Histogram(buckets))
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(name, help_text, "counter", labelnames, _Counter)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(name, help_text, "gauge", labelnames, _Gauge)
+
+    def collect(self, collector):
+        """Add a scrape-time source of (name, kind, help, [(labels dict, value), ...]) tuples
+
+        For numbers that already live elsewhere (cache and model stats): they
+        are read when /metrics is scraped instead of being mirrored on every
+        update.
+        """
+        self._collectors.append(collector)
+
+    def begin_request(self, route):
+        if not self.enabled:
+            return
+        self._local.trace = _RequestTrace(route)
+
+    def stage(self, name):
+        """End the current stage of this thread's request (if any) and start name"""
+        if not self.enabled:
+            return
+        trace = getattr(self._local, "trace", None)
+        if trace is None:
+            return
+        now = time.perf_counter()
+        if trace.stage is not None:
+            trace.spans.append((trace.stage, now - trace.stage_started))
+        trace.stage = name
+        trace.stage_started = now
+
+    def end_request(self):
+        """Close the request's last stage and record its spans; returns ([(stage, seconds)], total seconds)"""
+        if not self.enabled:
+            return [], None
+        trace = getattr(self._local, "trace", None)
+        if trace is None:
+            return [], None
+        self._local.trace = None
+        now = time.perf_counter()
+        if trace.stage is not None:
+            trace.spans.append((trace.stage, now - trace.stage_started))
+        for stage, seconds in trace.spans:
+            self.stage_seconds.labels(trace.route, stage).observe(seconds)
+        return trace.spans, now - trace.started
+
+    def render(self):
+        """Everything in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for family in self._families:
+            lines.extend(family.render())
+        for collector in self._collectors:
+            try:
+                collected = collector()
+            except Exception as e:
+                print(f"⚠️ Warning: metrics collector failed: {str(e)}")
+                continue
+            for name, kind, help_text, samples in collected:
+                name = self.prefix + name
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def server_timing(spans, total=None):
+    """Server-Timing header value for a request's spans (durations in milliseconds)"""
+    entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in spans]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
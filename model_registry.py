@@ -0,0 +1,242 @@
+import hashlib
+import os
+import threading
+import time
+import traceback
+
+
+def _rss_bytes():
+    """Resident set size of this process (0 if it cannot be read)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS, but still a usable upper bound per load
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+def _file_signature(paths):
+    """(mtime_ns, size) of every artifact file, to notice when one is replaced"""
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _content_version(paths):
+    """Short content hash over all artifact files of a model"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class _Loaded:
+    """One loaded version of a model; replaced as a whole, never mutated"""
+
+    def __init__(self, value, version, signature, error, load_seconds, memory_bytes):
+        self.value = value
+        self.version = version
+        self.signature = signature
+        self.error = error
+        self.load_seconds = load_seconds
+        self.memory_bytes = memory_bytes
+        self.loaded_at = time.time()
+
+
+class _Entry:
+    def __init__(self, name, loader, paths):
+        self.name = name
+        self.loader = loader
+        self.paths = paths
+        self.lock = threading.Lock()
+        self.current = None
+        self.reloads = 0
+
+
+class ModelRegistry:
+    """Models registered by name and file path, loaded on first use
+
+    get() loads a model at most once, however many threads ask for it at the
+    same time (the others wait for the first load and share its result). A
+    failed load is remembered and get() returns None, like the old module-level
+    globals, so routes keep answering "model not loaded" without retrying the
+    load on every request.
+
+    reload() loads a replaced artifact next to the live model and then swaps
+    the reference; requests that already fetched the old model finish on it.
+    Each load carries a content-hash version so responses can name the
+    artifact they came from.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._watcher = None
+
+    def register(self, name, loader, *paths):
+        """Register loader(*paths) under name; nothing is loaded yet"""
+        with self._lock:
+            self._entries[name] = _Entry(name, loader, paths)
+
+    def names(self):
+        with self._lock:
+            return list(self._entries)
+
+    def _entry(self, name):
+        with self._lock:
+            return self._entries[name]
+
+    def is_loaded(self, name):
+        return self._entry(name).current is not None
+
+    def get(self, name):
+        """Return the loaded model (loading it now if needed), or None if loading failed"""
+        return self.snapshot(name)[0]
+
+    def snapshot(self, name):
+        """Return (model, version) from the same load; (None, None) if loading failed"""
+        entry = self._entry(name)
+        current = entry.current
+        if current is None:
+            with entry.lock:
+                # Another thread may have finished the load while we waited
+                current = entry.current
+                if current is None:
+                    current = entry.current = self._load(entry)
+        return current.value, current.version
+
+    def _load(self, entry):
+        """Load entry's artifacts into a new _Loaded (errors are recorded, not raised)"""
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        value, version, signature, error = None, None, None, None
+        try:
+            signature = _file_signature(entry.paths)
+            value = entry.loader(*entry.paths)
+            version = _content_version(entry.paths)
+            if _file_signature(entry.paths) != signature:
+                raise IOError("Model files changed while being loaded")
+        except FileNotFoundError as e:
+            value, error = None, e
+            print(f"⚠️ Warning: Model file for '{entry.name}' not found: {str(e)}")
+        except Exception as e:
+            value, error = None, e
+            print(f"⚠️ Warning: Error loading model '{entry.name}': {str(e)}")
+            traceback.print_exc()
+
+        load_seconds = time.perf_counter() - started
+        # Process-wide RSS delta: approximate if other loads run concurrently
+        memory_bytes = max(_rss_bytes() - rss_before, 0)
+        if error is None:
+            print(f"✅ Model '{entry.name}' version {version} loaded in {load_seconds:.2f}s "
+                  f"(+{memory_bytes / (1024 * 1024):.1f} MB)")
+        return _Loaded(value, version, signature, error, load_seconds, memory_bytes)
+
+    def changed(self, name):
+        """True if the artifact files differ from the ones currently loaded"""
+        current = self._entry(name).current
+        if current is None:
+            return False
+        try:
+            return _file_signature(self._entry(name).paths) != current.signature
+        except OSError:
+            # A file that is missing mid-replace is picked up on the next check
+            return False
+
+    def reload(self, name, force=False):
+        """Load name's artifacts next to the live model and swap them in
+
+        Only reloads if the files changed (or force). A failed reload keeps the
+        live model. Returns (reloaded, version, error).
+        """
+        entry = self._entry(name)
+        with entry.lock:
+            current = entry.current
+            if current is None:
+                # Never loaded: the first get() will load the new files anyway
+                return False, None, None
+            if not force and not self.changed(name):
+                return False, current.version, None
+
+            loaded = self._load(entry)
+            if loaded.error is not None and current.error is None:
+                print(f"⚠️ Warning: Keeping model '{name}' version {current.version}, reload failed")
+                return False, current.version, str(loaded.error)
+            entry.current = loaded
+            entry.reloads += 1
+            return True, loaded.version, None
+
+    def reload_changed(self, names=None, force=False):
+        """reload() every (or each named) model; returns {name: result dict}"""
+        results = {}
+        for name in self.names() if names is None else names:
+            reloaded, version, error = self.reload(name, force=force)
+            results[name] = {"reloaded": reloaded, "version": version, "error": error}
+        return results
+
+    def watch(self, interval=5.0):
+        """Poll artifact files every interval seconds and reload loaded models that changed"""
+        def run():
+            while True:
+                time.sleep(interval)
+                for name in self.names():
+                    try:
+                        if self.changed(name):
+                            self.reload(name)
+                    except Exception as e:
+                        print(f"⚠️ Warning: Error reloading model '{name}': {str(e)}")
+
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=run, name="model-watcher", daemon=True)
+                self._watcher.start()
+            return self._watcher
+
+    def after_fork(self):
+        """Forget the parent's watcher thread; call in a freshly forked worker"""
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def warm(self, names=None, after=None):
+        """Load models in a background thread, once after() (if given) returns; returns the thread"""
+        names = self.names() if names is None else list(names)
+
+        def run():
+            if after is not None:
+                after()
+            for name in names:
+                try:
+                    self.get(name)
+                except KeyError:
+                    print(f"⚠️ Warning: Cannot warm unknown model '{name}'")
+
+        thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        stats = {}
+        for entry in entries:
+            current = entry.current
+            stats[entry.name] = {
+                "loaded": current is not None and current.error is None,
+                "version": current.version if current is not None else None,
+                "error": str(current.error) if current is not None and current.error is not None else None,
+                "paths": [os.path.basename(path) for path in entry.paths],
+                "load_seconds": round(current.load_seconds, 4) if current is not None else None,
+                "memory_mb": round(current.memory_bytes / (1024 * 1024), 2) if current is not None else None,
+                "loaded_at": current.loaded_at if current is not None else None,
+                "reloads": entry.reloads,
+            }
+        return stats
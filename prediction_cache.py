@@ -0,0 +1,49 @@
+import threading
+
+from indicators import GrowableArray
+
+
+class WindowPredictionCache:
+    """Model outputs for sliding windows over a series that only grows at the tail
+
+    Entries are keyed by (data key, window end index): the window ending at
+    index i covers series[i - look_back:i] and predicts series[i]. The data key
+    identifies the history lineage and the model that produced the outputs;
+    when it changes the cache starts over. As long as it stays the same, a call
+    only runs the model on windows whose end index has not been seen before.
+    """
+
+    def __init__(self, look_back):
+        self.look_back = look_back
+        self._lock = threading.Lock()
+        self._key = None
+        self._predictions = GrowableArray()
+        self.windows_predicted = 0
+        self.windows_reused = 0
+
+    def predictions(self, key, series, predict_windows):
+        """Return predictions for every window end index in [look_back, len(series))
+
+        predict_windows(series, first_end, last_end) must return one prediction
+        per window end in [first_end, last_end).
+        """
+        total = max(len(series) - self.look_back, 0)
+        with self._lock:
+            if key != self._key:
+                self._key = key
+                self._predictions = GrowableArray()
+
+            cached = self._predictions.length
+            if total > cached:
+                first_end = self.look_back + cached
+                self._predictions.extend(predict_windows(series, first_end, len(series)))
+                self.windows_predicted += total - cached
+            self.windows_reused += min(cached, total)
+            return self._predictions.view(total)
+
+    def stats(self):
+        return {
+            "cached_windows": self._predictions.length,
+            "windows_predicted": self.windows_predicted,
+            "windows_reused": self.windows_reused,
+        }
@@ -0,0 +1,239 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+PROFILE_MODES = ("cprofile", "sample")
+
+
+class _StackSampler:
+    """Samples the stacks of a few threads at a fixed interval (collapsed-stack output)
+
+    thread_ids maps idents to names; threads whose name starts with one of
+    thread_names are sampled as well.
+    """
+
+    def __init__(self, thread_ids, thread_names, interval):
+        self.thread_ids = thread_ids
+        self.thread_names = thread_names
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _targets(self):
+        targets = dict(self.thread_ids)
+        for thread in threading.enumerate():
+            if thread.name.startswith(self.thread_names):
+                targets[thread.ident] = thread.name
+        return targets
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            # Looked up every time: a named thread may only start during the request
+            for ident, name in self._targets().items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed format, one "frame;frame;frame count" line per stack"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profile:
+    """One profiled request: a cProfile or stack-sampling profile plus tracemalloc allocations"""
+
+    def __init__(self, profile_id, mode, label, memory_top, sample_interval, sample_threads):
+        self.id = profile_id
+        self.mode = mode
+        self.label = label
+        self.memory_top = memory_top
+        self._sample_interval = sample_interval
+        self._sample_threads = tuple(sample_threads)
+        self._profiler = None
+        self._sampler = None
+        self._owns_tracemalloc = False
+        self._started = None
+        self.seconds = None
+        self.memory = None
+
+    def start(self):
+        if self.memory_top and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._started = time.perf_counter()
+        if self.mode == "sample":
+            current = threading.current_thread()
+            self._sampler = _StackSampler({current.ident: current.name}, self._sample_threads,
+                                          self._sample_interval)
+            self._sampler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        self.seconds = time.perf_counter() - self._started
+
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ])
+            current, peak = tracemalloc.get_traced_memory()
+            self.memory = {
+                "traced_mb": round(current / (1024 * 1024), 3),
+                "peak_mb": round(peak / (1024 * 1024), 3),
+                "top": [
+                    {"location": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                    for stat in snapshot.statistics("lineno")[:self.memory_top]
+                ],
+            }
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+
+    def top_functions(self, limit=30):
+        """Text report: functions by cumulative time (cprofile) or hottest leaf frames (sample)"""
+        if self._profiler is not None:
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+        leaves = Counter()
+        for stack, count in self._sampler.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = max(self._sampler.samples, 1)
+        # Each sampled thread contributes one leaf per sample, so shares can add up to more than 100%
+        lines = [f"{self._sampler.samples} samples every {self._sample_interval * 1000:g} ms, % of samples per leaf frame"]
+        lines += [f"{count / total:7.1%}  {frame}" for frame, count in leaves.most_common(limit)]
+        return "\n".join(lines) + "\n"
+
+
+class RequestProfiler:
+    """Runs at most one profile at a time and keeps the last `keep` results in a directory
+
+    Each profile is stored as <id>.pstats (cprofile) or <id>.collapsed
+    (sample, for flamegraph.pl / speedscope), <id>.txt (readable report) and
+    <id>.json (summary with the allocation top-N). tracemalloc is process-wide,
+    so allocations from concurrent requests show up in the memory top-N too.
+    """
+
+    def __init__(self, directory, keep=50, memory_top=20, sample_interval=0.001, sample_threads=()):
+        self.directory = directory
+        self.keep = keep
+        self.memory_top = memory_top
+        self.sample_interval = sample_interval
+        self.sample_threads = tuple(sample_threads)
+        self._lock = threading.Lock()
+
+    def start(self, mode, label):
+        """Start a profile of the calling thread, or return None if another one is running"""
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (use one of: {', '.join(PROFILE_MODES)})")
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            safe_label = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-") or "request"
+            profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_label}-{uuid.uuid4().hex[:6]}"
+            profile = Profile(profile_id, mode, label, self.memory_top, self.sample_interval, self.sample_threads)
+            profile.start()
+            return profile
+        except Exception:
+            self._lock.release()
+            raise
+
+    def finish(self, profile):
+        """Stop profile, write its files and return the summary"""
+        try:
+            profile.stop()
+        finally:
+            self._lock.release()
+
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile.id)
+        files = [f"{profile.id}.txt", f"{profile.id}.json"]
+        if profile.mode == "cprofile":
+            profile._profiler.dump_stats(f"{base}.pstats")
+            files.insert(0, f"{profile.id}.pstats")
+        else:
+            with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+                f.write(profile._sampler.collapsed())
+            files.insert(0, f"{profile.id}.collapsed")
+
+        summary = {
+            "id": profile.id,
+            "mode": profile.mode,
+            "label": profile.label,
+            "seconds": round(profile.seconds, 6),
+            "created_at": time.time(),
+            "files": files,
+            "memory": profile.memory,
+        }
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(f"{profile.label} ({profile.mode}, {profile.seconds * 1000:.1f} ms)\n\n")
+            f.write(profile.top_functions())
+            if profile.memory is not None:
+                f.write(f"\nAllocations still live at the end (peak {profile.memory['peak_mb']} MB):\n")
+                for entry in profile.memory["top"]:
+                    f.write(f"{entry['size_kb']:>10.1f} KiB {entry['count']:>8}  {entry['location']}\n")
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        self._prune()
+        return summary
+
+    def _prune(self):
+        """Delete all but the newest `keep` profiles"""
+        summaries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in summaries[self.keep:]:
+            profile_id = entry.name[:-len(".json")]
+            for suffix in (".json", ".txt", ".pstats", ".collapsed"):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + suffix))
+                except OSError:
+                    pass
+
+    def list(self):
+        """Summaries of the stored profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        summaries.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(summaries, key=lambda summary: summary.get("created_at", 0), reverse=True)
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def response_key(*parts):
+    """Content address of a response: same route, params, data and model version -> same key"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+class ResponseCache:
+    """Bounded LRU cache of response bodies, in memory or in a directory
+
+    Keys are content addresses (see response_key), so an entry never goes
+    stale: changed inputs produce a different key and the old entry simply
+    ages out. With a directory, bodies are written once via temp file +
+    atomic rename as <key>.json and picked up again after a restart; several
+    processes may share the directory.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=64 * 1024 * 1024, directory=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._lock = threading.Lock()
+        # key -> (body bytes or None when on disk, size, meta), least recently used first
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._scan()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _meta_path(self, key):
+        return os.path.join(self.directory, f"{key}.meta")
+
+    def _scan(self):
+        """Pick up entries left by a previous run, oldest first"""
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".json"):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name[:-len(".json")], stat.st_size))
+            elif entry.is_file() and entry.name.endswith(".tmp"):
+                # Left over from a write that died halfway
+                os.remove(entry.path)
+        with self._lock:
+            for _, key, size in sorted(found):
+                self._remember(key, None, size, self._read_meta(key))
+            self._evict()
+
+    def _read_meta(self, key):
+        try:
+            with open(self._meta_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _remember(self, key, body, size, meta):
+        if key in self._entries:
+            self._total_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (body, size, meta)
+        self._total_bytes += size
+
+    def get(self, key):
+        """Return (body, meta) for key, or None; counts as a use for LRU purposes"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            body, _, meta = entry
+        if body is None:
+            try:
+                with open(self._path(key), "rb") as f:
+                    body = f.read()
+            except OSError:
+                # Evicted by another process sharing the directory
+                with self._lock:
+                    self._forget(key)
+                    self.misses += 1
+                return None
+        with self._lock:
+            self.hits += 1
+        return body, meta
+
+    def put(self, key, body, meta=None):
+        meta = meta or {}
+        if self.directory:
+            self._write(key, body, meta)
+            stored = None
+        else:
+            stored = body
+        with self._lock:
+            self._remember(key, stored, len(body), meta)
+            self._evict()
+
+    def _write(self, key, body, meta):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        meta_tmp = f"{self._meta_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        # Meta first: a body on disk always has its meta next to it
+        os.replace(meta_tmp, self._meta_path(key))
+        os.replace(tmp_path, path)
+
+    def record_not_modified(self):
+        """Count a conditional request answered with 304 without touching the cache"""
+        with self._lock:
+            self.not_modified += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._forget(key)
+
+    def _forget(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+        if self.directory:
+            for path in (self._path(key), self._meta_path(key)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _evict(self):
+        """Drop least recently used entries until both limits hold (lock held)"""
+        while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            key = next(iter(self._entries))
+            self._forget(key)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "disk" if self.directory else "memory",
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+            }
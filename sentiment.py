@@ -0,0 +1,191 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from market_data import MarketDataStore
+
+# Feature columns sentiment_model.pkl was trained on, in order
+SENTIMENT_FEATURES = ["Compound", "Positive", "Negative", "Neutral", "Post_Count", "Close", "Volume", "Returns"]
+TEXT_FEATURES = ["Compound", "Positive", "Negative", "Neutral"]
+
+# Small finance lexicon on VADER's -4..4 valence scale
+LEXICON = {
+    "beat": 2.0, "beats": 2.0, "boost": 1.8, "boosts": 1.8, "bullish": 2.5, "buy": 1.5, "climb": 1.5,
+    "climbs": 1.5, "gain": 1.8, "gains": 1.8, "growth": 1.8, "high": 1.0, "higher": 1.2, "improve": 1.7,
+    "improves": 1.7, "innovative": 1.8, "jump": 1.8, "jumps": 1.8, "outperform": 2.2, "optimistic": 2.0,
+    "positive": 2.0, "profit": 1.9, "profits": 1.9, "rally": 2.2, "rallies": 2.2, "record": 1.5,
+    "rebound": 1.8, "rise": 1.5, "rises": 1.5, "soar": 2.5, "soars": 2.5, "strong": 1.9, "surge": 2.3,
+    "surges": 2.3, "upbeat": 2.0, "upgrade": 2.2, "upgrades": 2.2, "win": 2.0, "wins": 2.0,
+    "bearish": -2.5, "cut": -1.5, "cuts": -1.5, "decline": -1.8, "declines": -1.8, "delay": -1.4,
+    "delays": -1.4, "downgrade": -2.2, "downgrades": -2.2, "drop": -1.8, "drops": -1.8, "fall": -1.7,
+    "falls": -1.7, "fear": -2.2, "fears": -2.2, "fine": -1.0, "fined": -1.8, "fraud": -3.0, "lawsuit": -2.0,
+    "loss": -2.0, "losses": -2.0, "low": -1.0, "lower": -1.2, "miss": -1.8, "misses": -1.8, "negative": -2.0,
+    "plunge": -2.8, "plunges": -2.8, "probe": -1.6, "recall": -1.8, "recession": -2.5, "risk": -1.2,
+    "risks": -1.2, "sell": -1.5, "selloff": -2.4, "slump": -2.3, "slumps": -2.3, "tariff": -1.3,
+    "tariffs": -1.3, "tumble": -2.4, "tumbles": -2.4, "uncertainty": -1.6, "warn": -1.8, "warns": -1.8,
+    "weak": -1.9, "worst": -2.8,
+}
+NEGATIONS = {"not", "no", "never", "without", "isn't", "aren't", "wasn't", "don't", "doesn't", "didn't", "won't"}
+# VADER's damping of a negated word and normalization constant of the compound score
+NEGATION_SCALAR = -0.74
+COMPOUND_ALPHA = 15.0
+
+
+def score_texts(texts):
+    """Compound / positive / negative / neutral scores for each text, as an (n, 4) array
+
+    Same arithmetic as VADER (compound = s / sqrt(s^2 + 15); proportions of
+    positive, negative and neutral word mass) over LEXICON, with negation of
+    the following word. All texts are tokenized and looked up in one pass.
+    """
+    texts = pd.Series(list(texts), dtype=object)
+    scores = np.zeros((len(texts), 4))
+    if texts.empty:
+        return scores
+
+    tokens = texts.fillna("").str.lower().str.findall(r"[a-z']+").explode().dropna()
+    if tokens.empty:
+        return scores
+    owner = tokens.index.to_numpy()
+    tokens = tokens.to_numpy()
+    valence = pd.Series(tokens).map(LEXICON).fillna(0.0).to_numpy()
+    # A negation flips the next word of the same text
+    negated = np.zeros(len(tokens), dtype=bool)
+    negated[1:] = np.isin(tokens[:-1], list(NEGATIONS)) & (owner[1:] == owner[:-1])
+    valence = np.where(negated, valence * NEGATION_SCALAR, valence)
+
+    n = len(texts)
+    total = np.bincount(owner, weights=valence, minlength=n)
+    positive = np.bincount(owner, weights=np.where(valence > 0, valence + 1, 0.0), minlength=n)
+    negative = np.bincount(owner, weights=np.where(valence < 0, valence - 1, 0.0), minlength=n)
+    neutral = np.bincount(owner, weights=(valence == 0).astype(np.float64), minlength=n)
+    mass = positive + np.abs(negative) + neutral
+
+    scores[:, 0] = total / np.sqrt(total * total + COMPOUND_ALPHA)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scores[:, 1] = np.where(mass > 0, positive / mass, 0.0)
+        scores[:, 2] = np.where(mass > 0, np.abs(negative) / mass, 0.0)
+        scores[:, 3] = np.where(mass > 0, neutral / mass, 0.0)
+    return scores
+
+
+class HeadlineScorer:
+    """score_texts() with a bounded cache, so each distinct headline is scored once"""
+
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.scored = 0
+        self.reused = 0
+
+    def score(self, texts):
+        texts = ["" if not isinstance(text, str) else text for text in texts]
+        if not texts:
+            return np.zeros((0, 4))
+        with self._lock:
+            missing = list(dict.fromkeys(text for text in texts if text not in self._cache))
+        fresh = {}
+        if missing:
+            # One batch for every headline not seen before
+            fresh = dict(zip(missing, score_texts(missing)))
+            with self._lock:
+                self._cache.update(fresh)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+                self.scored += len(missing)
+        with self._lock:
+            self.reused += len(texts) - len(missing)
+            rows = [fresh[text] if text in fresh else self._cache.get(text) for text in texts]
+        # Headlines evicted by a concurrent batch since the check above are scored again
+        evicted = [i for i, row in enumerate(rows) if row is None]
+        if evicted:
+            for i, row in zip(evicted, score_texts([texts[i] for i in evicted])):
+                rows[i] = row
+        return np.array(rows)
+
+    def stats(self):
+        with self._lock:
+            return {"cached": len(self._cache), "scored": self.scored, "reused": self.reused}
+
+
+def bar_dates(frame):
+    """Calendar day of every bar (from 'date', or the 'timestamp' in epoch milliseconds)"""
+    if "date" in frame.columns:
+        dates = pd.to_datetime(frame["date"], utc=True)
+    else:
+        dates = pd.to_datetime(frame["timestamp"], unit="ms", utc=True)
+    return dates.dt.tz_localize(None).dt.normalize()
+
+
+class HeadlineSentiment:
+    """Daily text-sentiment features from a local headlines CSV (date, headline[, symbol])
+
+    The file is cached and reloaded like the stock data (mtime/size); the daily
+    aggregates are cached per file version and symbol. A file with a symbol
+    column is filtered to the requested symbol; without one, every headline
+    counts for every symbol.
+    """
+
+    def __init__(self, path, scorer=None):
+        self.path = path
+        self.scorer = scorer or HeadlineScorer()
+        self._store = MarketDataStore(path)
+        self._lock = threading.Lock()
+        self._daily = {}
+        self._warned_missing = False
+
+    def version(self):
+        """Version of the headlines file, or None if there is none"""
+        if not self._store.exists():
+            return None
+        return self._store.snapshot()[1]
+
+    def daily(self, symbol=None):
+        """(DataFrame indexed by day with TEXT_FEATURES + Post_Count, version); empty without a file"""
+        if not self._store.exists():
+            if not self._warned_missing:
+                self._warned_missing = True
+                print(f"⚠️ Warning: No headlines file at {self.path}, text sentiment features are 0 "
+                      "(the sentiment model only sees price and volume)")
+            return pd.DataFrame({name: pd.Series(dtype=np.float64) for name in TEXT_FEATURES + ["Post_Count"]}), None
+        self._warned_missing = False
+        headlines, version, _ = self._store.snapshot()
+        key = (version, symbol)
+        with self._lock:
+            cached = self._daily.get(key)
+        if cached is not None:
+            return cached, version
+
+        if "symbol" in headlines.columns and symbol:
+            headlines = headlines[headlines["symbol"].astype(str).str.upper() == symbol]
+        scores = self.scorer.score(headlines["headline"].tolist())
+        frame = pd.DataFrame(scores, columns=TEXT_FEATURES, index=bar_dates(headlines).to_numpy())
+        daily = frame.groupby(level=0).mean()
+        daily["Post_Count"] = frame.groupby(level=0).size()
+        with self._lock:
+            # Only the latest version per symbol is worth keeping
+            self._daily = {k: v for k, v in self._daily.items() if k[1] != symbol}
+            self._daily[key] = daily
+        return daily, version
+
+    def stats(self):
+        return dict(self.scorer.stats(), file=self._store.stats() if self._store.exists() else None)
+
+
+def sentiment_features(frame, daily):
+    """The model's feature matrix for every bar of frame, built column-wise in one pass
+
+    Days without headlines get zero text scores and a Post_Count of 0.
+    """
+    dates = bar_dates(frame)
+    text = daily.reindex(dates.to_numpy())
+    features = pd.DataFrame({
+        name: text[name].fillna(0.0).to_numpy(dtype=np.float64) for name in TEXT_FEATURES + ["Post_Count"]
+    })
+    features["Close"] = frame["close"].to_numpy(dtype=np.float64)
+    features["Volume"] = frame["volume"].to_numpy(dtype=np.float64)
+    features["Returns"] = features["Close"].pct_change().fillna(0.0)
+    return features[SENTIMENT_FEATURES]
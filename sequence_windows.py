@@ -0,0 +1,29 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Windows handed to the model per call; bounds the copy made when the
+# framework converts a chunk into a dense input tensor.
+DEFAULT_CHUNK_SIZE = 8192
+
+
+def iter_window_chunks(values, look_back, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (n_windows, look_back, 1) chunks of every look_back-long window over values
+
+    Chunk k row j is values[s:s + look_back] with s = k * chunk_size + j, i.e. the
+    window ending (exclusively) at index s + look_back. The chunks are strided
+    views into values, so no window is copied here.
+    """
+    values = np.ascontiguousarray(values).reshape(-1)
+    if len(values) < look_back:
+        return
+    windows = sliding_window_view(values, look_back)
+    for start in range(0, len(windows), chunk_size):
+        yield windows[start:start + chunk_size, :, np.newaxis]
+
+
+def predict_windows(predict, values, look_back, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Run predict over every window of values in fixed-size chunks and stack the outputs"""
+    outputs = [predict(chunk) for chunk in iter_window_chunks(values, look_back, chunk_size)]
+    if not outputs:
+        return np.empty((0, 1))
+    return np.concatenate(outputs, axis=0)
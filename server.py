@@ -1,19 +1,41 @@
+import hmac
 import os
-# Set matplotlib backend to non-interactive mode before importing pyplot
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend to avoid threading issues
-import matplotlib.pyplot as plt
-from flask import Flask, jsonify, send_from_directory, request
+import socket
+import threading
+import time
+from flask import Flask, Response, copy_current_request_context, g, jsonify, make_response, send_from_directory, request
 import pandas as pd
 import joblib
 import numpy as np
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
 from flask_cors import CORS, cross_origin
 import traceback
-from keras.models import load_model
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial, wraps
+from multiprocessing import get_context, parent_process
 from waitress import serve
-
-app = Flask(__name__, static_folder="public")
+from market_data import MarketDataStore, PerSymbol, SymbolStore, normalize_symbol
+from indicators import IndicatorState
+from feature_store import FeatureStore, feature_directory
+from prediction_cache import WindowPredictionCache
+from sequence_windows import predict_windows
+from charts import ChartRenderer
+from chart_store import ChartStore
+from backtest import positions_from_signals, run_backtest
+from sweep import macd_grid, make_pool, run_sweep, sma_grid
+from model_registry import ModelRegistry
+from batching import MicroBatcher
+from transformer_lite import load_lite
+from streaming import CsvTailFeed, SignalHub, format_sse
+from response_cache import ResponseCache, response_key
+from metrics import RENDER_BUCKETS, MetricsRegistry, server_timing
+from profiling import PROFILE_MODES, RequestProfiler
+from sentiment import HeadlineSentiment, sentiment_features
+from bars import CompactBarCache, bar_timestamps, crossover_signals
+from chart_data import ARROW_MIMETYPE, ChartData, arrow_available
+
+# /public is served by serve_static() below so it can wait for in-flight charts
+app = Flask(__name__, static_folder=None)
 CORS(app, resources={
     r"/*": {
         "origins": [
@@ -28,15 +50,93 @@ CORS(app, resources={
 GLOBAL_ASSETS_DIR = os.path.join(os.path.dirname(__file__), "public")
 os.makedirs(GLOBAL_ASSETS_DIR, exist_ok=True)
 
-# Ensure data directory exists
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+# Prometheus metrics at /metrics, plus a Server-Timing header with each request's stages.
+# METRICS_ENABLED=0 turns all of it into no-ops.
+METRICS = MetricsRegistry(enabled=os.environ.get("METRICS_ENABLED", "1") != "0")
+REQUEST_SECONDS = METRICS.histogram(
+    "request_duration_seconds", "Request latency by route", ["route", "method", "status"])
+REQUESTS_IN_FLIGHT = METRICS.gauge("requests_in_flight", "Requests being handled right now")
+RESPONSE_CACHE_RESULTS = METRICS.counter(
+    "response_cache_requests_total", "Prediction requests by response cache outcome (X-Cache)", ["route", "result"])
+CHART_RENDER_SECONDS = METRICS.histogram(
+    "chart_render_seconds", "Chart render time in the worker process", ["kind"], buckets=RENDER_BUCKETS)
+
+# Charts are rendered off the request path under content-addressed names in public/charts
+CHARTS_DIR = os.environ.get("CHARTS_DIR") or os.path.join(GLOBAL_ASSETS_DIR, "charts")
+CHART_STORE = ChartStore(
+    CHARTS_DIR,
+    max_files=int(os.environ.get("CHART_CACHE_MAX_FILES", 200)),
+    max_bytes=int(os.environ.get("CHART_CACHE_MAX_MB", 200)) * 1024 * 1024,
+    # Spawned children (chart and sweep workers under python server.py) re-import this module;
+    # only the server process may clean up the directory
+    cleanup=parent_process() is None,
+)
+CHARTS = ChartRenderer(CHART_STORE, max_workers=int(os.environ.get("CHART_WORKERS", 2)),
+                       on_render=lambda kind, seconds: CHART_RENDER_SECONDS.labels(kind).observe(seconds))
+
+# Legacy fixed image names accepted by /api/get-image, mapped to chart kinds
+LEGACY_CHART_IMAGES = {
+    'momentum_average_crossover.png': 'moving_average',
+    'sentiment_analysis.png': 'sentiment',
+    'macd_analysis.png': 'macd',
+    'transformer_analysis.png': 'transformer',
+}
+
+# Ensure data directory exists (DATA_DIR overrides it, e.g. for benchmarks on synthetic data)
+DATA_DIR = os.environ.get("DATA_DIR") or os.path.join(os.path.dirname(__file__), "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# Shared in-memory copy of the stock data, re-parsed only when the CSV changes
+MARKET_DATA = MarketDataStore(os.path.join(DATA_DIR, "stock_data.csv"))
+
+# Per-ticker OHLCV as memory-mapped columns (import with: python market_data.py AAPL file.csv)
+SYMBOLS = SymbolStore(os.path.join(DATA_DIR, "symbols"))
+
+# COMPACT_BARS=1: /api/predict-macd works on float32 columns with indicators in
+# preallocated buffers instead of a float64 DataFrame copy with derived columns
+# (see benchmarks/compact_bars.py for the memory and speed comparison)
+COMPACT_BARS = os.environ.get("COMPACT_BARS", "0") == "1"
+COMPACT_BAR_CACHE = PerSymbol(CompactBarCache)
+
+# Daily headline sentiment for the sentiment model, from a local CSV with
+# date,headline[,symbol] columns (HEADLINES_CSV, default data/headlines.csv)
+HEADLINES = HeadlineSentiment(os.environ.get("HEADLINES_CSV") or os.path.join(DATA_DIR, "headlines.csv"))
+
+# SMA/EMA/MACD values per symbol's close series, advanced only over appended bars.
+# FEATURE_STORE=1 keeps them (plus returns) in memory-mapped files next to the data
+# instead, shared by every worker and kept across restarts; precompute them with
+# python feature_store.py [SYMBOL ...]
+if os.environ.get("FEATURE_STORE", "0") == "1":
+    INDICATORS = FeatureStore(partial(feature_directory, DATA_DIR), sma_windows=(50, 200), macd_spans=(12, 26, 9))
+else:
+    INDICATORS = PerSymbol(lambda: IndicatorState(sma_windows=(50, 200), macd_spans=(12, 26, 9)))
+
+# Whole prediction responses keyed by route, params, data version and model version.
+# RESPONSE_CACHE_DIR keeps them on disk across restarts; RESPONSE_CACHE_ENTRIES=0 disables caching.
+RESPONSE_CACHE = None
+if int(os.environ.get("RESPONSE_CACHE_ENTRIES", 1000)) > 0:
+    RESPONSE_CACHE = ResponseCache(
+        max_entries=int(os.environ.get("RESPONSE_CACHE_ENTRIES", 1000)),
+        max_bytes=int(os.environ.get("RESPONSE_CACHE_MAX_MB", 64)) * 1024 * 1024,
+        directory=os.environ.get("RESPONSE_CACHE_DIR") or None,
+    )
+
+# Transformer predictions per symbol and window, so each request only runs the model on new windows
+TRANSFORMER_LOOK_BACK = 60
+TRANSFORMER_CACHE = PerSymbol(lambda: WindowPredictionCache(look_back=TRANSFORMER_LOOK_BACK))
+
+# Concurrent Transformer calls are merged into one forward pass of up to
+# TRANSFORMER_BATCH_SIZE windows, waiting at most TRANSFORMER_BATCH_LATENCY_MS for company
+TRANSFORMER_BATCHER = MicroBatcher(
+    lambda transformer_model, X: transformer_model.predict(X, verbose=0),
+    max_batch_size=int(os.environ.get("TRANSFORMER_BATCH_SIZE", 256)),
+    max_latency_ms=float(os.environ.get("TRANSFORMER_BATCH_LATENCY_MS", 5)),
+)
+
 # Ensure models directory exists
 MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
 os.makedirs(MODELS_DIR, exist_ok=True)
 
-# Load moving average crossover model with better error handling
 model_path = os.path.join(MODELS_DIR, "1_model_meanAveragCrossover.pkl")
 scaler_path = os.path.join(MODELS_DIR, "1_scaler.pkl")
 
@@ -50,48 +150,37 @@ macd_model_path = os.path.join(MODELS_DIR, "macd.pkl")
 transformer_model_path = os.path.join(MODELS_DIR, "Transformer_model.h5")
 transformer_scaler_path = os.path.join(MODELS_DIR, "Transformer_scaler.pkl")
 
-try:
-    model = joblib.load(model_path)
-    print(f"✅ Moving average model successfully loaded from: {model_path}")
-except FileNotFoundError:
-    print(f"⚠️ Warning: Moving average model file not found at: {model_path}")
-    model = None
-except Exception as e:
-    print(f"⚠️ Warning: Error loading moving average model: {str(e)}")
-    model = None
-
-try:
-    sentiment_model = joblib.load(sentiment_model_path)
-    print(f"✅ Sentiment model successfully loaded from: {sentiment_model_path}")
-except FileNotFoundError:
-    print(f"⚠️ Warning: Sentiment model file not found at: {sentiment_model_path}")
-    sentiment_model = None
-except Exception as e:
-    print(f"⚠️ Warning: Error loading sentiment model: {str(e)}")
-    sentiment_model = None
-
-try:
-    macd_model = joblib.load(macd_model_path)
-    print(f"✅ MACD model successfully loaded from: {macd_model_path}")
-except FileNotFoundError:
-    print(f"⚠️ Warning: MACD model file not found at: {macd_model_path}")
-    macd_model = None
-except Exception as e:
-    print(f"⚠️ Warning: Error loading MACD model: {str(e)}")
-    macd_model = None
-
-try:
-    transformer_model = load_model(transformer_model_path)
-    transformer_scaler = joblib.load(transformer_scaler_path)
-    print(f"✅ Transformer model and scaler successfully loaded")
-except FileNotFoundError:
-    print(f"⚠️ Warning: Transformer model or scaler file not found")
-    transformer_model = None
-    transformer_scaler = None
-except Exception as e:
-    print(f"⚠️ Warning: Error loading Transformer model: {str(e)}")
-    transformer_model = None
-    transformer_scaler = None
+# Same model exported to numpy weights (python transformer_lite.py); needs no TensorFlow
+transformer_lite_path = os.path.join(MODELS_DIR, "Transformer_lite.npz")
+
+# "keras" runs Transformer_model.h5 with TensorFlow, "lite" runs Transformer_lite.npz with numpy
+TRANSFORMER_BACKEND = os.environ.get("TRANSFORMER_BACKEND", "keras").lower()
+
+def load_with_scaler(model_file, scaler_file):
+    """A pickled model and the scaler it was trained with, swapped together on reload"""
+    return joblib.load(model_file), joblib.load(scaler_file)
+
+def load_transformer(model_file, scaler_file):
+    """Keras model plus its scaler; TensorFlow is only imported here, on first use"""
+    from keras.models import load_model
+    return load_model(model_file), joblib.load(scaler_file)
+
+# Models are loaded on first use (or by the background warm-up), not at import
+MODELS = ModelRegistry()
+MODELS.register("moving_average", load_with_scaler, model_path, scaler_path)
+MODELS.register("sentiment", joblib.load, sentiment_model_path)
+MODELS.register("macd", joblib.load, macd_model_path)
+if TRANSFORMER_BACKEND == "lite":
+    MODELS.register("transformer", load_lite, transformer_lite_path)
+else:
+    MODELS.register("transformer", load_transformer, transformer_model_path, transformer_scaler_path)
+
+def model_names_from_env(variable):
+    """Comma-separated model names from an env var: None if unset, [] if set but empty"""
+    value = os.environ.get(variable)
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(",") if name.strip()]
 
 # Helper functions for MACD model
 def check_data_leakage(df):
@@ -104,8 +193,12 @@ def check_data_leakage(df):
         
     return "Data leakage check passed" if is_sorted else "Warning: Data not in chronological order"
 
-def time_series_split(df):
-    """Perform time series split and generate signals"""
+def time_series_split(df, indicators=None):
+    """Perform time series split and generate signals
+
+    indicators: optional IndicatorState.update() result for df['close'], used
+    instead of recomputing the MACD columns from the full history.
+    """
     # Clone the dataframe to avoid modifications to original
     df = df.copy()
     
@@ -115,11 +208,15 @@ def time_series_split(df):
         df.set_index('date', inplace=True)
     
     # Calculate MACD indicators
-    df['ema12'] = df['close'].ewm(span=12, adjust=False).mean()
-    df['ema26'] = df['close'].ewm(span=26, adjust=False).mean()
-    df['macd'] = df['ema12'] - df['ema26']
-    df['signal_line'] = df['macd'].ewm(span=9, adjust=False).mean()
-    df['histogram'] = df['macd'] - df['signal_line']
+    if indicators is not None:
+        for column in ['ema12', 'ema26', 'macd', 'signal_line', 'histogram']:
+            df[column] = indicators[column]
+    else:
+        df['ema12'] = df['close'].ewm(span=12, adjust=False).mean()
+        df['ema26'] = df['close'].ewm(span=26, adjust=False).mean()
+        df['macd'] = df['ema12'] - df['ema26']
+        df['signal_line'] = df['macd'].ewm(span=9, adjust=False).mean()
+        df['histogram'] = df['macd'] - df['signal_line']
     
     # Generate trading signals (1 for buy, -1 for sell, 0 for hold)
     df['Signal'] = 0
@@ -129,20 +226,20 @@ def time_series_split(df):
     df.loc[(df['macd'] < df['signal_line']) & (df['macd'].shift(1) >= df['signal_line'].shift(1)), 'Signal'] = -1
     
     # For calculation purposes, forward fill the signals (maintain position until new signal)
-    df['Position'] = df['Signal'].replace(0, np.nan).fillna(method='ffill').fillna(0)
-    
-    # Calculate returns
-    df['Return'] = df['close'].pct_change()
-    df['Strategy_Return'] = df['Position'].shift(1) * df['Return']
+    df['Position'] = positions_from_signals(df['Signal'].to_numpy())
     
-    # Calculate cumulative returns
-    df['Cumulative_Return'] = (1 + df['Strategy_Return']).cumprod()
-    df['Buy_and_Hold'] = (1 + df['Return']).cumprod()
+    # Calculate returns and cumulative returns
+    backtest = run_backtest(df['close'].to_numpy(), df['Position'].to_numpy())
+    df['Return'] = backtest['return']
+    df['Strategy_Return'] = backtest['strategy_return']
+    df['Cumulative_Return'] = backtest['cumulative_return']
+    df['Buy_and_Hold'] = backtest['buy_and_hold']
     
     # Rename 'close' to 'Close' for consistency
     df.rename(columns={'close': 'Close'}, inplace=True)
     
     # Create a dummy model and scaler for compatibility
+    from sklearn.preprocessing import StandardScaler
     model = {}
     scaler = StandardScaler()
     features = ['macd', 'signal_line', 'histogram']
@@ -150,6 +247,34 @@ def time_series_split(df):
     # Return the test signals dataframe and model components
     return df, model, scaler, features
 
+def request_symbol():
+    """Normalized ?symbol= of the current request, or None for the legacy data file"""
+    symbol = request.args.get('symbol')
+    return normalize_symbol(symbol) if symbol else None
+
+def market_data_for(symbol):
+    """Data store for symbol; no symbol means the legacy data/stock_data.csv"""
+    if not symbol:
+        return MARKET_DATA
+    return SYMBOLS.open(symbol)
+
+def chart_url(image_name):
+    """Public URL of a chart queued on CHARTS (None if it could not be queued)"""
+    if image_name is None:
+        return None
+    return f"{request.host_url.rstrip('/')}/public/charts/{image_name}"
+
+def predict_transformer_windows(transformer, close, first_end, last_end):
+    """Run the Transformer on the windows ending at first_end..last_end-1 (prices in, prices out)"""
+    transformer_model, transformer_scaler = transformer
+    look_back = TRANSFORMER_LOOK_BACK
+    # Window ending at i covers close[i - look_back:i]
+    scaled = transformer_scaler.transform(close[first_end - look_back:last_end - 1].reshape(-1, 1))
+
+    predicted = predict_windows(
+        lambda X: TRANSFORMER_BATCHER.predict(transformer_model, X), scaled, look_back)
+    return transformer_scaler.inverse_transform(predicted).flatten()
+
 def verify_return_calculation(test_signals):
     """Verify the return calculation methodology"""
     # Check if returns are calculated correctly
@@ -164,40 +289,226 @@ def verify_return_calculation(test_signals):
     else:
         return "Return columns not found in test signals"
 
-def calculate_risk_metrics(test_signals):
-    """Calculate risk and performance metrics"""
-    metrics = {}
-    
+def calculate_risk_metrics(test_signals, transaction_cost=0.0, slippage=0.0):
+    """Calculate risk and performance metrics for the Position column of test_signals"""
     if test_signals.empty:
         return {"error": "No data available for risk calculation"}
     
-    # Assuming we have strategy returns and benchmark returns
-    if 'Strategy_Return' in test_signals.columns and 'Return' in test_signals.columns:
-        # Total return
-        metrics['total_return'] = float(test_signals['Cumulative_Return'].iloc[-1] - 1)
-        metrics['buy_hold_return'] = float(test_signals['Buy_and_Hold'].iloc[-1] - 1)
-        
-        # Annualized return (assuming daily data)
-        n_days = len(test_signals)
-        metrics['annualized_return'] = float(((1 + metrics['total_return']) ** (252 / n_days)) - 1)
-        
-        # Sharpe ratio (assuming risk-free rate of 0)
-        sharpe_ratio = (test_signals['Strategy_Return'].mean() / test_signals['Strategy_Return'].std() 
-                        * np.sqrt(252) if test_signals['Strategy_Return'].std() > 0 else 0)
-        metrics['sharpe_ratio'] = float(sharpe_ratio)
-        
-        # Maximum drawdown
-        cum_returns = test_signals['Cumulative_Return']
-        running_max = cum_returns.cummax()
-        drawdown = (cum_returns / running_max) - 1
-        metrics['max_drawdown'] = float(drawdown.min())
-        
-        # Win rate (percentage of winning trades)
-        winning_days = (test_signals['Strategy_Return'] > 0).sum()
-        total_days = (test_signals['Strategy_Return'] != 0).sum()
-        metrics['win_rate'] = float(winning_days / total_days if total_days > 0 else 0)
-        
-    return metrics
+    return run_backtest(test_signals['Close'].to_numpy(), test_signals['Position'].to_numpy(),
+                        transaction_cost=transaction_cost, slippage=slippage)['metrics']
+
+def backtest_costs():
+    """Transaction cost and slippage from ?cost_bps=&slippage_bps= (default 0), as fractions"""
+    cost_bps = float(request.args.get('cost_bps', 0))
+    slippage_bps = float(request.args.get('slippage_bps', 0))
+    return {"transaction_cost": cost_bps / 10000, "slippage": slippage_bps / 10000}
+
+def cached_prediction(model_name, extra_version=None, uses_model=True):
+    """Serve a GET prediction route from RESPONSE_CACHE when its inputs are unchanged
+
+    The key (also the strong ETag) covers the route, query params, host, the
+    data version, the model version and the settings that change responses
+    (COMPACT_BARS, TRANSFORMER_BACKEND), so it changes whenever the response
+    could; extra_version() adds the version of any other input (headlines).
+    With uses_model=False (responses computed from the data alone) the model
+    is neither looked up nor loaded.
+    A matching If-None-Match gets a 304 without any computation. Only
+    200 responses are cached; a hit whose chart has been evicted is recomputed
+    so the chart gets rendered again.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # A profiled request should show the real work, not a cache hit
+            if RESPONSE_CACHE is None or g.get("profile") is not None:
+                return view(*args, **kwargs)
+            METRICS.stage("cache")
+            try:
+                market_data = market_data_for(request_symbol())
+                if not market_data.exists():
+                    return view(*args, **kwargs)
+                _, data_version, lineage = market_data.snapshot()
+                model_version = MODELS.snapshot(model_name)[1] if uses_model else None
+                other_version = extra_version() if extra_version is not None else None
+            except Exception:
+                # Let the route report the problem in its usual way
+                return view(*args, **kwargs)
+            if uses_model and model_version is None:
+                return view(*args, **kwargs)
+
+            # model_name too: /api/predict-all runs every model under its own path
+            # The settings too: a disk cache outlives a restart with different ones
+            key = response_key(request.path, model_name, sorted(request.args.items(multi=True)), request.host_url,
+                               data_version, lineage, model_version, other_version, COMPACT_BARS, TRANSFORMER_BACKEND)
+            if request.if_none_match.contains(key):
+                RESPONSE_CACHE.record_not_modified()
+                response = Response(status=304)
+                cache_state = "REVALIDATED"
+            else:
+                cached = RESPONSE_CACHE.get(key)
+                chart = cached[1].get("chart") if cached is not None else None
+                if cached is not None and (chart is None or CHART_STORE.contains(chart) or CHARTS.is_pending(chart)):
+                    response = Response(cached[0], mimetype=cached[1].get("mimetype", "application/json"))
+                    cache_state = "HIT"
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    image_url = (response.get_json(silent=True) or {}).get("image_url")
+                    RESPONSE_CACHE.put(key, response.get_data(),
+                                       {"chart": image_url.rsplit("/", 1)[-1] if image_url else None,
+                                        "mimetype": response.mimetype})
+                    cache_state = "MISS"
+
+            response.set_etag(key)
+            # Clients may keep the body but must revalidate (cheap 304) before reusing it
+            response.cache_control.no_cache = True
+            response.headers["X-Cache"] = cache_state
+            return response
+        return wrapper
+    return decorator
+
+def metric_route():
+    """Route template for labels (bounded cardinality: /public/<path:filename>, not every file)"""
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+@app.before_request
+def start_request_metrics():
+    if not METRICS.enabled:
+        return
+    REQUESTS_IN_FLIGHT.labels().inc()
+    g.metrics_in_flight = True
+    METRICS.begin_request(metric_route())
+
+@app.after_request
+def record_request_metrics(response):
+    spans, total = METRICS.end_request()
+    if total is not None:
+        route = metric_route()
+        REQUEST_SECONDS.labels(route, request.method, str(response.status_code)).observe(total)
+        cache_state = response.headers.get("X-Cache")
+        if cache_state:
+            RESPONSE_CACHE_RESULTS.labels(route, cache_state).inc()
+        response.headers["Server-Timing"] = server_timing(spans, total)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    # Runs after a streamed response has finished, so open SSE connections count as in flight
+    if g.pop("metrics_in_flight", False):
+        REQUESTS_IN_FLIGHT.labels().dec()
+
+def component_metrics():
+    """Scrape-time metrics read from the stats() of the caches, models and workers"""
+    models = MODELS.stats()
+    collected = [
+        ("model_loaded", "gauge", "1 if the model's current version loaded successfully",
+         [({"model": name}, int(stats["loaded"])) for name, stats in models.items()]),
+        ("model_load_seconds", "gauge", "Time taken by the model's last load",
+         [({"model": name}, stats["load_seconds"]) for name, stats in models.items()]),
+        ("model_memory_megabytes", "gauge", "Resident memory added by the model's last load",
+         [({"model": name}, stats["memory_mb"]) for name, stats in models.items()]),
+        ("model_reloads_total", "counter", "Hot reloads of the model",
+         [({"model": name}, stats["reloads"]) for name, stats in models.items()]),
+    ]
+
+    if RESPONSE_CACHE is not None:
+        cache = RESPONSE_CACHE.stats()
+        collected += [
+            ("response_cache_lookups_total", "counter", "Response cache lookups by result",
+             [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"]),
+              ({"result": "not_modified"}, cache["not_modified"])]),
+            ("response_cache_entries", "gauge", "Responses held in the cache", [({}, cache["entries"])]),
+            ("response_cache_bytes", "gauge", "Size of the cached responses", [({}, cache["bytes"])]),
+            ("response_cache_evictions_total", "counter", "Responses evicted from the cache", [({}, cache["evictions"])]),
+        ]
+
+    market_data = [("default", MARKET_DATA.stats())] + [(symbol, data.stats()) for symbol, data in SYMBOLS.opened()]
+    collected.append(("market_data_lookups_total", "counter", "Market data reads by result (miss = file parsed)",
+                      [({"symbol": symbol, "result": result}, stats[result])
+                       for symbol, stats in market_data for result in ("hits", "misses")]))
+
+    windows = [(symbol or "default", cache.stats()) for symbol, cache in TRANSFORMER_CACHE.items()]
+    collected.append(("transformer_windows_total", "counter", "Transformer windows run through the model or reused",
+                      [({"symbol": symbol, "result": result}, stats[f"windows_{result}"])
+                       for symbol, stats in windows for result in ("predicted", "reused")]))
+
+    if isinstance(INDICATORS, FeatureStore):
+        features = [(symbol or "default", series.stats()) for symbol, series in INDICATORS.items()]
+        collected += [
+            ("feature_store_hits_total", "counter", "Indicator lookups answered from stored rows only",
+             [({"symbol": symbol}, stats["hits"]) for symbol, stats in features]),
+            ("feature_store_rows_written_total", "counter", "Indicator rows computed and written to the store",
+             [({"symbol": symbol}, stats["appended"]) for symbol, stats in features]),
+        ]
+
+    charts, chart_store = CHARTS.stats(), CHART_STORE.stats()
+    collected += [
+        ("charts_total", "counter", "Chart requests by result (reused = already stored or rendering)",
+         [({"result": "rendered"}, charts["rendered"]), ({"result": "reused"}, charts["reused"])]),
+        ("charts_pending", "gauge", "Charts queued or rendering", [({}, charts["pending"])]),
+        ("chart_store_bytes", "gauge", "Size of the stored charts", [({}, chart_store["bytes"])]),
+    ]
+
+    batching = TRANSFORMER_BATCHER.stats()
+    collected += [
+        ("transformer_batch_queue_depth", "gauge", "Transformer requests waiting for a batch",
+         [({}, batching["queue_depth"])]),
+        ("transformer_batches_total", "counter", "Transformer forward passes", [({}, batching["batches"])]),
+        ("transformer_batch_samples_total", "counter", "Windows in all Transformer forward passes",
+         [({}, batching["samples"])]),
+    ]
+
+    hub = SIGNAL_HUB.stats()
+    collected.append(("stream_subscribers", "gauge", "Open /api/stream connections",
+                      [({"symbol": symbol}, count) for symbol, count in hub["subscribers"].items()]))
+    return collected
+
+METRICS.collect(component_metrics)
+
+# On-demand profiles of single requests (?profile=cprofile|sample or X-Profile header,
+# admin token required), stored under PROFILES_DIR. Sampling also covers the
+# micro-batcher thread, where Transformer inference actually runs, and the
+# /api/predict-all workers.
+PROFILER = RequestProfiler(
+    os.environ.get("PROFILES_DIR") or os.path.join(os.path.dirname(__file__), "profiles"),
+    keep=int(os.environ.get("PROFILES_KEEP", 50)),
+    memory_top=int(os.environ.get("PROFILE_MEMORY_TOP", 20)),
+    sample_interval=float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", 1)) / 1000,
+    sample_threads=["micro-batcher", "predict-all"],
+)
+
+@app.before_request
+def start_profile():
+    mode = request.args.get("profile") or request.headers.get("X-Profile")
+    if not mode:
+        return None
+    if not admin_authorized():
+        return jsonify({"message": "❌ Not authorized to profile requests"}), 403
+    mode = "cprofile" if mode in ("1", "true") else mode
+    if mode not in PROFILE_MODES:
+        return jsonify({"message": f"❌ Unknown profile mode '{mode}' (use one of: {', '.join(PROFILE_MODES)})"}), 400
+    profile = PROFILER.start(mode, f"{request.method} {request.path}")
+    if profile is None:
+        return jsonify({"message": "❌ Another request is being profiled, try again shortly"}), 409
+    g.profile = profile
+    return None
+
+@app.after_request
+def finish_profile(response):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        summary = PROFILER.finish(profile)
+        response.headers["X-Profile-Id"] = summary["id"]
+        print(f"✅ Profile {summary['id']} saved ({summary['seconds'] * 1000:.1f} ms)")
+    return response
+
+@app.teardown_request
+def abandon_profile(error=None):
+    # after_request did not run (the request failed hard): stop the profiler anyway
+    profile = g.pop("profile", None)
+    if profile is not None:
+        PROFILER.finish(profile)
 
 @app.route("/")
 def home():
@@ -206,21 +517,24 @@ def home():
 
 @app.route("/api/predict", methods=["GET"])
 @cross_origin()  # Apply CORS only to this route
+@cached_prediction("moving_average")
 def predict():
     try:
-        # Check if model is loaded
-        if model is None:
+        METRICS.stage("load")
+        # Check if model is loaded (loads it on first use; the request keeps this version)
+        moving_average, model_version = MODELS.snapshot("moving_average")
+        if moving_average is None:
             return jsonify({"message": "❌ Moving average model not loaded. Check server logs."}), 500
 
-        data_path = os.path.join(DATA_DIR, "stock_data.csv")
-
         # Load stock data
         try:
-            if not os.path.exists(data_path):
+            symbol = request_symbol()
+            market_data = market_data_for(symbol)
+            if not market_data.exists():
                 return jsonify({"message": "❌ Stock data file not found! Please fetch data first."}), 404
                 
-            stock_data = pd.read_csv(data_path)
-            print(f"✅ Successfully loaded stock data with {len(stock_data)} rows")
+            stock_data, data_version, lineage = market_data.snapshot()
+            print(f"✅ Using stock data with {len(stock_data)} rows")
         except Exception as e:
             print(f"❌ Error reading CSV: {str(e)}")
             return jsonify({"message": f"❌ Error reading stock data: {str(e)}"}), 400
@@ -232,17 +546,22 @@ def predict():
             print(f"❌ Missing columns: {missing_cols}")
             return jsonify({"message": f"❌ Missing columns: {', '.join(missing_cols)}"}), 400
 
-        # Compute moving averages
-        stock_data["SMA_50"] = stock_data["close"].rolling(window=50).mean()
-        stock_data["SMA_200"] = stock_data["close"].rolling(window=200).mean()
+        # Compute moving averages (on a new frame, the cached one is shared)
+        METRICS.stage("features")
+        indicators = INDICATORS[symbol].update(stock_data["close"].to_numpy(), lineage)
+        stock_data = stock_data.assign(
+            SMA_50=indicators["sma_50"],
+            SMA_200=indicators["sma_200"],
+        )
         stock_data = stock_data.dropna()
 
         if stock_data.empty:
             return jsonify({"message": "⚠️ Not enough stock data to make a prediction"}), 400
 
-        # Load scaler and preprocess data
+        # Preprocess data with the scaler loaded alongside the model
+        METRICS.stage("predict")
+        model, scaler = moving_average
         try:
-            scaler = joblib.load(scaler_path)
             latest_data = stock_data[['SMA_50', 'SMA_200']].iloc[-1].values.reshape(1, -1)
             latest_data_scaled = scaler.transform(latest_data)
         except Exception as e:
@@ -251,6 +570,12 @@ def predict():
 
         # Make prediction
         prediction = model.predict(latest_data_scaled)
+
+        # Backtest the crossover: long while SMA 50 is above SMA 200, short otherwise
+        METRICS.stage("backtest")
+        crossover_position = np.where(stock_data['SMA_50'] > stock_data['SMA_200'], 1.0, -1.0)
+        risk_metrics = run_backtest(stock_data['close'].to_numpy(), crossover_position,
+                                    **backtest_costs())['metrics']
         
         # Simple signal - just what we need without extra info
         signal = "📈 Uptrend (Buy)" if prediction[0] == 1 else "📉 Downtrend (Sell)"
@@ -265,59 +590,35 @@ def predict():
             price_change = stock_data['close'].iloc[-1] - stock_data['close'].iloc[-2]
             percent_change = (price_change / stock_data['close'].iloc[-2]) * 100
         
-        # Generate and save the plot
+        # Queue the chart; its URL is content-addressed, so it is valid before the PNG exists
+        METRICS.stage("render")
+        image_name = None
         try:
-            plt.figure(figsize=(12, 6))
-            
             # Plot only the last 90 days data to make it more readable
             last_n_days = min(90, len(stock_data))
             plot_data = stock_data.iloc[-last_n_days:]
-            
-            plt.plot(plot_data.index, plot_data['close'], label='Closing Price', color='blue')
-            plt.plot(plot_data.index, plot_data['SMA_50'], label='SMA 50', color='orange')
-            plt.plot(plot_data.index, plot_data['SMA_200'], label='SMA 200', color='red')
-            
-            # Add buy/sell markers
-            buy_indices = plot_data.index[plot_data['SMA_50'] > plot_data['SMA_200']]
-            sell_indices = plot_data.index[plot_data['SMA_50'] < plot_data['SMA_200']]
-            
-            plt.scatter(
-                buy_indices,
-                plot_data.loc[buy_indices, 'close'],
-                color='green', label='Buy Signal', marker='^', alpha=1, s=100, zorder=5
-            )
-            plt.scatter(
-                sell_indices,
-                plot_data.loc[sell_indices, 'close'],
-                color='red', label='Sell Signal', marker='v', alpha=1, s=100, zorder=5
-            )
-            
-            plt.title(f"Stock Price with Moving Average Crossover Signals (Last {last_n_days} days)", fontsize=14)
-            plt.legend()
-            plt.xlabel("Day")
-            plt.ylabel("Price ($)")
-            plt.grid(True, alpha=0.3)
-
-            # Save the plot to /public folder
-            image_path = os.path.join(GLOBAL_ASSETS_DIR, "momentum_average_crossover.png")
-            plt.savefig(image_path, dpi=300, bbox_inches='tight')
-            plt.close('all')  # Close all figures to prevent memory leaks
-
-            print(f"✅ Image successfully saved at: {image_path}")
+            image_name = CHARTS.submit("moving_average", data_version, {"symbol": symbol, "last_n_days": last_n_days}, {
+                "index": plot_data.index.to_numpy(),
+                "close": plot_data['close'].to_numpy(),
+                "sma_50": plot_data['SMA_50'].to_numpy(),
+                "sma_200": plot_data['SMA_200'].to_numpy(),
+            })
         except Exception as e:
-            print(f"❌ Error generating chart: {str(e)}")
+            print(f"❌ Error queueing chart: {str(e)}")
             # Continue execution - we can still return the prediction even if chart fails
 
         # Return only the simple signal message but keep other data in the JSON
-        base_url = request.host_url.rstrip("/")  # Get base URL dynamically
+        METRICS.stage("serialize")
         return jsonify({
             "message": signal,  # Use the simple signal format
             "signal": signal.split(" ")[1].strip("()"),
             "price": float(latest_price),
             "change": float(price_change),
             "change_percent": float(percent_change),
-            "image_url": f"{base_url}/public/momentum_average_crossover.png",
-            "model_type": "moving_average"
+            "image_url": chart_url(image_name),
+            "model_type": "moving_average",
+            "model_version": model_version,
+            "risk_metrics": risk_metrics
         })
 
     except Exception as e:
@@ -329,62 +630,51 @@ def predict():
 
 @app.route("/api/predict-sentiment", methods=["GET"])
 @cross_origin()
+@cached_prediction("sentiment", extra_version=lambda: HEADLINES.version())
 def predict_sentiment():
     try:
+        METRICS.stage("load")
         # Check if sentiment model is loaded
+        sentiment_model, model_version = MODELS.snapshot("sentiment")
         if sentiment_model is None:
             return jsonify({"message": "❌ Sentiment model not loaded. Check server logs."}), 500
 
-        data_path = os.path.join(DATA_DIR, "stock_data.csv")
-
         # Load stock data
         try:
-            if not os.path.exists(data_path):
+            symbol = request_symbol()
+            market_data = market_data_for(symbol)
+            if not market_data.exists():
                 return jsonify({"message": "❌ Stock data file not found! Please fetch data first."}), 404
                 
-            stock_data = pd.read_csv(data_path)
-            print(f"✅ Successfully loaded stock data with {len(stock_data)} rows for sentiment analysis")
+            stock_data, data_version, _ = market_data.snapshot()
+            print(f"✅ Using stock data with {len(stock_data)} rows for sentiment analysis")
         except Exception as e:
             print(f"❌ Error reading CSV for sentiment analysis: {str(e)}")
             return jsonify({"message": f"❌ Error reading stock data: {str(e)}"}), 400
 
-        # For sentiment model, we simulate extracting sentiment features
-        # In a real application, you would process news or social media data
+        # Features for every day of the history: daily headline sentiment plus price and volume
+        METRICS.stage("features")
         try:
-            # Simulate sentiment features from price movement and volatility
-            stock_data['price_change'] = stock_data['close'].pct_change()
-            stock_data['volatility'] = stock_data['high'] - stock_data['low']
-            
-            # Use recent data for sentiment analysis (last 14 days)
-            recent_data = stock_data.iloc[-14:].dropna()
-            
-            if recent_data.empty:
+            daily_sentiment, headlines_version = HEADLINES.daily(symbol)
+            features = sentiment_features(stock_data, daily_sentiment)
+            if features.empty:
                 return jsonify({"message": "⚠️ Not enough data for sentiment analysis"}), 400
-                
-            # Extract simulated sentiment features
-            # In a real app, these would come from text sentiment analysis
-            avg_price_change = recent_data['price_change'].mean()
-            avg_volatility = recent_data['volatility'].mean()
-            volume_trend = recent_data['volume'].pct_change().mean()
-            
-            # Create feature vector for sentiment model
-            # Note: This is a simplified example - in reality your sentiment model
-            # would likely use different features from text data
-            features = np.array([[avg_price_change, avg_volatility, volume_trend]])
-            
-            # Predict sentiment (binary output: 1 for positive, 0 for negative)
-            # This simulates how the sentiment model would work
-            # The actual prediction depends on your specific model
-            sentiment_score = np.random.random()  # Simulate sentiment score between 0 and 1
-            prediction = 1 if sentiment_score > 0.5 else 0
-            
-            # In a real implementation, you would do:
-            # prediction = sentiment_model.predict(features)[0]
-            
+
+            # One model call scores every day (1 for positive, 0 for negative)
+            METRICS.stage("predict")
+            predictions = np.asarray(sentiment_model.predict(features))
+            positive_probability = sentiment_model.predict_proba(features)[:, list(sentiment_model.classes_).index(1)]
+            prediction = int(predictions[-1])
         except Exception as e:
             print(f"❌ Error preprocessing data for sentiment: {str(e)}")
             return jsonify({"message": f"❌ Error analyzing sentiment: {str(e)}"}), 500
 
+        # Backtest each day's predicted side: long on positive, short on negative
+        METRICS.stage("backtest")
+        sentiment_position = np.where(predictions == 1, 1.0, -1.0)
+        risk_metrics = run_backtest(stock_data['close'].to_numpy(), sentiment_position,
+                                    **backtest_costs())['metrics']
+
         # Generate sentiment-based signal
         signal = "📈 Positive Sentiment (Buy)" if prediction == 1 else "📉 Negative Sentiment (Sell)"
         
@@ -398,71 +688,46 @@ def predict_sentiment():
             price_change = stock_data['close'].iloc[-1] - stock_data['close'].iloc[-2]
             percent_change = (price_change / stock_data['close'].iloc[-2]) * 100
 
-        # Generate and save sentiment visualization
+        # Queue the sentiment visualization
+        METRICS.stage("render")
+        image_name = None
         try:
-            plt.figure(figsize=(12, 6))
-            
             # Plot only recent data
             recent_n_days = min(30, len(stock_data))
             plot_data = stock_data.iloc[-recent_n_days:]
-            
-            # Plot closing price
-            plt.plot(plot_data.index, plot_data['close'], label='Closing Price', color='blue')
-            
-            # Add shaded background based on sentiment
-            if prediction == 1:  # Positive sentiment
-                plt.axhspan(plot_data['close'].min(), plot_data['close'].max(), 
-                          alpha=0.2, color='green', label='Positive Sentiment')
-            else:  # Negative sentiment
-                plt.axhspan(plot_data['close'].min(), plot_data['close'].max(), 
-                          alpha=0.2, color='red', label='Negative Sentiment')
-            
-            # Add indicators for where price movement aligns with sentiment
-            sentiment_direction = 1 if prediction == 1 else -1
-            plot_data['aligned'] = plot_data['price_change'].apply(
-                lambda x: sentiment_direction * x > 0)
-            
-            # Mark days where price movement aligned with sentiment
-            aligned_days = plot_data.index[plot_data['aligned']]
-            plt.scatter(
-                aligned_days,
-                plot_data.loc[aligned_days, 'close'],
-                color='purple', label='Sentiment Confirmation', marker='o', s=80, zorder=5
-            )
-            
-            plt.title(f"Stock Price with Sentiment Analysis (Last {recent_n_days} days)", fontsize=14)
-            plt.legend()
-            plt.xlabel("Day")
-            plt.ylabel("Price ($)")
-            plt.grid(True, alpha=0.3)
-            
-            # Add text annotation for the sentiment prediction
-            y_position = plot_data['close'].min() + (plot_data['close'].max() - plot_data['close'].min()) * 0.1
-            plt.text(plot_data.index[0], y_position, 
-                    f"Sentiment: {'Positive' if prediction == 1 else 'Negative'}", 
-                    fontsize=14, color='black', 
-                    bbox=dict(facecolor='white', alpha=0.8))
-
-            # Save the plot
-            image_path = os.path.join(GLOBAL_ASSETS_DIR, "sentiment_analysis.png")
-            plt.savefig(image_path, dpi=300, bbox_inches='tight')
-            plt.close('all')
-
-            print(f"✅ Sentiment image saved at: {image_path}")
+
+            # Days where the price moved the way that day's sentiment pointed
+            aligned = sentiment_position[-recent_n_days:] * features['Returns'].to_numpy()[-recent_n_days:] > 0
+
+            image_name = CHARTS.submit(
+                "sentiment", f"{data_version}/{headlines_version}",
+                {"symbol": symbol, "recent_n_days": recent_n_days, "prediction": prediction},
+                {
+                    "index": plot_data.index.to_numpy(),
+                    "close": plot_data['close'].to_numpy(),
+                    "aligned": aligned,
+                    "prediction": prediction,
+                })
         except Exception as e:
-            print(f"❌ Error generating sentiment chart: {str(e)}")
+            print(f"❌ Error queueing sentiment chart: {str(e)}")
             # Continue execution - we can still return the prediction even if chart fails
 
         # Return sentiment prediction
-        base_url = request.host_url.rstrip("/")
+        METRICS.stage("serialize")
         return jsonify({
             "message": signal,
             "signal": signal.split(" ")[1].strip("()"),
             "price": float(latest_price),
             "change": float(price_change),
             "change_percent": float(percent_change),
-            "image_url": f"{base_url}/public/sentiment_analysis.png",
-            "model_type": "sentiment"
+            "image_url": chart_url(image_name),
+            "model_type": "sentiment",
+            "model_version": model_version,
+            "sentiment_score": float(positive_probability[-1]),
+            "headlines": int(features['Post_Count'].iloc[-1]),
+            # False without a headlines file: the text features were all 0
+            "headlines_available": headlines_version is not None,
+            "risk_metrics": risk_metrics
         })
 
     except Exception as e:
@@ -472,25 +737,95 @@ def predict_sentiment():
         return jsonify({"message": f"❌ Error in sentiment prediction: {str(e)}"}), 500
 
 
+@app.route("/api/models", methods=["GET"])
+@cross_origin()
+def models_status():
+    """Load state, load time and memory of every registered model, plus inference batching metrics"""
+    return jsonify({"models": MODELS.stats(), "batching": {"transformer": TRANSFORMER_BATCHER.stats()}})
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint (per process: with gunicorn, each worker reports its own)"""
+    if not METRICS.enabled:
+        return jsonify({"message": "❌ Metrics are disabled (METRICS_ENABLED=0)"}), 404
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+def admin_authorized():
+    """True if the request carries the ADMIN_TOKEN (admin routes are off when it is unset)"""
+    token = os.environ.get("ADMIN_TOKEN")
+    supplied = request.headers.get("X-Admin-Token", "")
+    return bool(token) and hmac.compare_digest(supplied.encode("utf-8"), token.encode("utf-8"))
+
+
+@app.route("/api/admin/reload-models", methods=["POST"])
+def reload_models():
+    """Reload replaced model artifacts without a restart
+
+    Body (optional): {"models": ["macd", ...], "force": false}. Each new version
+    is loaded next to the live one and swapped in; in-flight requests finish
+    on the version they started with.
+    """
+    if not admin_authorized():
+        return jsonify({"message": "❌ Not authorized"}), 403
+    try:
+        payload = request.get_json(silent=True) or {}
+        names = payload.get("models") or MODELS.names()
+        unknown = [name for name in names if name not in MODELS.names()]
+        if unknown:
+            return jsonify({"message": f"❌ Unknown models: {', '.join(map(str, unknown))}"}), 400
+
+        results = MODELS.reload_changed(names, force=bool(payload.get("force", False)))
+        return jsonify({"results": results, "models": MODELS.stats()})
+
+    except Exception as e:
+        error_traceback = traceback.format_exc()
+        print(f"❌ Error reloading models: {str(e)}")
+        print(f"Traceback: {error_traceback}")
+        return jsonify({"message": f"❌ Error reloading models: {str(e)}"}), 500
+
+
+@app.route("/api/admin/profiles", methods=["GET"])
+def list_profiles():
+    """Summaries of the stored request profiles, newest first"""
+    if not admin_authorized():
+        return jsonify({"message": "❌ Not authorized"}), 403
+    return jsonify({"profiles": PROFILER.list()})
+
+
+@app.route("/api/admin/profiles/<path:filename>", methods=["GET"])
+def get_profile(filename):
+    """Download one profile file (.pstats, .collapsed, .txt or .json)"""
+    if not admin_authorized():
+        return jsonify({"message": "❌ Not authorized"}), 403
+    return send_from_directory(PROFILER.directory, filename, as_attachment=filename.endswith(".pstats"))
+
+
 @app.route("/api/check-file", methods=["GET"])
 @cross_origin()
 def check_file():
-    data_path = os.path.join(DATA_DIR, "stock_data.csv")
+    try:
+        market_data = market_data_for(request_symbol())
+    except ValueError as e:
+        return jsonify({"message": f"❌ {str(e)}"}), 400
     
-    if os.path.exists(data_path):
+    if market_data.exists():
         try:
             # Get file stats
-            file_size = os.path.getsize(data_path) / 1024  # Size in KB
+            file_size = market_data.disk_size() / 1024  # Size in KB
             
-            # Try to read the file to verify it's valid
-            data = pd.read_csv(data_path)
+            # Verify the file parses (served from cache unless it changed)
+            data = market_data.get()
             rows = len(data)
             
             return jsonify({
                 "message": f"✅ Stock data file found ({file_size:.2f} KB, {rows} rows)",
                 "exists": True,
                 "size_kb": round(file_size, 2),
-                "rows": rows
+                "rows": rows,
+                "cache": market_data.stats(),
+                "response_cache": RESPONSE_CACHE.stats() if RESPONSE_CACHE is not None else None
             })
         except Exception as e:
             return jsonify({
@@ -509,11 +844,16 @@ def check_file():
 @cross_origin()
 def get_image():
     image_name = request.args.get('image', 'momentum_average_crossover.png')
-    valid_images = ['momentum_average_crossover.png', 'sentiment_analysis.png', 'macd_analysis.png']
     
-    if image_name not in valid_images:
+    if image_name not in LEGACY_CHART_IMAGES:
         return jsonify({"message": "❌ Invalid image requested!"}), 400
-        
+
+    # Serve the most recent chart of that kind; the name is not content-addressed,
+    # so clients must revalidate (cheap thanks to the ETag)
+    chart_name = CHART_STORE.latest(LEGACY_CHART_IMAGES[image_name])
+    if chart_name is not None:
+        return send_chart(chart_name, max_age=0)
+
     image_path = os.path.join(GLOBAL_ASSETS_DIR, image_name)
 
     if os.path.exists(image_path):
@@ -522,29 +862,51 @@ def get_image():
         return jsonify({"message": "❌ Image not found!"}), 404
 
 
+def send_chart(chart_name, max_age):
+    """Send a stored chart with its content key as a strong ETag (304 if unchanged)"""
+    return send_from_directory(
+        CHARTS_DIR, chart_name, mimetype="image/png", max_age=max_age,
+        etag=ChartStore.etag_of(chart_name), conditional=True)
+
+
 @app.route("/public/<path:filename>")
 @cross_origin()
 def serve_static(filename):
+    if filename.startswith("charts/"):
+        chart_name = filename[len("charts/"):]
+        if not ChartStore.is_chart_name(chart_name):
+            return jsonify({"message": "❌ Image not found!"}), 404
+        # Charts are rendered in the background (maybe by another worker); wait for one still in flight
+        CHARTS.wait(chart_name)
+        if not CHART_STORE.contains(chart_name):
+            return jsonify({"message": "❌ Image not found!"}), 404
+        # Content-addressed names never change meaning, so caches may keep them forever
+        response = send_chart(chart_name, max_age=31536000)
+        response.cache_control.immutable = True
+        return response
     return send_from_directory(GLOBAL_ASSETS_DIR, filename)
 
 
 @app.route("/api/predict-macd", methods=["GET"])
 @cross_origin()
+@cached_prediction("macd")
 def predict_macd():
     try:
+        METRICS.stage("load")
         # Check if MACD model is loaded
+        macd_model, model_version = MODELS.snapshot("macd")
         if macd_model is None:
             return jsonify({"message": "❌ MACD model not loaded. Check server logs."}), 500
 
-        data_path = os.path.join(DATA_DIR, "stock_data.csv")
-
         # Load stock data
         try:
-            if not os.path.exists(data_path):
+            symbol = request_symbol()
+            market_data = market_data_for(symbol)
+            if not market_data.exists():
                 return jsonify({"message": "❌ Stock data file not found! Please fetch data first."}), 404
                 
-            df = pd.read_csv(data_path)
-            print(f"✅ Successfully loaded stock data with {len(df)} rows for MACD analysis")
+            df, data_version, lineage = market_data.snapshot()
+            print(f"✅ Using stock data with {len(df)} rows for MACD analysis")
         except Exception as e:
             print(f"❌ Error reading CSV for MACD analysis: {str(e)}")
             return jsonify({"message": f"❌ Error reading stock data: {str(e)}"}), 400
@@ -553,21 +915,43 @@ def predict_macd():
         leakage_check = check_data_leakage(df)
         print(leakage_check)
         
-        # Run time series split validation
-        print("\nRunning time series validation...")
-        test_signals, model, scaler, features = time_series_split(df)
-        
-        # Verify return calculation
-        return_check = verify_return_calculation(test_signals)
-        print(return_check)
-        
-        # Calculate risk metrics
-        risk_metrics = calculate_risk_metrics(test_signals)
-        
-        # Get latest signal and price
-        latest_date = test_signals.index[-1]
-        latest_signal = test_signals.loc[latest_date, 'Signal']
-        latest_price = test_signals.loc[latest_date, 'Close']
+        METRICS.stage("features")
+        if COMPACT_BARS:
+            # float32 columns and indicator buffers cached per data version; no per-request DataFrame
+            bars, indicators = COMPACT_BAR_CACHE[symbol].get(df, data_version)
+            signals = crossover_signals(indicators['macd'], indicators['signal_line'])
+
+            METRICS.stage("backtest")
+            backtest = run_backtest(bars.close, positions_from_signals(signals), **backtest_costs())
+            risk_metrics = backtest['metrics']
+            latest_signal = signals[-1]
+            # Reported price stays the exact float64 close
+            latest_price = df['close'].iat[-1]
+            chart_index = pd.to_datetime(df['date']).to_numpy() if 'date' in df.columns else df.index.to_numpy()
+            chart_returns = (backtest['cumulative_return'], backtest['buy_and_hold'])
+            # The compact curves are net of costs, so the chart depends on them too
+            chart_params = {"symbol": symbol, "compact": True, **backtest_costs()}
+        else:
+            # Run time series split validation
+            print("\nRunning time series validation...")
+            indicators = INDICATORS[symbol].update(df['close'].to_numpy(), lineage)
+            test_signals, model, scaler, features = time_series_split(df, indicators)
+
+            # Verify return calculation
+            return_check = verify_return_calculation(test_signals)
+            print(return_check)
+
+            # Calculate risk metrics
+            METRICS.stage("backtest")
+            risk_metrics = calculate_risk_metrics(test_signals, **backtest_costs())
+
+            # Get latest signal and price
+            latest_date = test_signals.index[-1]
+            latest_signal = test_signals.loc[latest_date, 'Signal']
+            latest_price = test_signals.loc[latest_date, 'Close']
+            chart_index = test_signals.index.to_numpy()
+            chart_returns = (test_signals['Cumulative_Return'].to_numpy(), test_signals['Buy_and_Hold'].to_numpy())
+            chart_params = {"symbol": symbol, "compact": False}
         
         # Convert signal to text
         signal_text = "HOLD" if latest_signal == 0 else "BUY" if latest_signal == 1 else "SELL"
@@ -579,25 +963,18 @@ def predict_macd():
             price_change = df['close'].iloc[-1] - df['close'].iloc[-2]
             percent_change = (price_change / df['close'].iloc[-2]) * 100
             
-        # Generate and save MACD performance plot
+        # Queue the MACD performance plot
+        METRICS.stage("render")
+        image_name = None
         try:
-            plt.figure(figsize=(12, 6))
-            plt.plot(test_signals.index, test_signals['Cumulative_Return'], label='Model Strategy')
-            plt.plot(test_signals.index, test_signals['Buy_and_Hold'], label='Buy and Hold')
-            plt.title('AAPL Trading Strategy Performance (MACD)')
-            plt.xlabel('Date')
-            plt.ylabel('Cumulative Return')
-            plt.legend()
-            plt.grid(True)
-            
-            # Save the plot
-            image_path = os.path.join(GLOBAL_ASSETS_DIR, "macd_analysis.png")
-            plt.savefig(image_path, dpi=300, bbox_inches='tight')
-            plt.close('all')
-            
-            print(f"✅ MACD image saved at: {image_path}")
+            image_name = CHARTS.submit("macd", data_version, chart_params, {
+                "symbol": symbol or "AAPL",
+                "index": chart_index,
+                "cumulative_return": chart_returns[0],
+                "buy_and_hold": chart_returns[1],
+            })
         except Exception as e:
-            print(f"❌ Error generating MACD chart: {str(e)}")
+            print(f"❌ Error queueing MACD chart: {str(e)}")
             traceback.print_exc()
             # Continue execution - we can still return the prediction even if chart fails
 
@@ -613,15 +990,16 @@ def predict_macd():
             signal_value = 0
             
         # Return MACD prediction
-        base_url = request.host_url.rstrip("/")
+        METRICS.stage("serialize")
         return jsonify({
             "message": formatted_signal,
             "signal": signal_text,
             "price": float(latest_price),
             "change": float(price_change),
             "change_percent": float(percent_change),
-            "image_url": f"{base_url}/public/macd_analysis.png",
+            "image_url": chart_url(image_name),
             "model_type": "macd",
+            "model_version": model_version,
             "risk_metrics": risk_metrics
         })
 
@@ -634,41 +1012,42 @@ def predict_macd():
 
 @app.route("/api/predict-transformer", methods=["GET"])
 @cross_origin()
+@cached_prediction("transformer")
 def predict_transformer():
     try:
+        METRICS.stage("load")
         # Check if Transformer model is loaded
-        if transformer_model is None or transformer_scaler is None:
+        transformer, model_version = MODELS.snapshot("transformer")
+        if transformer is None:
             return jsonify({"message": "❌ Transformer model not loaded. Check server logs."}), 500
 
-        data_path = os.path.join(DATA_DIR, "stock_data.csv")
-
         # Load stock data
         try:
-            if not os.path.exists(data_path):
+            symbol = request_symbol()
+            market_data = market_data_for(symbol)
+            if not market_data.exists():
                 return jsonify({"message": "❌ Stock data file not found! Please fetch data first."}), 404
                 
-            df = pd.read_csv(data_path)
-            print(f"✅ Successfully loaded stock data with {len(df)} rows for Transformer analysis")
+            df, data_version, lineage = market_data.snapshot()
+            print(f"✅ Using stock data with {len(df)} rows for Transformer analysis")
         except Exception as e:
             print(f"❌ Error reading CSV for Transformer analysis: {str(e)}")
             return jsonify({"message": f"❌ Error reading stock data: {str(e)}"}), 400
 
         # Prepare data for prediction
-        look_back = 60
-        close_prices = df['close'].values.reshape(-1, 1)
-        scaled = transformer_scaler.transform(close_prices)
-
-        X = []
-        for i in range(look_back, len(scaled)):
-            X.append(scaled[i - look_back:i, 0])
-        X = np.array(X).reshape(-1, look_back, 1)
+        METRICS.stage("predict")
+        look_back = TRANSFORMER_LOOK_BACK
+        close_prices = df['close'].to_numpy(dtype=np.float64)
+        if len(close_prices) <= look_back:
+            return jsonify({"message": "⚠️ Not enough stock data to make a prediction"}), 400
 
-        # Make prediction
-        predicted = transformer_model.predict(X, verbose=0)
-        predicted = transformer_scaler.inverse_transform(predicted).flatten()
-        actual = transformer_scaler.inverse_transform(scaled[look_back:]).flatten()
+        # Make prediction (only windows not seen before for this history reach the model)
+        predicted = TRANSFORMER_CACHE[symbol].predictions(
+            (lineage, model_version), close_prices, partial(predict_transformer_windows, transformer))
+        actual = close_prices[look_back:]
 
         # Generate signals
+        METRICS.stage("backtest")
         signals = []
         for i in range(1, len(predicted)):
             if predicted[i] > actual[i - 1]:
@@ -681,6 +1060,11 @@ def predict_transformer():
 
         # Get the latest signal
         latest_signal = signals[-1]
+
+        # Backtest the signals, holding each BUY/SELL until the next one
+        signals = np.asarray(signals)
+        transformer_position = positions_from_signals(np.where(signals == "BUY", 1, np.where(signals == "SELL", -1, 0)))
+        risk_metrics = run_backtest(actual, transformer_position, **backtest_costs())['metrics']
         
         # Get latest price
         latest_price = df['close'].iloc[-1]
@@ -692,45 +1076,21 @@ def predict_transformer():
             price_change = df['close'].iloc[-1] - df['close'].iloc[-2]
             percent_change = (price_change / df['close'].iloc[-2]) * 100
 
-        # Generate and save visualization
+        # Queue the visualization
+        METRICS.stage("render")
+        image_name = None
         try:
-            plt.figure(figsize=(12, 6))
-            
-            # Plot actual prices
-            plt.plot(df.index[-len(actual):], actual, label='Actual Price', color='blue')
-            
-            # Plot predicted prices
-            plt.plot(df.index[-len(predicted):], predicted, label='Predicted Price', color='red', linestyle='--')
-            
-            # Add buy/sell markers
-            buy_indices = [i for i, sig in enumerate(signals) if sig == "BUY"]
-            sell_indices = [i for i, sig in enumerate(signals) if sig == "SELL"]
-            
-            plt.scatter(
-                df.index[-len(signals):][buy_indices],
-                actual[buy_indices],
-                color='green', label='Buy Signal', marker='^', s=100, zorder=5
-            )
-            plt.scatter(
-                df.index[-len(signals):][sell_indices],
-                actual[sell_indices],
-                color='red', label='Sell Signal', marker='v', s=100, zorder=5
-            )
-            
-            plt.title("Transformer Model Price Prediction and Signals", fontsize=14)
-            plt.legend()
-            plt.xlabel("Day")
-            plt.ylabel("Price ($)")
-            plt.grid(True, alpha=0.3)
-
-            # Save the plot
-            image_path = os.path.join(GLOBAL_ASSETS_DIR, "transformer_analysis.png")
-            plt.savefig(image_path, dpi=300, bbox_inches='tight')
-            plt.close('all')
-
-            print(f"✅ Transformer analysis image saved at: {image_path}")
+            image_name = CHARTS.submit(
+                "transformer", data_version,
+                {"symbol": symbol, "model": model_version},
+                {
+                    "index": df.index[-len(actual):].to_numpy(),
+                    "actual": actual,
+                    "predicted": np.asarray(predicted),
+                    "signals": np.asarray(signals),
+                })
         except Exception as e:
-            print(f"❌ Error generating Transformer chart: {str(e)}")
+            print(f"❌ Error queueing Transformer chart: {str(e)}")
             traceback.print_exc()
 
         # Format the signal for response
@@ -742,15 +1102,18 @@ def predict_transformer():
             formatted_signal = "↔️ Transformer Neutral (Hold)"
 
         # Return prediction
-        base_url = request.host_url.rstrip("/")
+        METRICS.stage("serialize")
         return jsonify({
             "message": formatted_signal,
             "signal": latest_signal,
             "price": float(latest_price),
             "change": float(price_change),
             "change_percent": float(percent_change),
-            "image_url": f"{base_url}/public/transformer_analysis.png",
-            "model_type": "transformer"
+            "image_url": chart_url(image_name),
+            "model_type": "transformer",
+            "model_version": model_version,
+            "model_backend": TRANSFORMER_BACKEND,
+            "risk_metrics": risk_metrics
         })
 
     except Exception as e:
@@ -760,15 +1123,719 @@ def predict_transformer():
         return jsonify({"message": f"❌ Error in Transformer prediction: {str(e)}"}), 500
 
 
+# Models /api/predict-batch can score, in the order they are reported
+BATCH_MODELS = ["moving_average", "sentiment", "macd", "transformer"]
+MAX_BATCH_SYMBOLS = 500
+
+def price_summary(close):
+    """Latest price and change from the previous bar, as the single-model routes report them"""
+    price_change = 0.0
+    percent_change = 0.0
+    if len(close) > 1:
+        price_change = close[-1] - close[-2]
+        percent_change = (price_change / close[-2]) * 100
+    return {"price": float(close[-1]), "change": float(price_change), "change_percent": float(percent_change)}
+
+def batch_moving_average(entries):
+    """Score every symbol with one scaler.transform and one model.predict call"""
+    moving_average, model_version = MODELS.snapshot("moving_average")
+    if moving_average is None:
+        raise RuntimeError("Moving average model not loaded")
+    model, scaler = moving_average
+    ready = [e for e in entries if len(e["close"]) >= 200]
+    results = {e["key"]: {"error": "Not enough stock data to make a prediction"}
+               for e in entries if len(e["close"]) < 200}
+    if ready:
+        features = np.array([[e["indicators"]["sma_50"][-1], e["indicators"]["sma_200"][-1]] for e in ready])
+        predictions = model.predict(scaler.transform(features))
+        for entry, prediction in zip(ready, predictions):
+            message = "📈 Uptrend (Buy)" if prediction == 1 else "📉 Downtrend (Sell)"
+            results[entry["key"]] = {"message": message, "signal": message.split(" ")[1].strip("()")}
+    return results, model_version
+
+def batch_sentiment(entries):
+    """Latest day's sentiment per symbol, every symbol scored in one sentiment_model.predict call"""
+    sentiment_model, model_version = MODELS.snapshot("sentiment")
+    if sentiment_model is None:
+        raise RuntimeError("Sentiment model not loaded")
+    results = {}
+    if entries:
+        daily = [HEADLINES.daily(e["symbol"]) for e in entries]
+        # The last two bars are enough for the latest day's features (Returns needs the previous close)
+        features = pd.concat([
+            sentiment_features(e["frame"].iloc[-2:], daily_sentiment).iloc[-1:]
+            for e, (daily_sentiment, _) in zip(entries, daily)
+        ], ignore_index=True)
+        for entry, (_, headlines_version), prediction in zip(entries, daily, sentiment_model.predict(features)):
+            message = "📈 Positive Sentiment (Buy)" if prediction == 1 else "📉 Negative Sentiment (Sell)"
+            results[entry["key"]] = {"message": message, "signal": message.split(" ")[1].strip("()"),
+                                     "headlines_available": headlines_version is not None}
+    return results, model_version
+
+def batch_macd(entries):
+    """Latest MACD crossover per symbol, vectorized over the last two bars of every symbol"""
+    macd_model, model_version = MODELS.snapshot("macd")
+    if macd_model is None:
+        raise RuntimeError("MACD model not loaded")
+    ready = [e for e in entries if len(e["close"]) >= 2]
+    results = {e["key"]: {"error": "Not enough stock data to make a prediction"}
+               for e in entries if len(e["close"]) < 2}
+    if ready:
+        macd = np.array([e["indicators"]["macd"][-2:] for e in ready])
+        signal_line = np.array([e["indicators"]["signal_line"][-2:] for e in ready])
+        buy = (macd[:, 1] > signal_line[:, 1]) & (macd[:, 0] <= signal_line[:, 0])
+        sell = (macd[:, 1] < signal_line[:, 1]) & (macd[:, 0] >= signal_line[:, 0])
+        for entry, is_buy, is_sell in zip(ready, buy, sell):
+            if is_buy:
+                results[entry["key"]] = {"message": "📈 MACD Uptrend (Buy)", "signal": "BUY"}
+            elif is_sell:
+                results[entry["key"]] = {"message": "📉 MACD Downtrend (Sell)", "signal": "SELL"}
+            else:
+                results[entry["key"]] = {"message": "↔️ MACD Neutral (Hold)", "signal": "HOLD"}
+    return results, model_version
+
+def batch_transformer(entries):
+    """Latest Transformer signal per symbol from one batched forward pass
+
+    /api/predict-transformer's latest signal compares the prediction for the
+    window ending at the last bar (close[-61:-1]) with the previous close, so
+    that single window per symbol is all the batch needs.
+    """
+    transformer, model_version = MODELS.snapshot("transformer")
+    if transformer is None:
+        raise RuntimeError("Transformer model not loaded")
+    transformer_model, transformer_scaler = transformer
+    look_back = TRANSFORMER_LOOK_BACK
+    ready = [e for e in entries if len(e["close"]) > look_back + 1]
+    results = {e["key"]: {"error": "Not enough stock data to make a prediction"}
+               for e in entries if len(e["close"]) <= look_back + 1}
+    if ready:
+        windows = np.array([e["close"][-look_back - 1:-1] for e in ready])
+        scaled = transformer_scaler.transform(windows.reshape(-1, 1)).reshape(len(ready), look_back, 1)
+        predicted = transformer_scaler.inverse_transform(
+            TRANSFORMER_BATCHER.predict(transformer_model, scaled)).flatten()
+        for entry, prediction in zip(ready, predicted):
+            previous = entry["close"][-2]
+            if prediction > previous:
+                results[entry["key"]] = {"message": "📈 Transformer Uptrend (Buy)", "signal": "BUY"}
+            elif prediction < previous:
+                results[entry["key"]] = {"message": "📉 Transformer Downtrend (Sell)", "signal": "SELL"}
+            else:
+                results[entry["key"]] = {"message": "↔️ Transformer Neutral (Hold)", "signal": "HOLD"}
+    return results, model_version
+
+BATCH_SCORERS = {
+    "moving_average": batch_moving_average,
+    "sentiment": batch_sentiment,
+    "macd": batch_macd,
+    "transformer": batch_transformer,
+}
+
+
+@app.route("/api/predict-batch", methods=["POST"])
+@cross_origin()
+def predict_batch():
+    """Signals for many symbols x models in one call
+
+    Body: {"symbols": ["AAPL", ...], "models": ["macd", ...]}; both optional.
+    Without symbols the legacy data/stock_data.csv is scored (key "default").
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        requested_symbols = payload.get("symbols") or [None]
+        requested_models = payload.get("models") or BATCH_MODELS
+
+        if not isinstance(requested_symbols, list) or len(requested_symbols) > MAX_BATCH_SYMBOLS:
+            return jsonify({"message": f"❌ symbols must be a list of at most {MAX_BATCH_SYMBOLS} tickers"}), 400
+        unknown_models = [name for name in requested_models if name not in BATCH_SCORERS]
+        if unknown_models:
+            return jsonify({"message": f"❌ Unknown models: {', '.join(map(str, unknown_models))}"}), 400
+
+        # Load every symbol and its shared features once, for all models
+        METRICS.stage("load")
+        entries = []
+        errors = {}
+        for requested in requested_symbols:
+            key = requested or "default"
+            try:
+                symbol = normalize_symbol(requested) if requested else None
+                key = symbol or "default"
+                market_data = market_data_for(symbol)
+                if not market_data.exists():
+                    errors[key] = "Stock data file not found"
+                    continue
+                df, data_version, lineage = market_data.snapshot()
+                close = df['close'].to_numpy(dtype=np.float64)
+                if len(close) == 0:
+                    errors[key] = "No stock data"
+                    continue
+                entries.append({
+                    "key": key,
+                    "symbol": symbol,
+                    "frame": df,
+                    "close": close,
+                    "indicators": INDICATORS[symbol].update(close, lineage),
+                })
+            except Exception as e:
+                errors[key] = str(e)
+
+        METRICS.stage("predict")
+        results = {entry["key"]: dict(price_summary(entry["close"]), signals={}) for entry in entries}
+        for name in requested_models:
+            try:
+                scored, model_version = BATCH_SCORERS[name](entries)
+            except Exception as e:
+                print(f"❌ Error in batch {name} prediction: {str(e)}")
+                scored, model_version = {entry["key"]: {"error": str(e)} for entry in entries}, None
+            for key, result in scored.items():
+                results[key]["signals"][name] = dict(result, model_version=model_version)
+
+        METRICS.stage("serialize")
+        return jsonify({"results": results, "errors": errors, "models": list(requested_models)})
+
+    except Exception as e:
+        error_traceback = traceback.format_exc()
+        print(f"❌ Error in batch prediction: {str(e)}")
+        print(f"Traceback: {error_traceback}")
+        return jsonify({"message": f"❌ Error in batch prediction: {str(e)}"}), 500
+
+# /api/predict-all runs the single-model routes side by side on this pool. The
+# heavy parts (pandas/NumPy, sklearn, the Transformer forward pass) release the
+# GIL; charts are still rendered by CHARTS' process pool.
+PREDICT_ALL_ROUTES = {
+    "moving_average": predict,
+    "sentiment": predict_sentiment,
+    "macd": predict_macd,
+    "transformer": predict_transformer,
+}
+PREDICT_ALL_TIMEOUT_SECONDS = float(os.environ.get("PREDICT_ALL_TIMEOUT_SECONDS", 30))
+PREDICT_ALL_WORKERS = int(os.environ.get("PREDICT_ALL_WORKERS", 16))
+PREDICT_ALL_POOL = ThreadPoolExecutor(max_workers=PREDICT_ALL_WORKERS, thread_name_prefix="predict-all")
+
+def run_model_route(view, profile=None):
+    """Call a single-model route in this thread; returns (JSON body, seconds)
+
+    profile is the /api/predict-all request's profile, if any: the copied
+    request context starts with an empty g, so it is handed over explicitly
+    to make the route skip the response cache as a profiled request does.
+    """
+    started = time.perf_counter()
+    if profile is not None:
+        g.profile = profile
+    try:
+        response = make_response(view())
+    finally:
+        # The /api/predict-all request finishes the profile, not this context's teardown
+        g.pop("profile", None)
+    body = response.get_json(silent=True) or {}
+    if response.status_code != 200:
+        body = dict(body, status=response.status_code)
+    return body, time.perf_counter() - started
+
+
+@app.route("/api/predict-all", methods=["GET"])
+@cross_origin()
+def predict_all():
+    """Every model's result for one dashboard load, computed concurrently
+
+    Query: ?symbol=, ?models=macd,transformer (default all), ?timeout= seconds
+    per model (default PREDICT_ALL_TIMEOUT_SECONDS). Each result is the body
+    the model's own route returns. A model that misses the timeout is reported
+    with an error; its computation finishes in the background and lands in the
+    response cache for the next load.
+    """
+    try:
+        METRICS.stage("load")
+        names = [name for name in request.args.get("models", "").split(",") if name] or list(PREDICT_ALL_ROUTES)
+        unknown = [name for name in names if name not in PREDICT_ALL_ROUTES]
+        if unknown:
+            return jsonify({"message": f"❌ Unknown models: {', '.join(unknown)}"}), 400
+        timeout = min(float(request.args.get("timeout", PREDICT_ALL_TIMEOUT_SECONDS)), PREDICT_ALL_TIMEOUT_SECONDS)
+
+        symbol = request_symbol()
+        market_data = market_data_for(symbol)
+        if not market_data.exists():
+            return jsonify({"message": "❌ Stock data file not found! Please fetch data first."}), 404
+
+        # Parse the data and advance the shared indicators once, before the models ask for them
+        df, data_version, lineage = market_data.snapshot()
+        METRICS.stage("features")
+        INDICATORS[symbol].update(df['close'].to_numpy(), lineage)
+
+        METRICS.stage("predict")
+        futures = {
+            name: PREDICT_ALL_POOL.submit(copy_current_request_context(run_model_route), PREDICT_ALL_ROUTES[name],
+                                          g.get("profile"))
+            for name in names
+        }
+        # All models start together, so one deadline gives each of them the full timeout
+        deadline = time.monotonic() + timeout
+        results = {}
+        timings = {}
+        for name, future in futures.items():
+            try:
+                results[name], seconds = future.result(timeout=max(deadline - time.monotonic(), 0))
+                timings[name] = round(seconds * 1000, 2)
+            except FuturesTimeout:
+                print(f"⚠️ Warning: {name} missed the {timeout:g}s deadline of /api/predict-all")
+                results[name] = {"message": f"❌ {name} prediction timed out after {timeout:g}s", "status": 504}
+            except Exception as e:
+                print(f"❌ Error in {name} prediction: {str(e)}")
+                results[name] = {"message": f"❌ Error in {name} prediction: {str(e)}", "status": 500}
+
+        METRICS.stage("serialize")
+        return jsonify({
+            "symbol": symbol or "default",
+            "data_version": data_version,
+            "results": results,
+            "timings_ms": timings,
+        })
+
+    except ValueError as e:
+        return jsonify({"message": f"❌ {str(e)}"}), 400
+    except Exception as e:
+        error_traceback = traceback.format_exc()
+        print(f"❌ Error in combined prediction: {str(e)}")
+        print(f"Traceback: {error_traceback}")
+        return jsonify({"message": f"❌ Error in combined prediction: {str(e)}"}), 500
+
+# /api/chart-data: the series behind each chart, downsampled to the client's pixel width
+CHART_DATA_WIDTH = 800
+MAX_CHART_DATA_WIDTH = 10000
+
+# Each returns the full-history series of a chart as {"x", "series": {name: values},
+# "position", "price"} and optionally "meta" for the response: position is the model's
+# exposure per bar (1 long, -1 short, 0 flat) and a buy or sell is marked at price
+# wherever it changes
+def moving_average_chart_series(symbol, df, lineage):
+    close = df['close'].to_numpy(dtype=np.float64)
+    indicators = INDICATORS[symbol].update(close, lineage)
+    sma_50, sma_200 = indicators['sma_50'], indicators['sma_200']
+    # Long while SMA 50 is above SMA 200, short otherwise, once both exist (as in the backtest)
+    position = np.where(np.isnan(sma_200), 0.0, np.where(sma_50 > sma_200, 1.0, -1.0))
+    return {"x": bar_timestamps(df), "series": {"close": close, "sma_50": sma_50, "sma_200": sma_200},
+            "position": position, "price": close}
+
+def sentiment_chart_series(symbol, df, lineage):
+    sentiment_model, _ = MODELS.snapshot("sentiment")
+    if sentiment_model is None:
+        raise RuntimeError("Sentiment model not loaded")
+    daily_sentiment, headlines_version = HEADLINES.daily(symbol)
+    features = sentiment_features(df, daily_sentiment)
+    predictions = np.asarray(sentiment_model.predict(features))
+    positive_probability = sentiment_model.predict_proba(features)[:, list(sentiment_model.classes_).index(1)]
+    close = df['close'].to_numpy(dtype=np.float64)
+    return {"x": bar_timestamps(df), "series": {"close": close, "sentiment_score": positive_probability},
+            "position": np.where(predictions == 1, 1.0, -1.0), "price": close,
+            "meta": {"headlines_available": headlines_version is not None}}
+
+def macd_chart_series(symbol, df, lineage):
+    close = df['close'].to_numpy(dtype=np.float64)
+    indicators = INDICATORS[symbol].update(close, lineage)
+    signals = crossover_signals(indicators['macd'], indicators['signal_line'])
+    position = positions_from_signals(signals)
+    backtest = run_backtest(close, position, **backtest_costs())
+    series = {name: indicators[name] for name in ('macd', 'signal_line', 'histogram')}
+    series.update(close=close, cumulative_return=backtest['cumulative_return'], buy_and_hold=backtest['buy_and_hold'])
+    return {"x": bar_timestamps(df), "series": series, "position": position, "price": close}
+
+def transformer_chart_series(symbol, df, lineage):
+    transformer, model_version = MODELS.snapshot("transformer")
+    if transformer is None:
+        raise RuntimeError("Transformer model not loaded")
+    look_back = TRANSFORMER_LOOK_BACK
+    close = df['close'].to_numpy(dtype=np.float64)
+    if len(close) <= look_back:
+        raise ValueError("Not enough stock data to make a prediction")
+    predicted = TRANSFORMER_CACHE[symbol].predictions(
+        (lineage, model_version), close, partial(predict_transformer_windows, transformer))
+    actual = close[look_back:]
+    # BUY when the next predicted price is above the last actual one, as in /api/predict-transformer
+    signals = np.concatenate(([0.0], np.sign(predicted[1:] - actual[:-1])))
+    return {"x": bar_timestamps(df)[look_back:], "series": {"actual": actual, "predicted": np.asarray(predicted)},
+            "position": positions_from_signals(signals), "price": actual}
+
+CHART_SERIES = {
+    "moving_average": moving_average_chart_series,
+    "sentiment": sentiment_chart_series,
+    "macd": macd_chart_series,
+    "transformer": transformer_chart_series,
+}
+# Series computed from the indicators alone; the model is not loaded for them
+INDICATOR_CHART_SERIES = {"moving_average", "macd"}
+
+@app.route("/api/chart-data/<model_name>", methods=["GET"])
+@cross_origin()
+def chart_data(model_name):
+    """Series and buy/sell markers of a model's chart, downsampled for the client to draw
+
+    Query: ?symbol=, ?width= (points per series, default 800), ?last= (only
+    the last N bars), ?format=json|arrow (Arrow needs pyarrow). Series are
+    reduced with LTTB, so a long history costs the same few KB as a short one
+    instead of a 300-DPI PNG. Cached and revalidated like the prediction routes.
+    """
+    if model_name not in CHART_SERIES:
+        return jsonify({"message": f"❌ Unknown model '{model_name}' (use one of: {', '.join(CHART_SERIES)})"}), 404
+    extra_version = (lambda: HEADLINES.version()) if model_name == "sentiment" else None
+    return cached_prediction(model_name, extra_version=extra_version,
+                             uses_model=model_name not in INDICATOR_CHART_SERIES)(chart_data_response)(model_name)
+
+def chart_data_response(model_name):
+    try:
+        METRICS.stage("load")
+        output = request.args.get('format', 'json')
+        if output not in ('json', 'arrow'):
+            return jsonify({"message": "❌ format must be json or arrow"}), 400
+        if output == 'arrow' and not arrow_available():
+            return jsonify({"message": "❌ Arrow output needs pyarrow (pip install pyarrow)"}), 400
+        width = int(request.args.get('width', CHART_DATA_WIDTH))
+        if not 3 <= width <= MAX_CHART_DATA_WIDTH:
+            return jsonify({"message": f"❌ width must be between 3 and {MAX_CHART_DATA_WIDTH}"}), 400
+        last = int(request.args['last']) if request.args.get('last') else None
+        if last is not None and last < 1:
+            return jsonify({"message": "❌ last must be at least 1"}), 400
+
+        symbol = request_symbol()
+        market_data = market_data_for(symbol)
+        if not market_data.exists():
+            return jsonify({"message": "❌ Stock data file not found! Please fetch data first."}), 404
+        df, data_version, lineage = market_data.snapshot()
+        if df.empty:
+            return jsonify({"message": "⚠️ No stock data to chart"}), 400
+
+        METRICS.stage("features")
+        computed = CHART_SERIES[model_name](symbol, df, lineage)
+
+        METRICS.stage("render")
+        # Trades are found on the full history, so the first bar of a window is not a trade by itself
+        position = computed["position"]
+        previous = np.concatenate(([0.0], position[:-1]))
+        buy = (position != previous) & (position > 0)
+        sell = (position != previous) & (position < 0)
+        window = slice(-last, None) if last else slice(None)
+        x, price, buy, sell = computed["x"][window], computed["price"][window], buy[window], sell[window]
+        chart = ChartData(
+            x, {name: (x, values[window]) for name, values in computed["series"].items()},
+            buy=(x[buy], price[buy]), sell=(x[sell], price[sell]), width=width,
+            meta=dict(computed.get("meta", {}), model=model_name, symbol=symbol or "default",
+                      data_version=data_version))
+
+        METRICS.stage("serialize")
+        if output == 'arrow':
+            return Response(chart.to_arrow(), mimetype=ARROW_MIMETYPE)
+        return jsonify(chart.to_json())
+
+    except ValueError as e:
+        return jsonify({"message": f"❌ {str(e)}"}), 400
+    except Exception as e:
+        error_traceback = traceback.format_exc()
+        print(f"❌ Error building {model_name} chart data: {str(e)}")
+        print(f"Traceback: {error_traceback}")
+        return jsonify({"message": f"❌ Error building chart data: {str(e)}"}), 500
+
+# Live bars: one computation per ingested bar, fanned out to every /api/stream subscriber
+SIGNAL_HUB = SignalHub(max_queue=int(os.environ.get("STREAM_QUEUE_SIZE", 100)))
+STREAM_MODELS = model_names_from_env("STREAM_MODELS") or ["moving_average", "macd", "transformer"]
+STREAM_HEARTBEAT_SECONDS = float(os.environ.get("STREAM_HEARTBEAT_SECONDS", 15))
+# How often each process checks subscribed symbols for bars ingested by another worker
+STREAM_POLL_SECONDS = float(os.environ.get("STREAM_POLL_SECONDS", 1))
+# Every open stream holds a server thread, so leave at least one free for other requests
+MAX_STREAMS = int(os.environ.get("MAX_STREAMS", max(1, int(os.environ.get("GUNICORN_THREADS", 4)) - 1)))
+STREAM_SLOTS = threading.BoundedSemaphore(MAX_STREAMS)
+INGEST_LOCKS = PerSymbol(threading.Lock)
+# Data version and row count of the last event published per symbol by this process
+STREAM_VERSIONS = {}
+LIVE_FEEDS = []
+
+def json_value(value):
+    """Plain JSON value for a numpy / pandas scalar (NaN becomes null)"""
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+def ingest_bars(symbol, rows):
+    """Append bars to symbol's data, advance indicators and signals once, publish the result
+
+    Returns the published event. Every subscriber of the symbol receives the
+    same event, so the work per bar does not grow with the number of viewers.
+    The bars are written to the shared data, where the other workers pick
+    them up (see refresh_stream()).
+    """
+    with INGEST_LOCKS[symbol]:
+        METRICS.stage("load")
+        df, data_version, lineage = market_data_for(symbol).append(rows)
+        return publish_signals(symbol, df, data_version, lineage, len(rows))
+
+def refresh_stream(symbol):
+    """Publish an event for symbol if its data changed since this process last published one
+
+    Runs in every worker for the symbols it has subscribers of, so bars
+    ingested by another worker (or written to the data by hand) reach them too.
+    """
+    with INGEST_LOCKS[symbol]:
+        df, data_version, lineage = market_data_for(symbol).snapshot()
+        last = STREAM_VERSIONS.get(symbol)
+        if last is None:
+            # Subscribers already start from the hub's latest event, if any
+            STREAM_VERSIONS[symbol] = (data_version, len(df))
+        elif last[0] != data_version:
+            publish_signals(symbol, df, data_version, lineage, max(len(df) - last[1], 0))
+
+def publish_signals(symbol, df, data_version, lineage, bars):
+    """Advance indicators and signals to the last bar of df and publish them (under INGEST_LOCKS[symbol])"""
+    close = df['close'].to_numpy(dtype=np.float64)
+    METRICS.stage("features")
+    indicators = INDICATORS[symbol].update(close, lineage)
+
+    # The batch scorers only look at the latest bar(s), so each is O(1) per new bar
+    entry = {"key": symbol or "default", "symbol": symbol, "frame": df, "close": close, "indicators": indicators}
+    METRICS.stage("predict")
+    signals = {}
+    for name in STREAM_MODELS:
+        try:
+            scored, model_version = BATCH_SCORERS[name]([entry])
+            signals[name] = dict(scored[entry["key"]], model_version=model_version)
+        except Exception as e:
+            signals[name] = {"error": str(e)}
+
+    event = dict(
+        price_summary(close),
+        symbol=symbol or "default",
+        data_version=data_version,
+        rows=len(close),
+        bars=bars,
+        bar={col: json_value(df[col].iloc[-1]) for col in df.columns},
+        indicators={name: json_value(values[-1]) for name, values in indicators.items()},
+        signals=signals,
+    )
+    METRICS.stage("publish")
+    STREAM_VERSIONS[symbol] = (data_version, len(df))
+    return SIGNAL_HUB.publish(symbol, event)
+
+def bars_from_payload(payload):
+    """DataFrame of bars from {"bars": [...]}, a list of bars or a single bar object"""
+    if isinstance(payload, dict) and "bars" in payload:
+        payload = payload["bars"]
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list) or not payload or not all(isinstance(bar, dict) for bar in payload):
+        raise ValueError("Expected a bar object or a non-empty list of bars")
+    rows = pd.DataFrame(payload)
+    for col in ["open", "high", "low", "close", "volume"]:
+        if col in rows.columns:
+            rows[col] = pd.to_numeric(rows[col])
+    return rows
+
+
+@app.route("/api/ingest", methods=["POST"])
+def ingest():
+    """Append live bars for ?symbol= and push the updated signals to /api/stream subscribers
+
+    Body: {"bars": [{"timestamp": ..., "open": ..., "high": ..., "low": ...,
+    "close": ..., "volume": ...}, ...]} or a single bar. Requires X-Admin-Token.
+    """
+    if not admin_authorized():
+        return jsonify({"message": "❌ Not authorized"}), 403
+    try:
+        symbol = request_symbol()
+        if not market_data_for(symbol).exists():
+            return jsonify({"message": "❌ Stock data file not found! Import the history first."}), 404
+        rows = bars_from_payload(request.get_json(silent=True))
+        event = ingest_bars(symbol, rows)
+        METRICS.stage("serialize")
+        return jsonify(event)
+
+    except ValueError as e:
+        return jsonify({"message": f"❌ {str(e)}"}), 400
+    except Exception as e:
+        error_traceback = traceback.format_exc()
+        print(f"❌ Error ingesting bars: {str(e)}")
+        print(f"Traceback: {error_traceback}")
+        return jsonify({"message": f"❌ Error ingesting bars: {str(e)}"}), 500
+
+
+@app.route("/api/stream", methods=["GET"])
+@cross_origin()
+def stream():
+    """Server-Sent Events: the latest signal event for ?symbol=, then one event per ingested batch
+
+    At most MAX_STREAMS streams per process; beyond that the answer is 503
+    (the EventSource retries, possibly landing on a less busy worker).
+    """
+    try:
+        symbol = request_symbol()
+    except ValueError as e:
+        return jsonify({"message": f"❌ {str(e)}"}), 400
+    try:
+        # Bars other workers ingest from now on are told apart from this version
+        refresh_stream(symbol)
+    except FileNotFoundError:
+        pass
+    if not STREAM_SLOTS.acquire(blocking=False):
+        return jsonify({"message": "❌ Too many open streams, try again later"}), 503, {"Retry-After": "5"}
+    subscription = SIGNAL_HUB.subscribe(symbol)
+
+    def events():
+        yield "retry: 3000\n\n"
+        while True:
+            event = subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+            # Comments keep proxies from closing an idle connection
+            yield format_sse(event) if event is not None else ": keep-alive\n\n"
+
+    def close():
+        subscription.close()
+        STREAM_SLOTS.release()
+
+    response = Response(events(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(close)
+    return response
+
+
+# Upper bound on symbols x grid points one /api/sweep call may evaluate
+MAX_SWEEP_EVALUATIONS = 5000
+# Started on the first sweep and kept, so later sweeps do not pay for new interpreters
+SWEEP_POOL = None
+SWEEP_POOL_LOCK = threading.Lock()
+
+def sweep_pool():
+    global SWEEP_POOL
+    with SWEEP_POOL_LOCK:
+        if SWEEP_POOL is None:
+            SWEEP_POOL = make_pool(
+                processes=int(os.environ.get("SWEEP_PROCESSES", os.cpu_count() or 1)),
+                # Fresh interpreters: forking a process that holds TensorFlow is not safe
+                mp_context=get_context("spawn"))
+        return SWEEP_POOL
+
+@app.route("/api/sweep", methods=["POST"])
+@cross_origin()
+def sweep():
+    """Rank SMA / MACD parameter grids by backtest metrics across symbols
+
+    Body (all optional): {"symbols": [...], "sma_fast": [...], "sma_slow": [...],
+    "macd_fast": [...], "macd_slow": [...], "macd_signal": [...],
+    "rank_by": "sharpe_ratio", "top": 50, "cost_bps": 0, "slippage_bps": 0}
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        symbols = [normalize_symbol(s) if s else None for s in (payload.get("symbols") or [None])]
+        sma_pairs = sma_grid(payload.get("sma_fast", [50]), payload.get("sma_slow", [200]))
+        macd_triples = macd_grid(payload.get("macd_fast", [12]), payload.get("macd_slow", [26]),
+                                 payload.get("macd_signal", [9]))
+
+        evaluations = len(symbols) * (len(sma_pairs) + len(macd_triples))
+        if evaluations > MAX_SWEEP_EVALUATIONS:
+            return jsonify({"message": f"❌ Sweep too large ({evaluations} evaluations, max {MAX_SWEEP_EVALUATIONS})"}), 400
+        missing = [s for s in symbols if not market_data_for(s).exists()]
+        if missing:
+            return jsonify({"message": f"❌ No stock data for: {', '.join(s or 'default' for s in missing)}"}), 404
+
+        rank_by = payload.get("rank_by", "sharpe_ratio")
+        METRICS.stage("backtest")
+        pool = sweep_pool()
+        try:
+            results = run_sweep(
+                symbols, sma_pairs=sma_pairs, macd_triples=macd_triples, rank_by=rank_by,
+                transaction_cost=float(payload.get("cost_bps", 0)) / 10000,
+                slippage=float(payload.get("slippage_bps", 0)) / 10000,
+                data_dir=DATA_DIR, pool=pool,
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool for the next sweep
+            reset_sweep_pool(pool)
+            raise
+        METRICS.stage("serialize")
+        return jsonify({"rank_by": rank_by, "evaluations": evaluations,
+                        "results": results[:int(payload.get("top", 50))]})
+
+    except ValueError as e:
+        return jsonify({"message": f"❌ {str(e)}"}), 400
+    except Exception as e:
+        error_traceback = traceback.format_exc()
+        print(f"❌ Error in parameter sweep: {str(e)}")
+        print(f"Traceback: {error_traceback}")
+        return jsonify({"message": f"❌ Error in parameter sweep: {str(e)}"}), 500
+
+def reset_sweep_pool(pool=None):
+    """Forget the sweep pool (only if it is still pool, when given) so the next sweep starts a new one"""
+    global SWEEP_POOL
+    with SWEEP_POOL_LOCK:
+        if pool is None or SWEEP_POOL is pool:
+            SWEEP_POOL = None
+
+def wait_for_port(port, timeout=30):
+    """Block until something accepts connections on localhost:port (or timeout)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+def preload_model_names():
+    """Models to load before forking workers (PRELOAD_MODELS, default every fork-safe model)
+
+    TensorFlow's thread pools do not survive fork(), so the Keras Transformer is
+    never preloaded; with TRANSFORMER_BACKEND=lite it is plain numpy and can be.
+    """
+    names = model_names_from_env("PRELOAD_MODELS")
+    if names is None:
+        names = MODELS.names()
+    return [name for name in names if not (name == "transformer" and TRANSFORMER_BACKEND == "keras")]
+
+def start_background_tasks(port):
+    """Model warm-up (once port accepts connections) and the artifact watcher for this process"""
+    # WARM_MODELS=moving_average,macd limits the warm-up; WARM_MODELS= (empty) disables it
+    warm_models = model_names_from_env("WARM_MODELS")
+    if warm_models is None or warm_models:
+        MODELS.warm(warm_models, after=lambda: wait_for_port(port))
+
+    # Pick up replaced model files automatically (MODEL_WATCH_INTERVAL=0 disables polling)
+    watch_interval = float(os.environ.get("MODEL_WATCH_INTERVAL", 5))
+    if watch_interval > 0:
+        MODELS.watch(watch_interval)
+
+    # Pass bars ingested by other workers on to this process's stream subscribers (STREAM_POLL_SECONDS=0 disables)
+    if STREAM_POLL_SECONDS > 0:
+        SIGNAL_HUB.watch(refresh_stream, STREAM_POLL_SECONDS)
+
+    # Follow a growing CSV of live bars (LIVE_FEED_CSV) for LIVE_FEED_SYMBOL (default: the legacy data file)
+    feed_path = os.environ.get("LIVE_FEED_CSV")
+    if feed_path and not LIVE_FEEDS:
+        feed_symbol = os.environ.get("LIVE_FEED_SYMBOL")
+        feed_symbol = normalize_symbol(feed_symbol) if feed_symbol else None
+        # One worker follows the file; the others see its bars in the shared data
+        feed = CsvTailFeed(feed_path, lambda rows: ingest_bars(feed_symbol, rows),
+                           poll_interval=float(os.environ.get("LIVE_FEED_INTERVAL", 1)),
+                           lock_path=os.path.join(DATA_DIR, "live_feed.lock"))
+        LIVE_FEEDS.append(feed)
+        feed.start()
+
+def after_fork():
+    """Drop per-process state inherited from the parent (thread handles, process pools)"""
+    global PREDICT_ALL_POOL
+    CHARTS.after_fork()
+    MODELS.after_fork()
+    SIGNAL_HUB.after_fork()
+    TRANSFORMER_BATCHER.after_fork()
+    PREDICT_ALL_POOL = ThreadPoolExecutor(max_workers=PREDICT_ALL_WORKERS, thread_name_prefix="predict-all")
+    reset_sweep_pool()
+
 if __name__ == "__main__":
+    # Single-process fallback (e.g. local runs and Windows); production uses
+    # gunicorn -c gunicorn.conf.py wsgi:app for one process per core
     print("Starting prediction server...")
-    print(f"Moving average model status: {'Loaded' if model is not None else 'Not loaded'}")
-    print(f"Sentiment model status: {'Loaded' if sentiment_model is not None else 'Not loaded'}")
-    print(f"MACD model status: {'Loaded' if macd_model is not None else 'Not loaded'}")
-    print(f"Transformer model status: {'Loaded' if transformer_model is not None else 'Not loaded'}")
+    print(f"Registered models: {', '.join(MODELS.names())} (loaded on first use)")
     print(f"Data directory: {DATA_DIR}")
     print(f"Public directory: {GLOBAL_ASSETS_DIR}")
     
     # Use this for Render deployment
     port = int(os.environ.get("PORT", 10000))
-    app.run(host="0.0.0.0", port=port)
\ No newline at end of file
+    start_background_tasks(port)
+    serve(app, host="0.0.0.0", port=port, threads=int(os.environ.get("WAITRESS_THREADS", 8)))
@@ -0,0 +1,212 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from market_data import file_lock
+
+
+class Subscription:
+    """One subscriber's bounded event queue; the oldest events are dropped if it falls behind"""
+
+    def __init__(self, hub, symbol, max_queue):
+        self.hub = hub
+        self.symbol = symbol
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+
+    def put(self, event):
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Next event, or None if none arrived within timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class SignalHub:
+    """Fan-out of per-bar signal events to every subscriber of a symbol
+
+    Events are computed once by the publisher and handed to all subscribers,
+    so N dashboards cost one computation per bar. The latest event per symbol
+    is kept so a new subscriber starts from the current state.
+
+    Subscribers only hear from publishers in their own process; watch() lets
+    each process publish the changes other processes made to shared data.
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._latest = {}
+        self._sequence = 0
+        self._watcher = None
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, symbol):
+        subscription = Subscription(self, symbol, self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(symbol, set()).add(subscription)
+            latest = self._latest.get(symbol)
+        if latest is not None:
+            subscription.put(latest)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.symbol)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.symbol]
+
+    def symbols(self):
+        """Symbols with at least one subscriber"""
+        with self._lock:
+            return list(self._subscribers)
+
+    def watch(self, refresh, interval=1.0):
+        """Call refresh(symbol) for every subscribed symbol each interval seconds (one thread)"""
+        def run():
+            while True:
+                time.sleep(interval)
+                for symbol in self.symbols():
+                    try:
+                        refresh(symbol)
+                    except Exception as e:
+                        print(f"⚠️ Warning: Error refreshing stream for {symbol or 'default'}: {str(e)}")
+
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=run, name="stream-watcher", daemon=True)
+                self._watcher.start()
+            return self._watcher
+
+    def after_fork(self):
+        """Forget the parent's watcher thread; call in a freshly forked worker"""
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def publish(self, symbol, event):
+        """Stamp event with a sequence id and deliver it to symbol's subscribers"""
+        with self._lock:
+            self._sequence += 1
+            event = dict(event, id=self._sequence)
+            self._latest[symbol] = event
+            subscribers = list(self._subscribers.get(symbol, ()))
+            self.published += 1
+            self.delivered += len(subscribers)
+        for subscription in subscribers:
+            subscription.put(event)
+        return event
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": {str(symbol or "default"): len(subs) for symbol, subs in self._subscribers.items()},
+                "published": self.published,
+                "delivered": self.delivered,
+            }
+
+
+def format_sse(event, event_type="bar"):
+    """Server-Sent Events wire format for one JSON event"""
+    return f"id: {event.get('id', '')}\nevent: {event_type}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+class CsvTailFeed:
+    """Local feed adapter: follows a growing OHLCV CSV and hands new bars to on_bars
+
+    Only complete lines (ending in a newline) are consumed, so a writer that
+    is mid-line is picked up on the next poll. If the file shrinks it is
+    treated as a new file and read from the top.
+
+    With lock_path, only the process holding that lock follows the file, so
+    several server workers do not hand on the same bars; another one takes
+    over (from the end of the file) when it exits.
+    """
+
+    def __init__(self, path, on_bars, poll_interval=1.0, from_start=False, lock_path=None):
+        self.path = path
+        self.on_bars = on_bars
+        self.poll_interval = poll_interval
+        self.from_start = from_start
+        self.lock_path = lock_path
+        self._header = None
+        self._offset = None
+        self._thread = None
+        self.bars = 0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="csv-tail-feed", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def poll(self):
+        """Read any new complete lines; returns the number of bars handed on"""
+        if not os.path.exists(self.path):
+            return 0
+        size = os.path.getsize(self.path)
+        with open(self.path, "rb") as f:
+            if self._header is None or self._offset is None or size < self._offset:
+                first_open = self._header is None
+                self._header = f.readline().decode("utf-8").strip().split(",")
+                # By default only bars written after the feed started are new; a replaced file is read whole
+                self._offset = size if first_open and not self.from_start else f.tell()
+                if self._offset == size:
+                    return 0
+            f.seek(self._offset)
+            chunk = f.read()
+
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        if not complete:
+            return 0
+        self._offset += len(complete)
+        rows = [line.split(",") for line in complete.decode("utf-8").splitlines() if line.strip()]
+        if not rows:
+            return 0
+        frame = pd.DataFrame(rows, columns=self._header)
+        for col in frame.columns:
+            try:
+                frame[col] = pd.to_numeric(frame[col])
+            except ValueError:
+                pass  # Non-numeric column (e.g. a date string), keep as text
+        self.on_bars(frame)
+        self.bars += len(frame)
+        return len(frame)
+
+    def _run(self):
+        if self.lock_path is None:
+            self._follow()
+        else:
+            # Blocks until the process following the file exits
+            with file_lock(self.lock_path):
+                self._follow()
+
+    def _follow(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"⚠️ Warning: CSV feed {self.path} failed: {str(e)}")
+            time.sleep(self.poll_interval)
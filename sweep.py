@@ -0,0 +1,171 @@
+import argparse
+import itertools
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest import positions_from_signals, run_backtest
+from market_data import MarketDataStore, SymbolStore
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Strategy constants used by server.py, the default centre of a sweep
+DEFAULT_SMA_GRID = [(50, 200)]
+DEFAULT_MACD_GRID = [(12, 26, 9)]
+
+# Metrics of run_backtest() a sweep can be ranked by (higher is better)
+RANK_METRICS = ("sharpe_ratio", "total_return", "annualized_return", "max_drawdown", "win_rate",
+                "turnover", "trades")
+
+
+def sma_grid(fast_windows, slow_windows):
+    """All (fast, slow) SMA pairs with fast < slow"""
+    return [(fast, slow) for fast, slow in itertools.product(fast_windows, slow_windows) if fast < slow]
+
+
+def macd_grid(fast_spans, slow_spans, signal_spans):
+    """All (fast, slow, signal) MACD spans with fast < slow"""
+    return [(fast, slow, signal) for fast, slow, signal in itertools.product(fast_spans, slow_spans, signal_spans)
+            if fast < slow]
+
+
+def _init_worker():
+    """Pool initializer: import what _evaluate_symbol needs up front, and nothing of the server"""
+    import backtest  # noqa: F401
+
+
+def make_pool(processes=None, mp_context=None):
+    """Process pool for run_sweep(); keep it for many sweeps so workers start only once"""
+    return ProcessPoolExecutor(max_workers=processes, mp_context=mp_context, initializer=_init_worker)
+
+
+def _evaluate_symbol(task):
+    """Worker: evaluate every grid point for one symbol
+
+    The close prices are memory-mapped read-only, so all workers share the
+    same physical pages. Every distinct SMA window and EMA span is computed
+    once and reused by all grid points that need it.
+    """
+    close = np.load(task["close_path"], mmap_mode="r")[:task["rows"]]
+    close = np.asarray(close, dtype=np.float64)
+    series = pd.Series(close)
+    costs = task["costs"]
+    rows = []
+
+    smas = {window: series.rolling(window=window).mean().to_numpy()
+            for window in sorted({w for pair in task["sma_grid"] for w in pair})}
+    for fast, slow in task["sma_grid"]:
+        fast_sma, slow_sma = smas[fast], smas[slow]
+        # Flat until both averages exist, then long above / short below
+        position = np.where(fast_sma > slow_sma, 1.0, -1.0)
+        position[np.isnan(slow_sma) | np.isnan(fast_sma)] = 0.0
+        metrics = run_backtest(close, position, **costs)["metrics"]
+        rows.append(dict(metrics, symbol=task["symbol"], strategy="sma_crossover",
+                         params={"fast": fast, "slow": slow}))
+
+    emas = {span: series.ewm(span=span, adjust=False).mean().to_numpy()
+            for span in sorted({s for triple in task["macd_grid"] for s in triple[:2]})}
+    macds = {}
+    for fast, slow, signal in task["macd_grid"]:
+        if (fast, slow) not in macds:
+            macds[fast, slow] = emas[fast] - emas[slow]
+        macd = macds[fast, slow]
+        signal_line = pd.Series(macd).ewm(span=signal, adjust=False).mean().to_numpy()
+        # Same crossover rule as time_series_split()
+        signals = np.zeros(len(close))
+        signals[1:][(macd[1:] > signal_line[1:]) & (macd[:-1] <= signal_line[:-1])] = 1
+        signals[1:][(macd[1:] < signal_line[1:]) & (macd[:-1] >= signal_line[:-1])] = -1
+        metrics = run_backtest(close, positions_from_signals(signals), **costs)["metrics"]
+        rows.append(dict(metrics, symbol=task["symbol"], strategy="macd",
+                         params={"fast": fast, "slow": slow, "signal": signal}))
+    return rows
+
+
+def run_sweep(symbols, sma_pairs=None, macd_triples=None, rank_by="sharpe_ratio",
+              transaction_cost=0.0, slippage=0.0, periods_per_year=252, processes=None,
+              data_dir=os.path.join(BASE_DIR, "data"), mp_context=None, pool=None):
+    """Evaluate SMA and MACD parameter grids across symbols in a process pool
+
+    symbols: tickers from data/symbols; None stands for data/stock_data.csv.
+    Returns result rows (metrics + symbol, strategy, params) sorted best-first
+    by rank_by, one of RANK_METRICS (ValueError otherwise). pool (see
+    make_pool()) is used if given, else a pool is started for this sweep.
+    """
+    if rank_by not in RANK_METRICS:
+        raise ValueError(f"Unknown rank_by '{rank_by}' (use one of: {', '.join(RANK_METRICS)})")
+    sma_pairs = DEFAULT_SMA_GRID if sma_pairs is None else sma_pairs
+    macd_triples = DEFAULT_MACD_GRID if macd_triples is None else macd_triples
+    costs = {"transaction_cost": transaction_cost, "slippage": slippage, "periods_per_year": periods_per_year}
+    store = SymbolStore(os.path.join(data_dir, "symbols"))
+
+    with tempfile.TemporaryDirectory() as scratch:
+        tasks = []
+        for symbol in symbols:
+            if symbol:
+                data = store.open(symbol)
+                close_path = os.path.join(data.directory, "close.npy")
+                rows = len(data.get())
+            else:
+                # Spill the CSV's closes once so workers can map them like a symbol column
+                frame = MarketDataStore(os.path.join(data_dir, "stock_data.csv")).get()
+                close_path = os.path.join(scratch, "default_close.npy")
+                np.save(close_path, frame["close"].to_numpy(dtype=np.float64))
+                rows = len(frame)
+            tasks.append({"symbol": symbol or "default", "close_path": close_path, "rows": rows,
+                          "sma_grid": sma_pairs, "macd_grid": macd_triples, "costs": costs})
+
+        if pool is not None:
+            results = [row for rows in pool.map(_evaluate_symbol, tasks) for row in rows]
+        else:
+            with make_pool(processes, mp_context) as own_pool:
+                results = [row for rows in own_pool.map(_evaluate_symbol, tasks) for row in rows]
+
+    # A symbol too short to backtest reports an error instead of metrics
+    return sorted(results, key=lambda row: row.get(rank_by, float("-inf")), reverse=True)
+
+
+def _format_table(results):
+    header = f"{'symbol':<8} {'strategy':<14} {'params':<30} {'sharpe':>8} {'total':>9} {'max_dd':>9} {'trades':>7}"
+    lines = [header, "-" * len(header)]
+    for row in results:
+        params = ",".join(f"{key}={value}" for key, value in row["params"].items())
+        lines.append(f"{row['symbol']:<8} {row['strategy']:<14} {params:<30} {row['sharpe_ratio']:>8.3f} "
+                     f"{row['total_return']:>9.2%} {row['max_drawdown']:>9.2%} {row['trades']:>7}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grid search over SMA crossover and MACD strategy parameters")
+    parser.add_argument("--symbols", nargs="*", default=[],
+                        help="Tickers from data/symbols (default: data/stock_data.csv)")
+    parser.add_argument("--sma-fast", nargs="+", type=int, default=[50])
+    parser.add_argument("--sma-slow", nargs="+", type=int, default=[200])
+    parser.add_argument("--macd-fast", nargs="+", type=int, default=[12])
+    parser.add_argument("--macd-slow", nargs="+", type=int, default=[26])
+    parser.add_argument("--macd-signal", nargs="+", type=int, default=[9])
+    parser.add_argument("--cost-bps", type=float, default=0.0)
+    parser.add_argument("--slippage-bps", type=float, default=0.0)
+    parser.add_argument("--rank-by", default="sharpe_ratio", choices=RANK_METRICS)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20, help="Rows to print")
+    parser.add_argument("--json", dest="json_path", help="Also write all results to this JSON file")
+    args = parser.parse_args()
+
+    results = run_sweep(
+        args.symbols or [None],
+        sma_pairs=sma_grid(args.sma_fast, args.sma_slow),
+        macd_triples=macd_grid(args.macd_fast, args.macd_slow, args.macd_signal),
+        rank_by=args.rank_by,
+        transaction_cost=args.cost_bps / 10000,
+        slippage=args.slippage_bps / 10000,
+        processes=args.processes,
+    )
+    print(_format_table(results[:args.top]))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Wrote {len(results)} results to {args.json_path}")
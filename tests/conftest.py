@@ -0,0 +1,27 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The modules live at the repository root
+sys.path.insert(0, REPO_DIR)
+
+
+@pytest.fixture(scope="session")
+def server(tmp_path_factory):
+    """The server module, imported once against a scratch copy of the stock data"""
+    data_dir = tmp_path_factory.mktemp("data")
+    shutil.copy(os.path.join(REPO_DIR, "data", "stock_data.csv"), data_dir)
+    os.environ.update(DATA_DIR=str(data_dir), CHARTS_DIR=str(tmp_path_factory.mktemp("charts")),
+                      PROFILES_DIR=str(tmp_path_factory.mktemp("profiles")),
+                      TRANSFORMER_BACKEND="lite", ADMIN_TOKEN="test-token", PRELOAD_MODELS="")
+    import server as module
+    yield module
+    module.CHARTS.shutdown()
+
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
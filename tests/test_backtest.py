@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from backtest import positions_from_signals, run_backtest
+
+# Returns: NaN, +10%, -10%, 0%, -10%
+CLOSE = [100.0, 110.0, 99.0, 99.0, 89.1]
+
+
+def test_positions_hold_the_last_signal():
+    positions = positions_from_signals([0, 1, 0, -1, 0, 0, 1])
+    np.testing.assert_array_equal(positions, [0, 1, 1, -1, -1, -1, 1])
+
+
+def test_position_earns_from_the_next_bar():
+    result = run_backtest(CLOSE, [0, 1, 0, 0, 0])
+
+    # Entered at the close of bar 1: bar 1's +10% is missed, bar 2's -10% is not
+    np.testing.assert_allclose(result["strategy_return"], [np.nan, 0, -0.1, 0, 0], equal_nan=True)
+    np.testing.assert_allclose(result["buy_and_hold"], [np.nan, 1.1, 0.99, 0.99, 0.891], equal_nan=True)
+
+
+def test_costs_and_slippage_are_charged_per_unit_traded():
+    result = run_backtest(CLOSE, positions_from_signals([0, 1, 0, -1, 0]), transaction_cost=0.001,
+                          slippage=0.0005)
+
+    # Long 1 unit from bar 2, then 2 units traded to go short from bar 4
+    np.testing.assert_allclose(result["strategy_return"], [np.nan, 0, -0.1015, 0, 0.097], equal_nan=True)
+    metrics = result["metrics"]
+    assert metrics["total_return"] == pytest.approx(0.8985 * 1.097 - 1)
+    assert metrics["buy_hold_return"] == pytest.approx(-0.109)
+    assert metrics["max_drawdown"] == pytest.approx(-0.1015)
+    assert metrics["turnover"] == 3
+    assert metrics["trades"] == 2
+    # One winning bar; the denominator also counts the NaN first bar, as the original metrics did
+    assert metrics["win_rate"] == pytest.approx(1 / 3)
+
+
+def test_empty_series_reports_an_error():
+    assert "error" in run_backtest([], [])["metrics"]
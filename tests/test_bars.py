@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bars import CompactBarCache, CompactBars, IndicatorBuffers, crossover_signals, ema_into, sma_into
+from indicators import IndicatorState
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def frame():
+    return pd.read_csv(os.path.join(REPO_DIR, "data", "stock_data.csv"))
+
+
+def test_compact_signals_match_the_float64_indicators(frame):
+    bars, indicators = CompactBarCache().get(frame, "v1")
+    expected = IndicatorState().update(frame["close"].to_numpy())
+
+    np.testing.assert_array_equal(crossover_signals(indicators["macd"], indicators["signal_line"]),
+                                  crossover_signals(expected["macd"], expected["signal_line"]))
+    for name in ("sma_50", "sma_200", "ema12", "ema26"):
+        np.testing.assert_allclose(indicators[name], expected[name], rtol=1e-6, equal_nan=True, err_msg=name)
+    assert len(bars) == len(frame)
+
+
+def test_chunked_indicators_match_one_pass():
+    values = 100 + np.random.default_rng(0).normal(0, 1, 1000).cumsum()
+    sma, ema = np.empty(1000), np.empty(1000)
+
+    sma_into(values, 50, sma, chunk_size=64)
+    ema_into(values, 26, ema, chunk_size=64)
+
+    np.testing.assert_allclose(sma, pd.Series(values).rolling(window=50).mean(), equal_nan=True)
+    np.testing.assert_allclose(ema, pd.Series(values).ewm(span=26, adjust=False).mean())
+
+
+def test_crossover_signals():
+    macd = np.array([0.0, 1.0, 2.0, -1.0, -2.0, 3.0])
+    signal_line = np.zeros(6)
+    np.testing.assert_array_equal(crossover_signals(macd, signal_line), [0, 1, 0, -1, 0, 1])
+
+
+def test_cache_rebuilds_only_for_a_new_version(frame):
+    cache = CompactBarCache()
+    bars, _ = cache.get(frame, "v1")
+
+    assert cache.get(frame, "v1")[0] is bars
+    assert cache.get(frame, "v2")[0] is not bars
+
+
+def test_buffers_grow_for_longer_series():
+    buffers = IndicatorBuffers(capacity=10)
+    result = buffers.compute(np.linspace(1, 2, 25, dtype=np.float32))
+
+    assert buffers.capacity == 25
+    assert len(result["macd"]) == 25
+
+
+def test_compact_bars_use_float32_values(frame):
+    bars = CompactBars.from_frame(frame)
+    assert bars.close.dtype == np.float32
+    assert bars.nbytes == len(frame) * 28
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from batching import MicroBatcher
+
+
+class Recorder:
+    """predict_fn that doubles its input and records the (model, rows) of every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, model, X):
+        self.calls.append((model, len(X)))
+        if model == "broken":
+            raise RuntimeError("model failed")
+        return X * 2
+
+
+def rows(start, count):
+    return np.arange(start, start + count, dtype=np.float64).reshape(-1, 1)
+
+
+def test_concurrent_requests_share_one_forward_pass():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=16, max_latency_ms=200)
+
+    futures = [batcher.submit("model", rows(10 * i, 3)) for i in range(3)]
+
+    for i, future in enumerate(futures):
+        np.testing.assert_array_equal(future.result(timeout=5), rows(10 * i, 3) * 2)
+    assert recorder.calls == [("model", 9)]
+    assert batcher.stats()["avg_batch_size"] == 9
+
+
+def test_batches_stay_within_max_batch_size():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=4, max_latency_ms=200)
+
+    futures = [batcher.submit("model", rows(0, 2)) for _ in range(3)] + [batcher.submit("model", rows(0, 6))]
+
+    for future in futures:
+        future.result(timeout=5)
+    sizes = sorted(size for _, size in recorder.calls)
+    # The oversized request runs on its own, unsplit
+    assert sizes == [2, 4, 6]
+
+
+def test_requests_for_different_models_are_not_mixed():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=16, max_latency_ms=100)
+
+    first, second = batcher.submit("first", rows(0, 2)), batcher.submit("second", rows(0, 3))
+
+    first.result(timeout=5)
+    second.result(timeout=5)
+    assert sorted(recorder.calls) == [("first", 2), ("second", 3)]
+
+
+def test_a_failed_forward_pass_fails_every_request_in_it():
+    batcher = MicroBatcher(Recorder(), max_batch_size=16, max_latency_ms=100)
+
+    futures = [batcher.submit("broken", rows(0, 1)) for _ in range(2)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model failed"):
+            future.result(timeout=5)
+    # The worker keeps serving later requests
+    np.testing.assert_array_equal(batcher.predict("model", rows(0, 1)), rows(0, 1) * 2)
+
+
+def test_empty_input_is_not_queued():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder)
+
+    assert len(batcher.predict("model", rows(0, 0))) == 0
+    assert batcher.stats()["requests"] == 0
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from chart_data import ChartData, arrow_available, downsample, lttb, round_significant, thin_markers
+
+
+@pytest.fixture
+def prices():
+    return 100 + np.random.default_rng(0).normal(0, 1, 5000).cumsum()
+
+
+def test_lttb_keeps_the_end_points_in_order(prices):
+    kept = lttb(np.arange(len(prices)), prices, 200)
+
+    assert len(kept) == 200
+    assert kept[0] == 0 and kept[-1] == len(prices) - 1
+    assert np.all(np.diff(kept) > 0)
+
+
+def test_lttb_keeps_a_single_bar_spike(prices):
+    prices[2500] += 100.0
+    assert 2500 in lttb(np.arange(len(prices)), prices, 100)
+
+
+def test_lttb_leaves_short_series_alone():
+    np.testing.assert_array_equal(lttb(np.arange(5), np.ones(5), 10), np.arange(5))
+
+
+def test_downsample_drops_missing_values():
+    x = np.arange(10)
+    y = np.where(x < 3, np.nan, x.astype(np.float64))
+    down_x, down_y = downsample(x, y, 4)
+
+    assert down_x[0] == 3 and down_x[-1] == 9
+    assert np.isfinite(down_y).all()
+
+
+def test_thin_markers_keeps_one_per_pixel_column():
+    x = np.arange(1000)
+    kept = thin_markers(x, 10, (0.0, 999.0))
+
+    assert len(kept) == 10
+    assert kept[-1] == 999
+
+
+def test_round_significant():
+    np.testing.assert_array_equal(round_significant([123.456789123, 0.0, -0.000123456789], digits=4),
+                                  [123.5, 0.0, -0.0001235])
+
+
+def test_chart_data_json(prices):
+    x = np.arange(len(prices))
+    chart = ChartData(x, {"close": (x, prices)}, buy=(x[::2], prices[::2]), sell=(x[:0], prices[:0]), width=100,
+                      meta={"model": "macd"})
+    body = chart.to_json()
+
+    assert body["model"] == "macd" and body["rows"] == len(prices)
+    assert len(body["series"]["close"]["x"]) == 100
+    assert len(body["markers"]["buy"]["x"]) <= 100
+    assert body["buy_markers_total"] == len(prices) // 2
+    assert body["markers"]["sell"] == {"x": [], "y": []}
+
+
+@pytest.mark.skipif(arrow_available(), reason="pyarrow is installed")
+def test_arrow_output_needs_pyarrow():
+    chart = ChartData(np.arange(3), {}, buy=([], []), sell=([], []), width=10)
+    with pytest.raises(RuntimeError, match="pyarrow"):
+        chart.to_arrow()
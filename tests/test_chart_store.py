@@ -0,0 +1,96 @@
+import os
+import time
+
+from chart_store import ChartStore
+
+
+def write_chart(store, name, size=10):
+    with open(store.path(name), "wb") as f:
+        f.write(b"x" * size)
+    store.add(name)
+
+
+def test_chart_written_by_another_worker_is_found(tmp_path):
+    # Both workers index the directory at startup, before the chart exists
+    renderer, other = ChartStore(str(tmp_path)), ChartStore(str(tmp_path))
+    write_chart(renderer, "macd-abc.png")
+
+    assert other.contains("macd-abc.png")
+    assert other.latest("macd") == "macd-abc.png"
+    assert other.stats()["files"] == 1
+
+
+def test_latest_is_the_newest_on_disk(tmp_path):
+    first, second = ChartStore(str(tmp_path)), ChartStore(str(tmp_path))
+    write_chart(first, "macd-old.png")
+    os.utime(first.path("macd-old.png"), (time.time() - 60, time.time() - 60))
+    write_chart(second, "macd-new.png")
+    write_chart(second, "sentiment-abc.png")
+
+    assert first.latest("macd") == "macd-new.png"
+    assert first.latest("transformer") is None
+
+
+def test_chart_evicted_by_another_worker_is_gone(tmp_path):
+    evicting, other = ChartStore(str(tmp_path), max_files=1), ChartStore(str(tmp_path))
+    write_chart(other, "macd-a.png")
+    assert evicting.contains("macd-a.png")
+    write_chart(evicting, "macd-b.png")
+
+    assert not os.path.exists(other.path("macd-a.png"))
+    assert not other.contains("macd-a.png")
+    assert other.contains("macd-b.png")
+
+
+def test_names_outside_the_directory_are_rejected(tmp_path):
+    (tmp_path / "charts").mkdir()
+    (tmp_path / "secret.png").write_bytes(b"x")
+    store = ChartStore(str(tmp_path / "charts"))
+
+    assert not store.contains("../secret.png")
+    assert not store.contains("missing.png")
+
+
+def test_scan_keeps_temp_files_of_renders_in_flight(tmp_path):
+    in_flight, dead = tmp_path / "macd-a.png.123.tmp", tmp_path / "macd-b.png.456.tmp"
+    in_flight.write_bytes(b"x")
+    dead.write_bytes(b"x")
+    stale = time.time() - ChartStore.STALE_SECONDS - 1
+    os.utime(dead, (stale, stale))
+
+    ChartStore(str(tmp_path))
+
+    assert in_flight.exists()
+    assert not dead.exists()
+
+
+def test_scan_without_cleanup_deletes_nothing(tmp_path):
+    write_chart(ChartStore(str(tmp_path)), "macd-a.png")
+    dead = tmp_path / "macd-b.png.456.tmp"
+    dead.write_bytes(b"x")
+    stale = time.time() - ChartStore.STALE_SECONDS - 1
+    os.utime(dead, (stale, stale))
+
+    store = ChartStore(str(tmp_path), max_files=0, cleanup=False)
+
+    assert dead.exists()
+    assert os.path.exists(store.path("macd-a.png"))
+
+
+def test_render_survives_a_second_scan_while_in_flight(tmp_path):
+    from charts import ChartRenderer
+
+    renderer = ChartRenderer(ChartStore(str(tmp_path)), max_workers=1, dpi=100)
+    data = {"index": list(range(500)), "cumulative_return": [1.0 + i / 1000 for i in range(500)],
+            "buy_and_hold": [1.0] * 500, "symbol": "TEST"}
+    try:
+        name = renderer.submit("macd", "v1", {}, data)
+        # What a process re-importing the server (a spawned worker) does mid-render
+        deadline = time.monotonic() + 30
+        while renderer.is_pending(name) and time.monotonic() < deadline:
+            ChartStore(str(tmp_path))
+            time.sleep(0.01)
+        renderer.wait(name)
+        assert renderer.store.contains(name)
+    finally:
+        renderer.shutdown()
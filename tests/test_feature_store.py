@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import feature_store
+from feature_store import FeatureSeries, FeatureStore, feature_directory
+from indicators import IndicatorState
+
+
+@pytest.fixture
+def close():
+    return 100 + np.random.default_rng(0).normal(0, 1, 1000).cumsum()
+
+
+def assert_matches_state(result, close):
+    expected = IndicatorState().update(close)
+    for name, values in expected.items():
+        np.testing.assert_allclose(result[name], values, rtol=1e-10, atol=1e-10, equal_nan=True, err_msg=name)
+    np.testing.assert_allclose(result["returns"], pd.Series(close).pct_change().to_numpy(), equal_nan=True)
+
+
+def test_stored_features_match_the_in_memory_state(tmp_path, close):
+    series = FeatureSeries(str(tmp_path))
+    result = series.update(close[:600])
+    assert_matches_state(result, close[:600])
+    assert not result["macd"].flags.writeable
+
+    assert_matches_state(series.update(close), close)
+    stats = series.stats()
+    assert (stats["rows"], stats["generation"], stats["appended"]) == (1000, 0, 1000)
+
+
+def test_another_process_reuses_the_stored_rows(tmp_path, close):
+    FeatureSeries(str(tmp_path)).update(close)
+    # A separate instance, as in another worker or after a restart
+    series = FeatureSeries(str(tmp_path))
+
+    assert_matches_state(series.update(close), close)
+    assert (series.stats()["hits"], series.stats()["appended"]) == (1, 0)
+
+
+def test_rewritten_history_is_rebuilt(tmp_path, close):
+    series = FeatureSeries(str(tmp_path))
+    series.update(close)
+    corrected = close.copy()
+    corrected[500] += 50.0
+
+    assert_matches_state(series.update(corrected), corrected)
+    assert series.stats()["rebuilds"] == 1
+
+
+def test_outgrowing_the_capacity_starts_a_new_generation(tmp_path, close, monkeypatch):
+    monkeypatch.setattr(feature_store, "MIN_CAPACITY", 256)
+    series = FeatureSeries(str(tmp_path))
+    series.update(close[:200])
+    series.update(close[:250])
+    assert series.stats()["generation"] == 0
+
+    assert_matches_state(series.update(close), close)
+    assert series.stats()["generation"] == 1
+    assert series.stats()["appended"] == 1000
+
+
+def test_store_keeps_one_series_per_symbol(tmp_path):
+    store = FeatureStore(lambda symbol: feature_directory(str(tmp_path), symbol))
+
+    assert store["AAPL"] is store["AAPL"]
+    assert store[None].directory == str(tmp_path / "stock_data.features" / "sma-50-200_macd-12-26-9")
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+from indicators import IndicatorState, fingerprint
+
+
+def pandas_indicators(close):
+    """Full recomputation the incremental state has to match"""
+    close = pd.Series(close)
+    ema12 = close.ewm(span=12, adjust=False).mean()
+    ema26 = close.ewm(span=26, adjust=False).mean()
+    macd = ema12 - ema26
+    signal_line = macd.ewm(span=9, adjust=False).mean()
+    return {
+        "sma_50": close.rolling(window=50).mean().to_numpy(),
+        "sma_200": close.rolling(window=200).mean().to_numpy(),
+        "ema12": ema12.to_numpy(),
+        "ema26": ema26.to_numpy(),
+        "macd": macd.to_numpy(),
+        "signal_line": signal_line.to_numpy(),
+        "histogram": (macd - signal_line).to_numpy(),
+    }
+
+
+def assert_matches_pandas(result, close):
+    expected = pandas_indicators(close)
+    assert set(result) == set(expected)
+    for name, values in expected.items():
+        assert len(result[name]) == len(close), name
+        # Rolling sums over a shorter tail round slightly differently from one pass
+        np.testing.assert_allclose(result[name], values, rtol=1e-10, atol=1e-10, equal_nan=True, err_msg=name)
+
+
+@pytest.fixture
+def close():
+    return 100 + np.random.default_rng(0).normal(0, 1, 1000).cumsum()
+
+
+def test_initial_load_matches_pandas(close):
+    assert_matches_pandas(IndicatorState().update(close), close)
+
+
+def test_appended_bars_match_pandas(close):
+    state = IndicatorState()
+    state.update(close[:600])
+    # One bar, then a batch, as live ingestion and a file reload append them
+    state.update(close[:601])
+    result = state.update(close)
+    assert_matches_pandas(result, close)
+
+
+def test_prefix_of_known_history_matches_pandas(close):
+    state = IndicatorState()
+    state.update(close)
+    assert_matches_pandas(state.update(close[:700]), close[:700])
+
+
+def test_mid_history_rewrite_is_recomputed(close):
+    state = IndicatorState()
+    state.update(close)
+
+    corrected = close.copy()
+    # First and last closes unchanged: only the bar in the middle differs
+    corrected[500] += 50.0
+    assert_matches_pandas(state.update(corrected), corrected)
+
+    # And with new bars appended after the corrected history
+    extended = np.concatenate([corrected, close[-50:] + 1])
+    assert_matches_pandas(state.update(extended), extended)
+
+
+def test_rewrite_within_a_shorter_prefix_is_recomputed(close):
+    state = IndicatorState()
+    state.update(close)
+    corrected = close[:700].copy()
+    corrected[300] -= 20.0
+    assert_matches_pandas(state.update(corrected), corrected)
+
+
+def test_same_lineage_only_reads_the_new_bars(close, monkeypatch):
+    state = IndicatorState()
+    state.update(close[:999], lineage=0)
+    summed = []
+
+    def close_checksum(values):
+        summed.append(len(values))
+        return 0
+
+    monkeypatch.setattr(indicators, "close_checksum", close_checksum)
+
+    assert_matches_pandas(state.update(close, lineage=0), close)
+    assert summed == [1]
+
+
+def test_running_checksum_matches_the_whole_series(close):
+    state = IndicatorState()
+    for end in (10, 11, 600, 1000):
+        state.update(close[:end])
+    assert state._fingerprint == fingerprint(close, 1000)
+
+
+def test_new_lineage_checks_the_whole_prefix(close):
+    state = IndicatorState()
+    state.update(close, lineage=0)
+    corrected = close.copy()
+    corrected[500] += 50.0
+    assert_matches_pandas(state.update(corrected, lineage=1), corrected)
@@ -0,0 +1,93 @@
+import json
+import os
+
+import pandas as pd
+
+import market_data
+from market_data import MarketDataStore, SymbolStore
+
+
+def bars(start, count):
+    return pd.DataFrame({
+        "timestamp": [1700000000000 + 86400000 * i for i in range(start, start + count)],
+        "open": [100.0 + i for i in range(start, start + count)],
+        "high": [101.5 + i for i in range(start, start + count)],
+        "low": [99.25 + i for i in range(start, start + count)],
+        "close": [100.5 + i for i in range(start, start + count)],
+        "volume": [1000.0 * (i + 1) for i in range(start, start + count)],
+    })
+
+
+def test_appended_bars_reach_other_processes(tmp_path):
+    path = tmp_path / "stock_data.csv"
+    # Saved without a newline after the last row
+    path.write_text(bars(0, 3).to_csv(index=False, lineterminator="\n").rstrip("\n"))
+    writer, reader = MarketDataStore(str(path)), MarketDataStore(str(path))
+    _, _, lineage = reader.snapshot()
+
+    frame, version, _ = writer.append(bars(3, 2))
+
+    reread, reread_version, reread_lineage = reader.snapshot()
+    pd.testing.assert_frame_equal(reread, bars(0, 5))
+    pd.testing.assert_frame_equal(frame, bars(0, 5))
+    assert reread_version == version
+    assert reread_lineage == lineage
+
+
+def test_appends_from_two_processes_are_both_kept(tmp_path):
+    path = tmp_path / "stock_data.csv"
+    bars(0, 3).to_csv(path, index=False)
+    first, second = MarketDataStore(str(path)), MarketDataStore(str(path))
+    first.get()
+    second.get()
+
+    first.append(bars(3, 1))
+    frame, _, _ = second.append(bars(4, 1))
+
+    pd.testing.assert_frame_equal(frame, bars(0, 5))
+    pd.testing.assert_frame_equal(first.get(), bars(0, 5))
+
+
+def test_appended_bars_are_stored_in_the_columns(tmp_path):
+    SymbolStore(str(tmp_path)).import_frame("AAPL", bars(0, 3))
+    writer, reader = SymbolStore(str(tmp_path)).open("AAPL"), SymbolStore(str(tmp_path)).open("AAPL")
+    _, _, lineage = reader.snapshot()
+
+    _, version, _ = writer.append(bars(3, 2))
+
+    reread, reread_version, reread_lineage = reader.snapshot()
+    # copy(): the reread columns are memory-mapped
+    pd.testing.assert_frame_equal(reread.copy(), bars(0, 5))
+    assert reread_version == version
+    assert reread_lineage == lineage
+
+
+def test_appended_bars_are_written_in_place(tmp_path):
+    SymbolStore(str(tmp_path)).import_frame("AAPL", bars(0, 3))
+    data = SymbolStore(str(tmp_path)).open("AAPL")
+    close_path = os.path.join(data.directory, "close.npy")
+    inode = os.stat(close_path).st_ino
+
+    data.append(bars(3, 2))
+
+    with open(data.path, "r", encoding="utf-8") as f:
+        assert json.load(f)["rows"] == 5
+    assert os.stat(close_path).st_ino == inode
+    pd.testing.assert_frame_equal(SymbolStore(str(tmp_path)).open("AAPL").get().copy(), bars(0, 5))
+
+
+def test_columns_grow_when_their_capacity_is_used_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(market_data, "MIN_CAPACITY", 4)
+    SymbolStore(str(tmp_path)).import_frame("AAPL", bars(0, 3))
+    writer, reader = SymbolStore(str(tmp_path)).open("AAPL"), SymbolStore(str(tmp_path)).open("AAPL")
+    _, _, lineage = reader.snapshot()
+
+    writer.append(bars(3, 1))
+    _, version, _ = writer.append(bars(4, 3))
+
+    with open(writer.path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    assert (meta["rows"], meta["capacity"]) == (7, 8)
+    reread, reread_version, reread_lineage = reader.snapshot()
+    pd.testing.assert_frame_equal(reread.copy(), bars(0, 7))
+    assert (reread_version, reread_lineage) == (version, lineage)
@@ -0,0 +1,172 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+import pytest
+
+from chart_store import ChartStore
+from charts import ChartRenderer, chart_key
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MACD_DATA = {"index": [0, 1, 2], "cumulative_return": [1.0, 1.1, 1.05],
+             "buy_and_hold": [1.0, 1.02, 1.04], "symbol": "TEST"}
+
+
+def test_chart_rendering_in_another_worker_is_not_rendered_again(tmp_path):
+    # Two workers: separate store and renderer instances sharing the charts directory
+    first = ChartRenderer(ChartStore(str(tmp_path)), max_workers=1, dpi=20)
+    second = ChartRenderer(ChartStore(str(tmp_path)), max_workers=1, dpi=20)
+    try:
+        name = first.submit("macd", "v1", {}, MACD_DATA)
+        assert second.submit("macd", "v1", {}, MACD_DATA) == name
+        assert second.is_pending(name)
+
+        second.wait(name)
+        assert second.store.contains(name)
+        assert second.stats()["reused"] == 1
+        first.wait(name)
+        assert not first.is_pending(name)
+        assert not os.path.exists(first.store.path(f"{name}.pending"))
+    finally:
+        first.shutdown()
+        second.shutdown()
+
+
+def test_stale_pending_marker_does_not_block_rendering(tmp_path):
+    renderer = ChartRenderer(ChartStore(str(tmp_path)), max_workers=1, dpi=20)
+    try:
+        name = f"macd-{chart_key('macd', 'v1', {'dpi': 20})}.png"
+        marker = renderer.store.path(f"{name}.pending")
+        open(marker, "w").close()
+        stale = time.time() - ChartRenderer.PENDING_TIMEOUT_SECONDS - 1
+        os.utime(marker, (stale, stale))
+
+        assert renderer.submit("macd", "v1", {}, MACD_DATA) == name
+        renderer.wait(name)
+        assert renderer.store.contains(name)
+    finally:
+        renderer.shutdown()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def fetch(url):
+    try:
+        with urllib.request.urlopen(url, timeout=60) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+@contextmanager
+def gunicorn_server(tmp_path, **env):
+    """Base URL of a 4-worker gunicorn serving a copy of the stock data, stopped on exit"""
+    pytest.importorskip("gunicorn")
+    data_dir, charts_dir = tmp_path / "data", tmp_path / "charts"
+    data_dir.mkdir()
+    shutil.copy(os.path.join(REPO_DIR, "data", "stock_data.csv"), data_dir)
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY="4", TRANSFORMER_BACKEND="lite",
+               DATA_DIR=str(data_dir), CHARTS_DIR=str(charts_dir), WARM_MODELS="",
+               MODEL_WATCH_INTERVAL="0", RESPONSE_CACHE_ENTRIES="0", GUNICORN_GRACEFUL_TIMEOUT="2", **env)
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+                              cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                fetch(f"{base}/api/models")
+                break
+            except OSError:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    pytest.fail("gunicorn did not start")
+                time.sleep(0.5)
+        yield base
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+
+def open_stream(url):
+    """The open response of an SSE stream, or the HTTP status it was refused with"""
+    try:
+        return urllib.request.urlopen(url, timeout=10)
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def next_event(stream, timeout=10):
+    """data of the next bar event on stream (None if none arrives within timeout seconds)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        line = stream.readline().decode("utf-8")
+        if line.startswith("event: bar"):
+            return json.loads(stream.readline().decode("utf-8")[len("data: "):])
+    return None
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="gunicorn does not run on Windows")
+def test_charts_are_served_by_every_gunicorn_worker(tmp_path):
+    with gunicorn_server(tmp_path) as base:
+        status, body = fetch(f"{base}/api/predict-macd")
+        assert status == 200
+        chart_path = "/public/" + json.loads(body)["image_url"].split("/public/", 1)[1]
+
+        # Separate connections land on different workers, most of which did not render the chart
+        statuses = [fetch(base + chart_path)[0] for _ in range(12)]
+        assert statuses == [200] * 12
+        assert fetch(f"{base}/api/get-image?image=macd_analysis.png")[0] == 200
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="gunicorn does not run on Windows")
+def test_ingested_bars_reach_every_gunicorn_worker(tmp_path):
+    # One stream per worker, so every accepted stream is served by a different worker
+    with gunicorn_server(tmp_path, ADMIN_TOKEN="t", MAX_STREAMS="1", STREAM_POLL_SECONDS="0.2",
+                         STREAM_HEARTBEAT_SECONDS="1") as base:
+        streams, refused = [], 0
+        deadline = time.monotonic() + 20
+        # The kernel hands connections to whichever worker accepts first, often the same one
+        while (len(streams) < 2 or not refused) and time.monotonic() < deadline:
+            stream = open_stream(f"{base}/api/stream")
+            if stream == 503:
+                refused += 1
+                time.sleep(0.05)
+            else:
+                streams.append(stream)
+        try:
+            assert 2 <= len(streams) <= 4
+            assert refused > 0
+
+            bar = {"timestamp": 1799999999000, "open": 250, "high": 251, "low": 249, "close": 250.5, "volume": 10}
+            request = urllib.request.Request(f"{base}/api/ingest", data=json.dumps({"bars": [bar]}).encode(),
+                                             headers={"Content-Type": "application/json", "X-Admin-Token": "t"})
+            with urllib.request.urlopen(request, timeout=60) as response:
+                data_version = json.loads(response.read())["data_version"]
+
+            for stream in streams:
+                event = next_event(stream)
+                assert event["data_version"] == data_version
+                assert event["bar"] == bar
+            # Every worker now predicts from the new bar
+            for _ in range(8):
+                assert json.loads(fetch(f"{base}/api/predict-macd")[1])["price"] == 250.5
+        finally:
+            for stream in streams:
+                stream.close()
@@ -0,0 +1,50 @@
+import os
+
+from response_cache import ResponseCache, response_key
+
+
+def test_key_changes_with_any_part():
+    key = response_key("/api/predict-macd", "macd", "v1", False)
+    assert response_key("/api/predict-macd", "macd", "v1", False) == key
+    assert response_key("/api/predict-macd", "macd", "v2", False) != key
+    assert response_key("/api/predict-macd", "macd", "v1", True) != key
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.get("a")
+    cache.put("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (b"1", {})
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_are_evicted_to_stay_under_max_bytes():
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", b"123456")
+    cache.put("b", b"123456")
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 6
+
+
+def test_disk_entries_survive_a_restart(tmp_path):
+    ResponseCache(directory=str(tmp_path)).put("a", b"body", {"chart": "macd-1.png"})
+    # Left over from a write that died halfway
+    (tmp_path / "b.json.1.2.tmp").write_bytes(b"partial")
+
+    cache = ResponseCache(directory=str(tmp_path))
+    assert cache.get("a") == (b"body", {"chart": "macd-1.png"})
+    assert not (tmp_path / "b.json.1.2.tmp").exists()
+
+
+def test_disk_entry_removed_by_another_process_is_a_miss(tmp_path):
+    cache = ResponseCache(directory=str(tmp_path))
+    cache.put("a", b"body")
+    os.remove(tmp_path / "a.json")
+
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
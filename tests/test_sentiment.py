@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sentiment import HeadlineScorer, HeadlineSentiment, score_texts, sentiment_features
+
+
+def test_scores_follow_the_vader_arithmetic():
+    surge, negated = score_texts(["Profits surge", "Not strong"])
+
+    # 1.9 + 2.3 over sqrt(s^2 + 15); every word is positive
+    np.testing.assert_allclose(surge, [4.2 / np.sqrt(4.2 ** 2 + 15), 1.0, 0.0, 0.0])
+    # "not" is neutral and damps "strong" (1.9) by -0.74
+    valence = 1.9 * -0.74
+    mass = 1 - valence + 1
+    np.testing.assert_allclose(negated, [valence / np.sqrt(valence ** 2 + 15), 0.0, (1 - valence) / mass, 1 / mass])
+
+
+def test_negation_does_not_reach_into_the_next_headline():
+    scores = score_texts(["Shares did not", "surge"])
+    assert scores[1, 0] > 0
+
+
+def test_empty_and_missing_headlines_score_zero():
+    np.testing.assert_array_equal(score_texts(["", None, "the company said"])[:2], np.zeros((2, 4)))
+    assert score_texts([]).shape == (0, 4)
+
+
+def test_each_distinct_headline_is_scored_once():
+    scorer = HeadlineScorer()
+    first = scorer.score(["Stock rallies", "Stock tumbles"])
+    second = scorer.score(["Stock tumbles", "Stock rallies", "Stock rallies"])
+
+    np.testing.assert_array_equal(second, first[[1, 0, 0]])
+    assert scorer.stats() == {"cached": 2, "scored": 2, "reused": 3}
+
+
+def test_daily_features_per_symbol(tmp_path):
+    path = tmp_path / "headlines.csv"
+    pd.DataFrame({
+        "date": ["2024-01-02", "2024-01-02", "2024-01-03"],
+        "headline": ["Apple profits surge", "Apple shares slump", "Microsoft wins contract"],
+        "symbol": ["AAPL", "AAPL", "MSFT"],
+    }).to_csv(path, index=False)
+
+    daily, version = HeadlineSentiment(str(path)).daily("AAPL")
+
+    assert version is not None
+    assert list(daily.index) == [pd.Timestamp("2024-01-02")]
+    assert daily["Post_Count"].iloc[0] == 2
+
+
+def test_missing_headlines_file_is_reported_once(tmp_path, capsys):
+    headlines = HeadlineSentiment(str(tmp_path / "headlines.csv"))
+
+    daily, version = headlines.daily()
+    headlines.daily()
+
+    assert daily.empty and version is None
+    assert capsys.readouterr().out.count("No headlines file") == 1
+    bars = pd.DataFrame({"timestamp": [1704153600000, 1704240000000], "close": [100.0, 101.0],
+                         "volume": [10.0, 20.0]})
+    features = sentiment_features(bars, daily)
+    assert (features[["Compound", "Post_Count"]] == 0).all().all()
+    assert features["Returns"].iloc[1] == pytest.approx(0.01)
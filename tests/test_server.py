@@ -0,0 +1,84 @@
+def test_sweep_rejects_an_unknown_rank_by(client):
+    response = client.post("/api/sweep", json={"rank_by": "sharpe"})
+
+    assert response.status_code == 400
+    assert "rank_by" in response.get_json()["message"]
+
+
+def test_sweep_keeps_its_process_pool(server, client):
+    assert client.post("/api/sweep", json={"top": 1}).status_code == 200
+    pool = server.SWEEP_POOL
+    response = client.post("/api/sweep", json={"rank_by": "total_return", "top": 1})
+
+    assert response.status_code == 200
+    assert response.get_json()["rank_by"] == "total_return"
+    assert server.SWEEP_POOL is pool
+
+
+def test_compact_macd_chart_depends_on_costs(server, client, monkeypatch):
+    monkeypatch.setattr(server, "COMPACT_BARS", True)
+    free = client.get("/api/predict-macd").get_json()
+    costly = client.get("/api/predict-macd?cost_bps=50").get_json()
+
+    assert free["risk_metrics"] != costly["risk_metrics"]
+    assert free["image_url"] != costly["image_url"]
+
+
+def test_cached_prediction_revalidates_with_its_etag(client):
+    first = client.get("/api/predict-macd?cost_bps=1")
+    second = client.get("/api/predict-macd?cost_bps=1")
+    revalidated = client.get("/api/predict-macd?cost_bps=1", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.get_data() == first.get_data()
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == first.headers["ETag"]
+
+
+def test_cached_prediction_key_covers_the_server_settings(server, client, monkeypatch):
+    etag = client.get("/api/predict-macd?cost_bps=2").headers["ETag"]
+    monkeypatch.setattr(server, "COMPACT_BARS", True)
+    compact = client.get("/api/predict-macd?cost_bps=2")
+    monkeypatch.setattr(server, "TRANSFORMER_BACKEND", "keras")
+
+    assert compact.headers["X-Cache"] == "MISS"
+    assert compact.headers["ETag"] != etag
+    assert client.get("/api/predict-macd?cost_bps=2").headers["ETag"] not in (etag, compact.headers["ETag"])
+
+
+def test_profiled_predict_all_computes_every_model(server, client):
+    url = "/api/predict-all?models=macd,moving_average&profile=cprofile"
+    assert client.get(url, headers={"X-Admin-Token": "test-token"}).status_code == 200
+    hits = server.RESPONSE_CACHE.stats()["hits"]
+
+    # Same query again: a cache hit would mean nothing was profiled
+    response = client.get(url, headers={"X-Admin-Token": "test-token"})
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" in response.headers
+    assert server.RESPONSE_CACHE.stats()["hits"] == hits
+    assert all("status" not in body for body in response.get_json()["results"].values())
+
+
+def test_indicator_chart_data_does_not_load_models(server, client, monkeypatch):
+    requested = []
+
+    def snapshot(name):
+        requested.append(name)
+        raise AssertionError(f"{name} model requested")
+
+    monkeypatch.setattr(server.MODELS, "snapshot", snapshot)
+    for model_name in ("macd", "moving_average"):
+        response = client.get(f"/api/chart-data/{model_name}?width=50")
+        assert response.status_code == 200
+        assert response.get_json()["series"]
+
+    assert requested == []
+
+
+def test_sentiment_reports_missing_headlines(client):
+    response = client.get("/api/predict-sentiment")
+
+    assert response.status_code == 200
+    assert response.get_json()["headlines_available"] is False
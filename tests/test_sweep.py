@@ -0,0 +1,47 @@
+import os
+import sys
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sweep import make_pool, run_sweep
+
+
+def write_data(data_dir, rows=300):
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, rows))
+    pd.DataFrame({"timestamp": np.arange(rows), "open": close, "high": close, "low": close,
+                  "close": close, "volume": 1.0}).to_csv(data_dir / "stock_data.csv", index=False)
+
+
+def worker_state():
+    return os.getpid(), "server" in sys.modules
+
+
+def test_unknown_rank_by_is_rejected(tmp_path):
+    write_data(tmp_path)
+    with pytest.raises(ValueError, match="rank_by"):
+        run_sweep([None], rank_by="sharpe", data_dir=str(tmp_path))
+
+
+def test_results_are_ranked_best_first(tmp_path):
+    write_data(tmp_path)
+    results = run_sweep([None], sma_pairs=[(5, 20), (10, 50), (20, 100)], macd_triples=[(12, 26, 9)],
+                        rank_by="total_return", processes=1, data_dir=str(tmp_path))
+
+    returns = [row["total_return"] for row in results]
+    assert len(results) == 4
+    assert returns == sorted(returns, reverse=True)
+
+
+def test_pool_is_reused_and_does_not_import_the_server(tmp_path):
+    write_data(tmp_path)
+    with make_pool(processes=1, mp_context=get_context("spawn")) as pool:
+        first = pool.submit(worker_state).result()
+        for _ in range(2):
+            run_sweep([None], data_dir=str(tmp_path), pool=pool)
+        second = pool.submit(worker_state).result()
+
+    assert first == second
+    assert first[1] is False
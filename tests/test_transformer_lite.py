@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+import pytest
+
+from transformer_lite import export, load_lite, validate, validation_windows
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(REPO_DIR, "models")
+
+
+def test_lite_scaler_matches_sklearn():
+    scaler = joblib.load(os.path.join(MODELS_DIR, "Transformer_scaler.pkl"))
+    _, lite_scaler = load_lite(os.path.join(MODELS_DIR, "Transformer_lite.npz"))
+    prices = np.linspace(50, 300, 11).reshape(-1, 1)
+
+    np.testing.assert_allclose(lite_scaler.transform(prices), scaler.transform(prices))
+    np.testing.assert_allclose(lite_scaler.inverse_transform(scaler.transform(prices)), prices)
+
+
+def test_loading_the_lite_model_does_not_import_tensorflow():
+    code = ("import sys, transformer_lite; transformer_lite.load_lite(sys.argv[1]); "
+            "print('tensorflow' in sys.modules or 'keras' in sys.modules)")
+    output = subprocess.run([sys.executable, "-c", code, os.path.join(MODELS_DIR, "Transformer_lite.npz")],
+                            cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
+
+
+def test_lite_model_matches_keras(tmp_path):
+    pytest.importorskip("tensorflow")
+    from keras.models import load_model
+
+    model = load_model(os.path.join(MODELS_DIR, "Transformer_model.h5"))
+    scaler = joblib.load(os.path.join(MODELS_DIR, "Transformer_scaler.pkl"))
+    windows = validation_windows(model, scaler, os.path.join(REPO_DIR, "data", "stock_data.csv"), count=128)
+
+    report = validate(model, scaler, os.path.join(MODELS_DIR, "Transformer_lite.npz"), windows)
+    assert report["max_abs_diff_scaled"] < 1e-5
+
+    # A fresh export of the same model agrees as well
+    path = str(tmp_path / "lite.npz")
+    export(os.path.join(MODELS_DIR, "Transformer_model.h5"), os.path.join(MODELS_DIR, "Transformer_scaler.pkl"), path)
+    assert validate(model, scaler, path, windows)["max_abs_diff_scaled"] < 1e-5
@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Largest |lite - keras| difference (in scaled units) accepted when exporting
+EXPORT_TOLERANCE = 1e-4
+
+
+# Inference: pure numpy, no TensorFlow import
+
+def _sigmoid(x):
+    # Same curve as 1 / (1 + exp(-x)) without overflow warnings for large |x|
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def _lstm(x, kernel, recurrent_kernel, bias, return_sequences):
+    """Keras LSTM forward pass (gate order i, f, c, o; tanh / sigmoid activations)"""
+    n, steps, _ = x.shape
+    units = recurrent_kernel.shape[0]
+    # Input projections for every time step in one matmul
+    projected = x @ kernel + bias
+    h = np.zeros((n, units), dtype=x.dtype)
+    c = np.zeros((n, units), dtype=x.dtype)
+    outputs = np.empty((n, steps, units), dtype=x.dtype) if return_sequences else None
+    for t in range(steps):
+        z = projected[:, t] + h @ recurrent_kernel
+        i = _sigmoid(z[:, :units])
+        f = _sigmoid(z[:, units:2 * units])
+        g = np.tanh(z[:, 2 * units:3 * units])
+        o = _sigmoid(z[:, 3 * units:])
+        c = f * c + i * g
+        h = o * np.tanh(c)
+        if return_sequences:
+            outputs[:, t] = h
+    return outputs if return_sequences else h
+
+
+_ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "tanh": np.tanh,
+    "sigmoid": _sigmoid,
+}
+
+
+class LiteSequenceModel:
+    """Exported Keras Sequential model evaluated with numpy
+
+    Supports the layers Transformer_model.h5 uses (LSTM, BatchNormalization,
+    Dropout, Dense). predict() mirrors keras' signature so it can stand in for
+    the Keras model anywhere in server.py.
+    """
+
+    def __init__(self, layers):
+        self.layers = layers
+
+    def predict(self, X, verbose=0):
+        x = np.asarray(X, dtype=np.float32)
+        for layer in self.layers:
+            kind = layer["type"]
+            if kind == "LSTM":
+                x = _lstm(x, layer["kernel"], layer["recurrent_kernel"], layer["bias"], layer["return_sequences"])
+            elif kind == "BatchNormalization":
+                # Inference mode: folded into one multiply-add at load time
+                x = x * layer["multiplier"] + layer["offset"]
+            elif kind == "Dense":
+                x = _ACTIVATIONS[layer["activation"]](x @ layer["kernel"] + layer["bias"])
+            # Dropout is the identity at inference time
+        return x
+
+
+class LiteMinMaxScaler:
+    """transform / inverse_transform of a fitted sklearn MinMaxScaler"""
+
+    def __init__(self, scale, min_):
+        self.scale_ = scale
+        self.min_ = min_
+
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64) * self.scale_ + self.min_
+
+    def inverse_transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.min_) / self.scale_
+
+
+def load_lite(path):
+    """(model, scaler) from an exported .npz, loaded without pickle or TensorFlow"""
+    with np.load(path, allow_pickle=False) as archive:
+        spec = json.loads(str(archive["spec"]))
+        arrays = {name: archive[name] for name in archive.files if name != "spec"}
+
+    layers = []
+    for index, layer in enumerate(spec["layers"]):
+        prefix = f"layer{index}_"
+        weights = {name[len(prefix):]: value for name, value in arrays.items() if name.startswith(prefix)}
+        if layer["type"] == "BatchNormalization":
+            multiplier = weights["gamma"] / np.sqrt(weights["moving_variance"] + layer["epsilon"])
+            weights = {"multiplier": multiplier, "offset": weights["beta"] - weights["moving_mean"] * multiplier}
+        layers.append(dict(layer, **weights))
+
+    scaler = LiteMinMaxScaler(arrays["scaler_scale"], arrays["scaler_min"])
+    return LiteSequenceModel(layers), scaler
+
+
+# Export: needs Keras/TensorFlow, run once per new .h5 (not in the server)
+
+def export(model_path, scaler_path, output_path):
+    """Write the Keras model's weights and the scaler's parameters to output_path (.npz)"""
+    import joblib
+    from keras.models import load_model
+
+    model = load_model(model_path)
+    scaler = joblib.load(scaler_path)
+    if type(scaler).__name__ != "MinMaxScaler":
+        raise ValueError(f"Unsupported scaler {type(scaler).__name__}, expected MinMaxScaler")
+
+    spec = {"layers": [], "input_shape": list(model.input_shape[1:])}
+    arrays = {
+        "scaler_scale": np.asarray(scaler.scale_, dtype=np.float64),
+        "scaler_min": np.asarray(scaler.min_, dtype=np.float64),
+    }
+    for index, layer in enumerate(model.layers):
+        kind = type(layer).__name__
+        config = layer.get_config()
+        prefix = f"layer{index}_"
+        if kind == "LSTM":
+            if config["activation"] != "tanh" or config["recurrent_activation"] != "sigmoid" or not config["use_bias"]:
+                raise ValueError(f"Unsupported LSTM configuration in layer {layer.name}")
+            kernel, recurrent_kernel, bias = layer.get_weights()
+            spec["layers"].append({"type": kind, "return_sequences": config["return_sequences"]})
+            arrays.update({prefix + "kernel": kernel, prefix + "recurrent_kernel": recurrent_kernel,
+                           prefix + "bias": bias})
+        elif kind == "BatchNormalization":
+            if not (config["center"] and config["scale"]):
+                raise ValueError(f"Unsupported BatchNormalization configuration in layer {layer.name}")
+            gamma, beta, moving_mean, moving_variance = layer.get_weights()
+            spec["layers"].append({"type": kind, "epsilon": config["epsilon"]})
+            arrays.update({prefix + "gamma": gamma, prefix + "beta": beta,
+                           prefix + "moving_mean": moving_mean, prefix + "moving_variance": moving_variance})
+        elif kind == "Dense":
+            if config["activation"] not in _ACTIVATIONS or not config["use_bias"]:
+                raise ValueError(f"Unsupported Dense configuration in layer {layer.name}")
+            kernel, bias = layer.get_weights()
+            spec["layers"].append({"type": kind, "activation": config["activation"]})
+            arrays.update({prefix + "kernel": kernel, prefix + "bias": bias})
+        elif kind == "Dropout":
+            spec["layers"].append({"type": kind})
+        else:
+            raise ValueError(f"Unsupported layer type {kind} ({layer.name})")
+
+    # Write next to the target, then move into place so a watching server never sees half a file
+    tmp_path = f"{output_path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, spec=np.array(json.dumps(spec)), **arrays)
+    os.replace(tmp_path, output_path)
+    return model, scaler
+
+
+def validate(keras_model, keras_scaler, lite_path, windows):
+    """Largest absolute differences between the Keras and lite outputs (scaled and in price units)"""
+    lite_model, lite_scaler = load_lite(lite_path)
+    keras_scaled = keras_model.predict(windows, verbose=0)
+    lite_scaled = lite_model.predict(windows)
+    return {
+        "windows": len(windows),
+        "max_abs_diff_scaled": float(np.abs(keras_scaled - lite_scaled).max()),
+        "max_abs_diff_price": float(np.abs(keras_scaler.inverse_transform(keras_scaled)
+                                           - lite_scaler.inverse_transform(lite_scaled)).max()),
+    }
+
+
+def validation_windows(model, scaler, csv_path, count=512, seed=0):
+    """Real close-price windows from csv_path when available, padded with random ones"""
+    look_back = model.input_shape[1]
+    windows = []
+    if csv_path and os.path.exists(csv_path):
+        import pandas as pd
+        close = pd.read_csv(csv_path)["close"].to_numpy(dtype=np.float64)
+        scaled = scaler.transform(close.reshape(-1, 1)).flatten()
+        windows = [scaled[i - look_back:i] for i in range(look_back, len(scaled) + 1)][-count:]
+    random = np.random.default_rng(seed).random((max(count - len(windows), 0), look_back))
+    return np.concatenate([np.array(windows).reshape(-1, look_back), random]).reshape(-1, look_back, 1).astype(np.float32)
+
+
+if __name__ == "__main__":
+    models_dir = os.path.join(BASE_DIR, "models")
+    parser = argparse.ArgumentParser(description="Export the Keras Transformer model to the numpy lite format")
+    parser.add_argument("--model", default=os.path.join(models_dir, "Transformer_model.h5"))
+    parser.add_argument("--scaler", default=os.path.join(models_dir, "Transformer_scaler.pkl"))
+    parser.add_argument("--output", default=os.path.join(models_dir, "Transformer_lite.npz"))
+    parser.add_argument("--data", default=os.path.join(BASE_DIR, "data", "stock_data.csv"),
+                        help="CSV whose close prices are used for validation windows")
+    args = parser.parse_args()
+
+    keras_model, keras_scaler = export(args.model, args.scaler, args.output)
+    report = validate(keras_model, keras_scaler, args.output, validation_windows(keras_model, keras_scaler, args.data))
+    print(f"Validation against Keras: {json.dumps(report)}")
+    if report["max_abs_diff_scaled"] > EXPORT_TOLERANCE:
+        os.remove(args.output)
+        raise SystemExit(f"❌ Lite model differs from Keras by {report['max_abs_diff_scaled']:.2e} "
+                         f"(tolerance {EXPORT_TOLERANCE:.0e}), export removed")
+    print(f"✅ Exported {args.model} to {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB)")